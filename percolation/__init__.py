@@ -0,0 +1,4 @@
+from percolation.networks import BooleanNetwork, WeightedNetwork
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+from percolation.observables import ClusterStatistics
@@ -0,0 +1,322 @@
+"""Registry of implementations of the update step, and an autotuner which picks the
+fastest of them for a given network and set of parameters.
+
+Each backend is registered with two functions of a model:
+
+    update(model) -> int
+        Performs a single update of the model, apart from shuffling and recording the
+        time series', and returns the number of transmissions. A backend which knows
+        the numbers of live and inert nodes after the update may return the tuple
+        (n_transmissions, n_live, n_inert) instead, which saves counting them. For the
+        reference 'numpy' backend this is None, and PercolationModel uses its own
+        update.
+    applies(model) -> bool
+        True if the backend can update the model. Otherwise the model falls back to
+        'numpy'.
+
+Every backend must give identical results to 'numpy' given the same random stream,
+which means drawing one random number per susceptible contact of a live node, in order
+of node index. The autotuner can then switch between them freely.
+
+    numpy       product of the live nodes with the sparse adjacency matrix
+    numba       compiled kernels which fuse the update into two loops (see `kernels`)
+    stencil     shifted slices of the live nodes of a square lattice, with no sparse
+                matrix
+    frontier    gathers the out-edges of the live nodes only, which is cheapest when the
+                live nodes are a thin front on a large network
+    band        updates only the rows from the highest to one below the lowest live row
+                of a square lattice whose links never point up (n_links < 4)
+"""
+import copy
+import json
+import os
+import numpy as np
+from pathlib import Path
+from sys import maxsize
+from time import perf_counter
+
+from percolation import kernels
+from percolation.lattice import SquareLattice
+from percolation.networks import WeightedNetwork
+
+BACKENDS = {}
+
+# Choices made by the autotuner in this process, keyed by (cache path, regime)
+_CHOICES = {}
+
+
+def register_backend(name, update, applies=lambda model: True):
+    """Registers a backend under `name`. See the module docstring for the functions
+    which must be provided."""
+    BACKENDS[name] = (update, applies)
+
+
+def available_backends(model):
+    """Names of the registered backends which can update `model`."""
+    return [name for name, (_, applies) in BACKENDS.items() if applies(model)]
+
+
+# ----------------------------------------------------------------------------------------
+#                                                                             | Backends |
+#                                                                             ------------
+
+
+def _unweighted(model):
+    return not isinstance(model.network, WeightedNetwork)
+
+
+def _numba_update(model):
+    return kernels.fused_update(model, model._kernel_buffer)
+
+
+def _numba_applies(model):
+    return kernels.NUMBA_AVAILABLE and _unweighted(model)
+
+
+def _shifted_or(out, live, shift, axis, periodic):
+    """out[i] |= live[i + shift] along `axis`, wrapping around if `periodic`."""
+    n = live.shape[axis]
+    src, dst = [slice(None)] * 2, [slice(None)] * 2
+    if shift == 1:
+        dst[axis], src[axis] = slice(0, n - 1), slice(1, n)
+    else:
+        dst[axis], src[axis] = slice(1, n), slice(0, n - 1)
+    target = out[tuple(dst)]
+    np.logical_or(target, live[tuple(src)], out=target)
+
+    if periodic:
+        dst[axis], src[axis] = (n - 1, 0) if shift == 1 else (0, n - 1)
+        target = out[tuple(dst)]
+        np.logical_or(target, live[tuple(src)], out=target)
+
+
+def _stencil_update(model):
+    lattice = model.network
+    model._recover()
+
+    # Node j is a contact of a live node j + shift along axis (see SquareLattice.links)
+    np.not_equal(model._state, 0, out=model._live)
+    live = lattice.lexi_to_cart(model._live)
+    contacts = lattice.lexi_to_cart(model._contacts)
+    contacts.fill(False)
+    for shift, axis in lattice.links:
+        _shifted_or(contacts, live, shift, axis, lattice.periodic)
+
+    return model._transmit(model._susceptible_contacts())
+
+
+def _stencil_applies(model):
+    return isinstance(model.network, SquareLattice)
+
+
+def _band_update(model):
+    lattice = model.network
+    n_rows, n_cols = lattice.n_rows, lattice.n_cols
+
+    # Rows between which all of the live nodes lie, cached between updates
+    if model._band is None:
+        live_rows = np.flatnonzero(lattice.lexi_to_cart(model._state).any(axis=1))
+        model._band = (live_rows[0], live_rows[-1])
+    first, last = model._band
+
+    # The bottom row is in contact with the top row, so the band would wrap around
+    if lattice.periodic and last == n_rows - 1:
+        model._band = None
+        return _stencil_update(model)
+
+    # Only the live rows and the row below them can change
+    start, stop = first * n_cols, min(last + 2, n_rows) * n_cols
+    state = model._state[start:stop]
+    inert = model._inert[start:stop]
+    n_inert = model._inert_time_series[-1] - np.count_nonzero(inert)
+    if model.recovered_are_inert:
+        np.logical_or(inert, state == 1, out=inert)
+    np.subtract(state, 1, out=state)
+    np.maximum(state, 0, out=state)
+
+    live = (state != 0).reshape(-1, n_cols)
+    contacts = np.zeros_like(live)
+    for shift, axis in lattice.links:
+        _shifted_or(contacts, live, shift, axis, lattice.periodic and axis == 1)
+    np.logical_and(contacts, ~(live | inert.reshape(-1, n_cols)), out=contacts)
+
+    n_transmissions = model._transmit(np.flatnonzero(contacts) + start)
+
+    live_rows = np.flatnonzero(state.reshape(-1, n_cols).any(axis=1))
+    if live_rows.size > 0:
+        model._band = (first + live_rows[0], first + live_rows[-1])
+    else:
+        model._band = None
+
+    # Every live node is in the band, and inert nodes outside it are unchanged
+    n_inert += np.count_nonzero(inert)
+    return n_transmissions, np.count_nonzero(state), n_inert
+
+
+def _band_applies(model):
+    return (
+        isinstance(model.network, SquareLattice)
+        and model.network.n_links < 4
+        and model.shuffle_prob == 0
+    )
+
+
+def _frontier_update(model):
+    model._recover()
+
+    _, targets = model.network.out_edges(np.flatnonzero(model._state))
+    susceptible = (model._state[targets] == 0) & ~model._inert[targets]
+    return model._transmit(np.unique(targets[susceptible]))
+
+
+register_backend("numpy", None)
+register_backend("numba", _numba_update, _numba_applies)
+register_backend("stencil", _stencil_update, _stencil_applies)
+register_backend("frontier", _frontier_update, _unweighted)
+register_backend("band", _band_update, _band_applies)
+
+# ----------------------------------------------------------------------------------------
+#                                                                            | Autotuner |
+#                                                                            -------------
+
+
+def cache_path():
+    """Path to the file in which the autotuner stores its choices. This is
+    'backends.json' in $PERCOLATION_CACHE_DIR, or by default in ~/.cache/percolation."""
+    directory = os.environ.get(
+        "PERCOLATION_CACHE_DIR", Path.home() / ".cache" / "percolation"
+    )
+    return Path(directory) / "backends.json"
+
+
+def regime(model):
+    """Key which identifies the network geometry and parameter regime of `model`, such
+    that the fastest backend is expected to be the same for models with the same key.
+    Probabilities are rounded to one decimal place."""
+    network = model.network
+    return ":".join(
+        str(part)
+        for part in (
+            type(network).__name__,
+            network.n_nodes,
+            network.csr.nnz,
+            getattr(network, "n_links", "-"),
+            getattr(network, "periodic", "-"),
+            round(model.inert_prob, 1),
+            round(model.transmission_prob, 1),
+            model.recovery_time if model.recovery_time != maxsize else "inf",
+            model.recovered_are_inert,
+            model.shuffle_prob > 0,
+        )
+    )
+
+
+def _load_cache(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _time_backend(model, name, snapshot, max_steps):
+    """Seconds taken by `name` to evolve the model from `snapshot` for `max_steps`
+    updates, or until there are no live nodes."""
+    state, inert, rng_state = snapshot
+    model._active_backend = name
+    model._band = None
+
+    # Warm up (for example, compile the Numba kernels) before timing
+    model._state[:], model._inert[:] = state, inert
+    model._update()
+
+    model._state[:], model._inert[:] = state, inert
+    model._rng.bit_generator.state = rng_state
+    model._band = None
+    start = perf_counter()
+    for _ in range(max_steps):
+        model._update()
+        if model._live_time_series[-1] == 0:
+            break
+    return perf_counter() - start
+
+
+def autotune(model, max_steps=None, path=None, refresh=False):
+    """Times each backend which can update `model` on a short simulation from a new
+    initial state of the model, and returns the name of the fastest. The state of the
+    model, its random number generator and its time series' are left as they were.
+
+    The choice is cached on disk, keyed by `regime(model)`, and reused without timing
+    for any model with the same key.
+
+    Inputs
+    ------
+    model: model.PercolationModel
+        The model, with the parameters for which to choose a backend.
+    max_steps: int (optional)
+        Maximum number of updates to time each backend for. By default, the square
+        root of the number of nodes.
+    path: str (optional)
+        Path to the cache file. By default, given by `cache_path`.
+    refresh: bool (optional)
+        Time the backends even if a choice has already been cached.
+
+    Returns
+    -------
+    name: str
+        Name of the fastest backend.
+    """
+    path = Path(path) if path is not None else cache_path()
+    key = regime(model)
+    candidates = available_backends(model)
+
+    if not refresh:
+        if _CHOICES.get((path, key)) in candidates:
+            return _CHOICES[(path, key)]
+        choice = _load_cache(path).get(key)
+        if choice in candidates:
+            _CHOICES[(path, key)] = choice
+            return choice
+
+    if max_steps is None:
+        max_steps = int(np.sqrt(model.network.n_nodes))
+
+    rng_state = model._rng.bit_generator.state
+    saved = (model._state.copy(), model._inert.copy())
+    series = (
+        list(model._live_time_series),
+        list(model._susceptible_time_series),
+        list(model._inert_time_series),
+    )
+    statistics = (copy.deepcopy(model._statistics), model._n_discarded)
+    active = getattr(model, "_active_backend", "numpy")
+    first_passage_step = model._first_passage_step
+
+    # Time from a new initial state, since the parameters may have changed mid-run
+    model.reset()
+    snapshot = (model._state.copy(), model._inert.copy(), model._rng.bit_generator.state)
+    timings = {
+        name: _time_backend(model, name, snapshot, max_steps) for name in candidates
+    }
+
+    # Restore the model
+    model._state[:], model._inert[:] = saved
+    model._rng.bit_generator.state = rng_state
+    model._live_time_series[:] = series[0]
+    model._susceptible_time_series[:] = series[1]
+    model._inert_time_series[:] = series[2]
+    model._statistics, model._n_discarded = statistics
+    model._active_backend = active
+    model._first_passage_step = first_passage_step
+    model._band = None
+
+    best = min(timings, key=timings.get)
+    _CHOICES[(path, key)] = best
+    cache = _load_cache(path)  # may have been updated by another process meanwhile
+    cache[key] = best
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(cache, indent=2, sort_keys=True))
+    except OSError:
+        pass  # the choice just isn't cached
+
+    return best
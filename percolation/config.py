@@ -68,6 +68,12 @@ parser.add(
     default=1,
     help="linear size of the initial live nucleus",
 )
+parser.add(
+    "--backend",
+    type=str,
+    default="auto",
+    help="implementation of the update, e.g. numpy, numba, stencil or frontier, or 'auto' to time them and use the fastest, default: auto",
+)
 parser.add(
     "--links",
     type=int,
@@ -128,3 +134,31 @@ parser.add(
     default=10,
     help="Number of simulations to run for a given set of parameters, default: 10",
 )
+parser.add(
+    "--bootstrap",
+    type=int,
+    default=0,
+    help="Number of bootstrap resamples for intervals on the logistic fit, default: 0",
+)
+parser.add(
+    "--coupled",
+    action="store_true",
+    help="Use common random numbers for every value of the parameter in a scan",
+)
+parser.add(
+    "--exact",
+    action="store_true",
+    help="Plot the exact percolation probability in a scan, where it is known, without running simulations",
+)
+parser.add(
+    "--runs",
+    type=str,
+    default=None,
+    help="Path to a .npy file in which to save a record of every simulation in a scan",
+)
+parser.add(
+    "--metrics",
+    type=str,
+    default=None,
+    help="Path to a JSON-lines file to which progress metrics are appended during a scan",
+)
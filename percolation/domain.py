@@ -0,0 +1,154 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Upper limit for seeds of the random number generators of each strip
+MAX_SEED = 2 ** 63
+
+
+class StripDecomposition:
+    """Splits a square lattice into horizontal strips of rows, which are updated in
+    parallel by a pool of threads.
+
+    Each update happens in two phases. First, every strip reduces the 'days' counter of
+    its own nodes and records which of them are still live. The rows at the edges of
+    neighbouring strips are then copied into a one-row 'halo' above and below each
+    strip. Finally, every strip works out which of its nodes are in contact with a live
+    node, using only its own rows and its halos, and draws its transmissions from its
+    own random number generator. Since the halos are copies, no strip ever reads nodes
+    which another strip is writing to.
+
+    The work is done by NumPy operations which release the GIL, so the strips really
+    are updated concurrently.
+
+    Inputs
+    ------
+    lattice: lattice.SquareLattice
+        The lattice to be split into strips.
+    n_threads: int
+        Number of threads, and strips. Capped at the number of rows.
+
+    Notes
+    -----
+        The threads are stopped by `close`, or on leaving a `with` block.
+    """
+
+    def __init__(self, lattice, n_threads):
+        self.lattice = lattice
+        self.shape = (lattice.n_rows, lattice.n_cols)
+        self.n_strips = min(n_threads, lattice.n_rows)
+
+        edges = np.linspace(0, lattice.n_rows, self.n_strips + 1).astype(int)
+        self.strips = list(zip(edges[:-1], edges[1:]))
+
+        # Live nodes in each strip, padded with a halo row above and below
+        self._live = [
+            np.zeros((stop - start + 2, lattice.n_cols), dtype=bool)
+            for start, stop in self.strips
+        ]
+        self._contacts = [
+            np.zeros((stop - start, lattice.n_cols), dtype=bool)
+            for start, stop in self.strips
+        ]
+        self._rngs = [np.random.default_rng() for _ in self.strips]
+
+        self._pool = ThreadPoolExecutor(max_workers=self.n_strips)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Shuts down the pool of threads, after which no more updates can be made."""
+        self._pool.shutdown(wait=True)
+
+    def seed(self, rng):
+        """Seeds the random number generator of each strip by drawing from `rng`, so
+        that the strips are reproducible whenever `rng` is."""
+        seeds = rng.integers(MAX_SEED, size=self.n_strips)
+        self._rngs = [np.random.default_rng(seed) for seed in seeds]
+
+    def _map(self, func, *args):
+        """Calls func(k, *args) for every strip k on the thread pool and waits."""
+        return list(self._pool.map(lambda k: func(k, *args), range(self.n_strips)))
+
+    def _recover(self, k, model):
+        """First phase: update the inert nodes and 'days' counter of strip k, and
+        record which nodes are still live."""
+        start, stop = self.strips[k]
+        state = model._state.reshape(self.lattice.n_rows, -1)[start:stop]
+        inert = model._inert.reshape(self.lattice.n_rows, -1)[start:stop]
+
+        live = self._live[k][1:-1]
+        if model.recovered_are_inert:
+            np.equal(state, 1, out=live)
+            np.logical_or(inert, live, out=inert)
+        np.subtract(state, 1, out=state)
+        np.maximum(state, 0, out=state)
+        np.not_equal(state, 0, out=live)
+
+    def _exchange_halos(self):
+        """Copy the edge rows of each strip into the halos of its neighbours. Without
+        periodic boundaries, the halos beyond the top and bottom rows stay empty."""
+        periodic = self.lattice.periodic
+        for k, live in enumerate(self._live):
+            if k > 0:
+                live[0] = self._live[k - 1][-2]
+            elif periodic:
+                live[0] = self._live[-1][-2]
+
+            if k < self.n_strips - 1:
+                live[-1] = self._live[k + 1][1]
+            elif periodic:
+                live[-1] = self._live[0][1]
+
+    def _transmit(self, k, model):
+        """Second phase: transmit the virus from the live nodes of strip k (and its
+        halos) to susceptible contacts within strip k."""
+        start, stop = self.strips[k]
+        state = model._state.reshape(self.lattice.n_rows, -1)[start:stop]
+        inert = model._inert.reshape(self.lattice.n_rows, -1)[start:stop]
+        live = self._live[k]
+        contacts = self._contacts[k]
+        height = stop - start
+        periodic = self.lattice.periodic
+
+        # Node j is a contact of a live node j + shift along axis (see SquareLattice.links)
+        contacts[:] = False
+        for shift, axis in self.lattice.links:
+            if axis == 0:
+                contacts |= live[1 + shift : 1 + shift + height]
+            elif shift == 1:
+                contacts[:, :-1] |= live[1:-1, 1:]
+                if periodic:
+                    contacts[:, -1] |= live[1:-1, 0]
+            else:
+                contacts[:, 1:] |= live[1:-1, :-1]
+                if periodic:
+                    contacts[:, 0] |= live[1:-1, -1]
+
+        # Susceptible contacts: neither live nor inert
+        np.logical_and(contacts, ~live[1:-1], out=contacts)
+        np.logical_and(contacts, ~inert, out=contacts)
+
+        i_potentials = np.flatnonzero(contacts)
+        i_transmissions = i_potentials[
+            self._rngs[k].random(i_potentials.size) <= model.transmission_prob
+        ]
+        state.reshape(-1)[i_transmissions] = model.recovery_time
+
+        return i_transmissions.size
+
+    def update(self, model):
+        """Performs a single update of `model`, apart from shuffling and recording the
+        time series.
+
+        Returns
+        -------
+        n_transmissions: int
+            number of transmissions for this update
+        """
+        self._map(self._recover, model)
+        self._exchange_halos()
+        return sum(self._map(self._transmit, model))
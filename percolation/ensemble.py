@@ -0,0 +1,195 @@
+"""Structured results for ensembles of simulations.
+
+Rather than reducing an ensemble straight to a percolation fraction, `run_ensemble`
+keeps one record per simulation in a NumPy structured array with the fields
+
+    seed                    seed with which the simulation can be reproduced
+    inert_prob              parameters of the model
+    transmission_prob
+    recovery_time           -1 if infinite
+    recovered_are_inert
+    shuffle_prob
+    percolated              whether the simulation percolated
+    steps                   number of updates, or zero if skipped by the prefilter
+    first_passage_step      update in which the far boundary was first reached, or -1
+    n_live                  final number of live, inert and susceptible nodes
+    n_inert
+    n_susceptible
+    peak_live_fraction      largest fraction of nodes which were live at once
+    live_mean               mean and sample variance of the fractions of live and
+    live_variance           inert nodes over the updates of the simulation
+    inert_mean              (the variance is NaN if there was only one value)
+    inert_variance
+
+With a model in streaming mode (see PercolationModel), each simulation takes constant
+memory however many updates it lasts, so the memory used is that of the records alone.
+Passing `statistics` to run_ensemble also merges the running statistics of every
+simulation into ensemble-wide streaming.StreamingSeries, which take constant memory
+however many simulations there are.
+
+Records from several ensembles, for example the values of a parameter scan, can be
+joined with numpy.concatenate and saved with numpy.save, and questions which would
+otherwise need a new batch of simulations become selections on the array, e.g.
+
+    runs[runs["percolated"]]["first_passage_step"].mean()
+"""
+import numpy as np
+from sys import maxsize
+
+from .streaming import StreamingSeries
+
+RUN_DTYPE = np.dtype(
+    [
+        ("seed", np.int64),
+        ("inert_prob", np.float64),
+        ("transmission_prob", np.float64),
+        ("recovery_time", np.int64),
+        ("recovered_are_inert", np.bool_),
+        ("shuffle_prob", np.float64),
+        ("percolated", np.bool_),
+        ("steps", np.int64),
+        ("first_passage_step", np.int64),
+        ("n_live", np.int64),
+        ("n_inert", np.int64),
+        ("n_susceptible", np.int64),
+        ("peak_live_fraction", np.float64),
+        ("live_mean", np.float64),
+        ("live_variance", np.float64),
+        ("inert_mean", np.float64),
+        ("inert_variance", np.float64),
+    ]
+)
+
+
+def run_ensemble(
+    model,
+    repeats,
+    seeds=None,
+    seed=None,
+    first_passage=True,
+    prefilter=True,
+    monitor=None,
+    statistics=None,
+):
+    """Runs `repeats` simulations of the model, each until it percolates or transmission
+    halts, and returns one record per simulation.
+
+    Inputs
+    ------
+    model: model.PercolationModel
+        The model, with the parameters to simulate. It is left in the final state of
+        the last simulation.
+    repeats: int
+        Number of simulations.
+    seeds: sequence of int (optional)
+        One seed for each simulation. Passing the same seeds for different parameters
+        gives common random numbers (see PercolationModel.estimate_percolation_prob).
+    seed: int (optional)
+        Seed from which the seeds of the simulations are generated, if `seeds` is not
+        given.
+    first_passage: bool (optional)
+        Use the first-passage engine where it applies (see evolve_until_percolated).
+    prefilter: bool (optional)
+        Skip simulations which cannot percolate (see evolve_until_percolated).
+    monitor: telemetry.ProgressMonitor (optional)
+        Records the simulations and their updates, and reports progress.
+    statistics: dict of streaming.StreamingSeries (optional)
+        Series for 'live' and/or 'inert', into which the running statistics of the
+        fractions of live and inert nodes in each simulation are merged in turn (see
+        StreamingSeries.merge). Passing the same dict to several calls accumulates
+        the statistics of all of their simulations.
+
+    Returns
+    -------
+    runs: numpy.ndarray
+        Structured array of shape (repeats,) with dtype RUN_DTYPE.
+    """
+    if seeds is None:
+        seeds = np.random.SeedSequence(seed).generate_state(repeats)
+    if len(seeds) != repeats:
+        raise ValueError("Please provide one seed for each simulation.")
+    if monitor is not None:
+        monitor.expect(repeats)
+
+    runs = np.zeros(repeats, dtype=RUN_DTYPE)
+    runs["seed"] = seeds
+    runs["inert_prob"] = model.inert_prob
+    runs["transmission_prob"] = model.transmission_prob
+    runs["recovery_time"] = (
+        model.recovery_time - 1 if model.recovery_time != maxsize else -1
+    )
+    runs["recovered_are_inert"] = model.recovered_are_inert
+    runs["shuffle_prob"] = model.shuffle_prob
+
+    # Outcomes are collected in plain arrays and copied into the records at the end
+    percolated = np.empty(repeats, dtype=bool)
+    counts = np.empty((4, repeats), dtype=np.int64)
+    peak_live_fraction = np.empty(repeats)
+    moments = np.empty((4, repeats))
+    n_nodes = model.network.n_nodes
+
+    for rep in range(repeats):
+        model._seed_rng(seed=int(runs["seed"][rep]))
+        model.reset()
+        model.evolve_until_percolated(
+            first_passage=first_passage, monitor=monitor, prefilter=prefilter
+        )
+        percolated[rep] = model.has_percolated
+        counts[:, rep] = (
+            model._n_updates,
+            model._first_passage_step,
+            model._live_time_series[-1],
+            model._inert_time_series[-1],
+        )
+        if model.statistics is not None:
+            peak_live_fraction[rep] = model.statistics["live"].max
+        else:
+            peak_live_fraction[rep] = max(model._live_time_series) / n_nodes
+
+        # The statistics of the run are read before the next reset discards them
+        run_statistics = _run_statistics(model)
+        moments[:, rep] = (
+            run_statistics["live"].mean,
+            run_statistics["live"].variance,
+            run_statistics["inert"].mean,
+            run_statistics["inert"].variance,
+        )
+        if statistics is not None:
+            for name, series in statistics.items():
+                series.merge(run_statistics[name])
+
+    runs["percolated"] = percolated
+    runs["steps"], runs["first_passage_step"] = counts[0], counts[1]
+    runs["n_live"], runs["n_inert"] = counts[2], counts[3]
+    runs["n_susceptible"] = n_nodes - counts[2] - counts[3]
+    runs["peak_live_fraction"] = peak_live_fraction
+    runs["live_mean"], runs["live_variance"] = moments[0], moments[1]
+    runs["inert_mean"], runs["inert_variance"] = moments[2], moments[3]
+
+    return runs
+
+
+def _run_statistics(model):
+    """Returns the running statistics of the fractions of live and inert nodes since
+    the model was last reset, accumulating them from the full time series' if the
+    model is not in streaming mode, so that they are the same in either mode."""
+    if model.statistics is not None:
+        return model.statistics
+    statistics = {}
+    for name, counts in (
+        ("live", model._live_time_series),
+        ("inert", model._inert_time_series),
+    ):
+        series = StreamingSeries(history_size=0)
+        for count in counts:
+            series.append(count / model.network.n_nodes)
+        statistics[name] = series
+    return statistics
+
+
+def percolation_fraction(runs, parameter="inert_prob"):
+    """Returns the distinct values of a parameter in a set of records, in increasing
+    order, and the fraction of the simulations at each value which percolated."""
+    values, inverse = np.unique(runs[parameter], return_inverse=True)
+    n_percolated = np.bincount(inverse, weights=runs["percolated"])
+    return values, n_percolated / np.bincount(inverse)
@@ -0,0 +1,215 @@
+"""Fast paths for configurations of the model whose outcome can be found without
+stepping through the simulation.
+
+Each fast path is registered with three functions of a model:
+
+    applies(model) -> bool
+        True if the fast path gives exactly the same distribution of outcomes as
+        PercolationModel.evolve_until_percolated for the current parameters.
+    sample(model, repeats, rng) -> int
+        Number of `repeats` independent simulations which percolate.
+    probability(model) -> float
+        Exact percolation probability, or None if it is not known in closed form.
+
+and optionally a fourth,
+
+    curve(model, inert_probs) -> numpy.ndarray
+        Exact percolation probability for each of an array of inert probabilities, the
+        other parameters being those of the model. Where this is not given, the
+        probability is computed for one inert probability at a time.
+
+PercolationModel.estimate_percolation_prob uses the first registered fast path which
+applies, and parameter_scan uses the exact probability, where there is one, in place of
+a fitted curve. Further exactly solvable cases can be added with `register_fast_path`.
+"""
+import numpy as np
+from sys import maxsize
+
+from percolation import transfer_matrix
+from percolation.lattice import SquareLattice
+
+# Upper limit on the number of random numbers drawn at once when sampling
+MAX_BATCH_ELEMENTS = 2 ** 24
+
+FAST_PATHS = {}
+
+
+def register_fast_path(name, applies, sample, probability=None, curve=None):
+    """Registers a fast path under `name`. See the module docstring for the functions
+    which must be provided. A fast path registered under an existing name replaces it.
+    """
+    if probability is None:
+        probability = lambda model: None
+    FAST_PATHS[name] = (applies, sample, probability, curve)
+
+
+def find_fast_path(model):
+    """Returns the name of the first registered fast path which applies to `model`, or
+    None if there is none."""
+    for name, (applies, *_) in FAST_PATHS.items():
+        if applies(model):
+            return name
+    return None
+
+
+def sample_percolation(model, repeats, rng=None):
+    """Returns the number of `repeats` simulations which percolate, using a fast path,
+    or None if no fast path applies to `model`."""
+    name = find_fast_path(model)
+    if name is None:
+        return None
+    rng = rng if rng is not None else np.random.default_rng()
+    return int(FAST_PATHS[name][1](model, repeats, rng))
+
+
+def percolation_probability(model):
+    """Returns the exact percolation probability of `model`, or None if no fast path
+    which applies to it knows the probability in closed form."""
+    name = find_fast_path(model)
+    if name is None:
+        return None
+    return FAST_PATHS[name][2](model)
+
+
+def percolation_probability_curve(model, inert_probs):
+    """Returns the exact percolation probability of `model` for each of a sequence of
+    inert probabilities, or None if it is not known in closed form for all of them. The
+    inert probability of the model is restored to its original value."""
+    inert_probs = np.asarray(inert_probs, dtype=np.float64)
+    name = find_fast_path(model)
+    if name is not None and FAST_PATHS[name][3] is not None:
+        return FAST_PATHS[name][3](model, inert_probs)
+
+    original = model.inert_prob
+    try:
+        probs = []
+        for inert_prob in inert_probs:
+            model.inert_prob = inert_prob
+            probs.append(percolation_probability(model))
+    finally:
+        model.inert_prob = original
+
+    if any(prob is None for prob in probs):
+        return None
+    return np.array(probs)
+
+
+# ----------------------------------------------------------------------------------------
+#                                                                     | Directed columns |
+#                                                                     --------------------
+#
+# With one (downwards) link per node and a transmission probability of one, the virus
+# advances one row per step down every column from the live top row, until it meets an
+# inert node. The model percolates if and only if some column has no inert nodes below
+# the top row, which is never inert. Nodes only need to stay live for one step, and
+# the bottom row is only joined to the top row on a periodic lattice, where the top row
+# is still live or has recovered and become inert, unless nodes recover and are not
+# flagged as inert.
+
+
+def _directed_columns_apply(model):
+    network = model.network
+    return (
+        isinstance(network, SquareLattice)
+        and network.n_links == 1
+        and model.transmission_prob == 1
+        and model.shuffle_prob == 0
+        and model.recovery_time > 1
+        and (
+            not network.periodic
+            or model.recovered_are_inert
+            or model.recovery_time == maxsize
+        )
+    )
+
+
+def _directed_columns_sample(model, repeats, rng):
+    n_rows, n_cols = model.network.n_rows, model.network.n_cols
+    batch_size = max(1, MAX_BATCH_ELEMENTS // (n_rows * n_cols))
+
+    n_percolated = 0
+    for start in range(0, repeats, batch_size):
+        size = min(batch_size, repeats - start)
+        open_nodes = rng.random((size, n_rows - 1, n_cols)) >= model.inert_prob
+        n_percolated += np.any(np.all(open_nodes, axis=1), axis=1).sum()
+
+    return n_percolated
+
+
+def _directed_columns_probability(model):
+    n_rows, n_cols = model.network.n_rows, model.network.n_cols
+    return 1 - (1 - (1 - model.inert_prob) ** (n_rows - 1)) ** n_cols
+
+
+register_fast_path(
+    "directed_columns",
+    _directed_columns_apply,
+    _directed_columns_sample,
+    _directed_columns_probability,
+)
+
+# ----------------------------------------------------------------------------------------
+#                                                                            | No spread |
+#                                                                            -------------
+#
+# With a recovery time of zero, the nucleus recovers in the first update before it can
+# transmit, so no simulation ever percolates.
+
+
+def _no_spread_apply(model):
+    return model.recovery_time == 1 and model.transmission_prob > 0
+
+
+register_fast_path(
+    "no_spread",
+    _no_spread_apply,
+    lambda model, repeats, rng: 0,
+    lambda model: 0.0,
+)
+
+# ----------------------------------------------------------------------------------------
+#                                                                      | Transfer matrix |
+#                                                                      -------------------
+#
+# With two or three links per node, none of which point up, a transmission probability
+# of one and no recovery, the model percolates if and only if the bottom row can be
+# reached from the top row through nodes which are not inert. For narrow lattices, the
+# probability of this is computed exactly by the transfer matrix method (see the
+# `transfer_matrix` module).
+
+
+def _transfer_matrix_apply(model):
+    network = model.network
+    return (
+        isinstance(network, SquareLattice)
+        and network.n_links in (2, 3)
+        and network.n_cols <= transfer_matrix.MAX_WIDTH
+        and model.transmission_prob == 1
+        and model.shuffle_prob == 0
+        and model.recovery_time == maxsize
+    )
+
+
+def _transfer_matrix_curve(model, inert_probs):
+    network = model.network
+    return transfer_matrix.percolation_probability(
+        network.n_rows, network.n_cols, network.n_links, network.periodic, inert_probs
+    )
+
+
+def _transfer_matrix_probability(model):
+    return float(_transfer_matrix_curve(model, model.inert_prob))
+
+
+def _transfer_matrix_sample(model, repeats, rng):
+    # Simulations are independent, so the number which percolate is binomial
+    return rng.binomial(repeats, _transfer_matrix_probability(model))
+
+
+register_fast_path(
+    "transfer_matrix",
+    _transfer_matrix_apply,
+    _transfer_matrix_sample,
+    _transfer_matrix_probability,
+    _transfer_matrix_curve,
+)
@@ -0,0 +1,143 @@
+"""First-passage engine for deterministic transmission.
+
+With a transmission probability of one and no shuffling, every susceptible contact of a
+live node is infected in the next update, so the dynamics is a breadth-first search from
+the nucleus through the nodes which are not inert. A node at distance d from the nucleus
+becomes live in update d and stays live for `recovery_time` updates (counting the update
+in which it was infected), after which it recovers. As long as recovered nodes cannot be
+reinfected, which is the case if they are flagged as inert or never recover, the whole
+trajectory follows from the distances, which are found in a single pass over the edges.
+"""
+import numpy as np
+from sys import maxsize
+
+from percolation.networks import WeightedNetwork
+
+
+def first_passage_applies(model):
+    """True if the first-passage engine reproduces the updates of `model` exactly. This
+    requires a transmission probability of one, no shuffling, an unweighted network,
+    no reinfection of recovered nodes, and the model to be in its initial state."""
+    return (
+        model.transmission_prob == 1
+        and model.shuffle_prob == 0
+        and not isinstance(model.network, WeightedNetwork)
+        and (model.recovered_are_inert or model.recovery_time == maxsize)
+        and model._n_updates == 0
+    )
+
+
+class FirstPassage:
+    """Computes the first-passage time of the virus to every node of a model in its
+    initial state, from which the state of the model after any number of updates
+    follows without stepping.
+
+    Inputs
+    ------
+    model: model.PercolationModel
+        The model, which must be in its initial state and satisfy
+        `first_passage_applies`.
+
+    Attributes
+    ----------
+    infection_time: numpy.ndarray
+        Update in which each node becomes live, which is its distance from the nucleus
+        through nodes which are not inert, or -1 for nodes which are never reached.
+    """
+
+    def __init__(self, model):
+        self.network = model.network
+        self.n_nodes = model.network.n_nodes
+        # Float, since the 'infinite' recovery time overflows when added to integers
+        self.recovery_time = float(model.recovery_time)
+        self.recovered_are_inert = model.recovered_are_inert
+        self.initial_inert = model._inert.copy()
+
+        live = model._state > 0
+        self.infection_time = np.full(self.n_nodes, -1, dtype=np.int64)
+        self.infection_time[live] = 0
+
+        # A node must still be live after the counter is reduced in order to transmit
+        if model.recovery_time > 1:
+            self._search(live)
+
+        reached = self.infection_time >= 0
+        self._infected = self.infection_time[reached]
+        self._recovered = self._infected + self.recovery_time
+        self._far = self.infection_time[reached & self.network._far_boundary]
+
+    def _search(self, live):
+        """Breadth-first search from the live nodes, one frontier at a time."""
+        available = ~(live | self.initial_inert)
+        frontier = np.flatnonzero(live)
+        distance = 0
+        while frontier.size > 0:
+            _, targets = self.network.out_edges(frontier)
+            frontier = np.unique(targets[available[targets]])
+            available[frontier] = False
+            distance += 1
+            self.infection_time[frontier] = distance
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                       | Public methods |
+    #                                                                       ------------------
+
+    def steps_until_percolated(self):
+        """Number of updates after which PercolationModel.evolve_until_percolated would
+        stop: either the first update without transmissions, or the first multiple of ten
+        updates at which a node on the far boundary is live."""
+        n_steps = int(self._infected.max()) + 1
+
+        # First multiple of ten (from ten) at which each reached far node is live
+        checks = np.fmax(10, np.ceil(self._far / 10) * 10)
+        checks = checks[(checks < self._far + self.recovery_time) & (checks <= n_steps)]
+        if checks.size > 0:
+            n_steps = int(checks.min())
+        return n_steps
+
+    def time_series(self, n_steps):
+        """Returns the number of live, susceptible and inert nodes after each of
+        0, 1, ..., n_steps updates."""
+        length = n_steps + 1
+        infected = np.bincount(self._infected[self._infected < length], minlength=length)
+        recovered = self._recovered[self._recovered < length].astype(np.int64)
+        recovered = np.bincount(recovered, minlength=length)
+
+        live = np.cumsum(infected - recovered)
+        inert = np.full(length, np.count_nonzero(self.initial_inert))
+        if self.recovered_are_inert:
+            inert += np.cumsum(recovered)
+        return live, self.n_nodes - live - inert, inert
+
+    def state(self, n_steps):
+        """Returns the 'days' counter and inert mask of every node after `n_steps`
+        updates."""
+        state = np.zeros(self.n_nodes)
+        inert = self.initial_inert.copy()
+        reached = (self.infection_time >= 0) & (self.infection_time <= n_steps)
+        days = self.recovery_time - (n_steps - self.infection_time[reached])
+        state[reached] = np.fmax(days, 0)
+        if self.recovered_are_inert:
+            inert[reached] |= days <= 0
+        return state, inert
+
+    def has_percolated(self, n_steps):
+        """True if a node on the far boundary is live after `n_steps` updates."""
+        return bool(
+            np.any((self._far <= n_steps) & (n_steps < self._far + self.recovery_time))
+        )
+
+    def apply(self, model, n_steps):
+        """Sets `model` to its state after `n_steps` updates, including the time series'
+        and first passage to the far boundary, writing into its existing arrays."""
+        state, inert = self.state(n_steps)
+        model._state[:] = state
+        model._inert[:] = inert
+
+        reached = self._far[self._far <= n_steps]
+        model._first_passage_step = int(reached.min()) if reached.size > 0 else -1
+
+        # The model is in its initial state, so the first entries are already there
+        live_series, _, inert_series = self.time_series(n_steps)
+        for n_live, n_inert in zip(live_series[1:].tolist(), inert_series[1:].tolist()):
+            model._append_time_series(n_live, n_inert)
@@ -0,0 +1,167 @@
+"""Compiled update kernels, used by PercolationModel when `backend="numba"`.
+
+An update is done in two fused loops over the nodes. The first finds the susceptible
+contacts of live nodes, working directly from the state before the 'days' counter is
+reduced, and writes their indices into a preallocated buffer. Random numbers are then
+drawn from the model's generator, exactly as in the NumPy update, before the second
+loop reduces the counters, flags recovered nodes as inert and applies the
+transmissions. The results are therefore identical to the NumPy update given the same
+random stream.
+
+If Numba is not installed, NUMBA_AVAILABLE is False and the model falls back to the
+NumPy update. Numba is only imported, and the kernels compiled, when first used.
+"""
+import numpy as np
+from importlib.util import find_spec
+
+from percolation.lattice import SquareLattice
+
+NUMBA_AVAILABLE = find_spec("numba") is not None
+
+_COMPILED = {}
+
+
+def _sparse_potentials(state, inert, recovered_are_inert, indptr, indices, out):
+    """Writes the indices of the susceptible contacts of live nodes into `out`, using
+    the compressed sparse column adjacency matrix, and returns how many there are.
+
+    A node is live after the counter is reduced if its state is currently greater than
+    one, and susceptible if its state is at most one and it is not (about to be) inert.
+    """
+    n_potentials = 0
+    for j in range(state.size):
+        if state[j] > 1 or inert[j] or (recovered_are_inert and state[j] == 1):
+            continue
+        for k in range(indptr[j], indptr[j + 1]):
+            if state[indices[k]] > 1:
+                out[n_potentials] = j
+                n_potentials += 1
+                break
+    return n_potentials
+
+
+def _stencil_potentials(state, inert, recovered_are_inert, source_rows, source_cols, out):
+    """As `_sparse_potentials`, but for a square lattice where `state` and `inert` are
+    two dimensional. For the l'th link, node (r, c) is a contact of node
+    (source_rows[l, r], source_cols[l, c]), where -1 means there is no such node."""
+    n_rows, n_cols = state.shape
+    n_links = source_rows.shape[0]
+    n_potentials = 0
+    for r in range(n_rows):
+        for c in range(n_cols):
+            if state[r, c] > 1 or inert[r, c] or (recovered_are_inert and state[r, c] == 1):
+                continue
+            for l in range(n_links):
+                rr = source_rows[l, r]
+                cc = source_cols[l, c]
+                if rr >= 0 and cc >= 0 and state[rr, cc] > 1:
+                    out[n_potentials] = r * n_cols + c
+                    n_potentials += 1
+                    break
+    return n_potentials
+
+
+def _stencil_sources(lattice):
+    """Row and column indices of the node which each node is a contact of, for each of
+    the lattice's links, with -1 marking links which cross a non-periodic boundary."""
+    rows = np.arange(lattice.n_rows)
+    cols = np.arange(lattice.n_cols)
+    source_rows = np.empty((len(lattice.links), lattice.n_rows), dtype=np.int64)
+    source_cols = np.empty((len(lattice.links), lattice.n_cols), dtype=np.int64)
+
+    # Node j is a contact of a live node j + shift along axis (see SquareLattice.links)
+    for l, (shift, axis) in enumerate(lattice.links):
+        source_rows[l] = rows + shift * (axis == 0)
+        source_cols[l] = cols + shift * (axis == 1)
+    if lattice.periodic:
+        source_rows %= lattice.n_rows
+        source_cols %= lattice.n_cols
+    else:
+        source_rows[(source_rows < 0) | (source_rows >= lattice.n_rows)] = -1
+        source_cols[(source_cols < 0) | (source_cols >= lattice.n_cols)] = -1
+
+    return source_rows, source_cols
+
+
+def _apply(
+    state,
+    inert,
+    recovered_are_inert,
+    potentials,
+    n_potentials,
+    randoms,
+    transmission_prob,
+    recovery_time,
+):
+    """Reduces the 'days' counter, flags recovered nodes as inert and sets the state of
+    the nodes which the virus is transmitted to. Returns the number of transmissions."""
+    for i in range(state.size):
+        if state[i] > 0:
+            if recovered_are_inert and state[i] == 1:
+                inert[i] = True
+            state[i] -= 1
+    n_transmissions = 0
+    for k in range(n_potentials):
+        if randoms[k] <= transmission_prob:
+            state[potentials[k]] = recovery_time
+            n_transmissions += 1
+    return n_transmissions
+
+
+def _compiled(func):
+    """Returns the compiled version of one of the kernels above."""
+    if func.__name__ not in _COMPILED:
+        from numba import njit
+
+        _COMPILED[func.__name__] = njit(nogil=True, cache=True)(func)
+    return _COMPILED[func.__name__]
+
+
+def fused_update(model, buffer):
+    """Performs a single update of `model` using the compiled kernels, apart from
+    shuffling and recording the time series.
+
+    Inputs
+    ------
+    model: model.PercolationModel
+        The model to update.
+    buffer: numpy.ndarray
+        Integer array with one element per node, which is overwritten.
+
+    Returns
+    -------
+    n_transmissions: int
+        number of transmissions for this update
+    """
+    network = model.network
+    if isinstance(network, SquareLattice):
+        n_potentials = _compiled(_stencil_potentials)(
+            network.lexi_to_cart(model._state),
+            network.lexi_to_cart(model._inert),
+            model.recovered_are_inert,
+            *_stencil_sources(network),
+            buffer,
+        )
+    else:
+        csc = network.csc
+        n_potentials = _compiled(_sparse_potentials)(
+            model._state,
+            model._inert,
+            model.recovered_are_inert,
+            csc.indptr,
+            csc.indices,
+            buffer,
+        )
+
+    randoms = model._rng.random(n_potentials)
+
+    return _compiled(_apply)(
+        model._state,
+        model._inert,
+        model.recovered_are_inert,
+        buffer,
+        n_potentials,
+        randoms,
+        model.transmission_prob,
+        model.recovery_time,
+    )
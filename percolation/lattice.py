@@ -159,6 +159,51 @@ class SquareLattice(BooleanNetwork):
     #                                                                    | Protected methods |
     #                                                                    ---------------------
 
+    @property
+    def _far_boundary(self):
+        """The nodes of a lattice are never reordered, so this is `far_boundary_mask`."""
+        return self.far_boundary_mask
+
+    def _get_nucleus(self, nucleus_size=1):
+        """The nodes of a lattice are never reordered, so this is `get_nucleus_mask`."""
+        return self.get_nucleus_mask(nucleus_size=nucleus_size)
+
+    def _shared_arrays(self):
+        """As for BooleanNetwork, with the boundary masks and dimensions of the lattice
+        included, so that the rebuilt lattice does not need to regenerate them."""
+        arrays, attributes = super()._shared_arrays()
+        for key in ("top", "bottom", "left", "right", "all"):
+            arrays[f"boundary_{key}"] = self._boundary_masks[key]
+        attributes.update(
+            n_rows=self.n_rows,
+            n_cols=self.n_cols,
+            n_links=self.n_links,
+            periodic=self.periodic,
+        )
+        return arrays, attributes
+
+    @classmethod
+    def _from_shared_arrays(cls, arrays, attributes):
+        """Rebuilds a lattice from the output of `_shared_arrays` without copying the
+        arrays or regenerating the edges."""
+        lattice = super()._from_shared_arrays(arrays, attributes)
+        lattice._n_rows = attributes["n_rows"]
+        lattice._n_cols = attributes["n_cols"]
+        lattice._n_links = attributes["n_links"]
+        lattice._periodic = attributes["periodic"]
+
+        masks = {
+            key: arrays[f"boundary_{key}"]
+            for key in ("top", "bottom", "left", "right", "all")
+        }
+        # Access using (shift, dim), as in _cache_boundary_masks
+        masks[(1, 0)] = masks["top"]
+        masks[(-1, 0)] = masks["bottom"]
+        masks[(1, 1)] = masks["left"]
+        masks[(-1, 1)] = masks["right"]
+        lattice._boundary_masks = masks
+        return lattice
+
     def _cache(self):
         """Cache boundary masks and neighbours in correct order."""
         self._cache_boundary_masks()
@@ -232,6 +277,11 @@ class SquareLattice(BooleanNetwork):
         """
         return state_lexi.reshape(self.n_rows, self.n_cols)
 
+    def reorder_nodes(self, method="rcm"):
+        """The nodes of a lattice are already numbered row by row, which `lexi_to_cart`
+        and the lattice backends rely on, so they cannot be reordered."""
+        raise ValueError("The nodes of a SquareLattice cannot be reordered.")
+
     def get_boundary_mask(self, key="all"):
         """Convenience method that returns a mask that selects the nodes at one or
         all of the boundaries.
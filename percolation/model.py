@@ -1,13 +1,25 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import colors, animation
 from sys import maxsize
-from pathlib import Path
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
-from percolation.lattice import SquareLattice
+try:
+    # Writes the product into a preallocated array, which the public interface cannot
+    from scipy.sparse._sparsetools import csr_matvec
+except ImportError:
+    csr_matvec = None
 
+from percolation.networks import BooleanNetwork, WeightedNetwork
+from percolation.lattice import SquareLattice
+from percolation.domain import StripDecomposition
+from percolation.backends import BACKENDS, autotune
+from percolation.exact import sample_percolation
+from percolation.first_passage import FirstPassage, first_passage_applies
+from percolation.streaming import RETAINED_STEPS, StreamingSeries
 
-plt.style.use(Path(__file__).resolve().parent / "p1b.mplstyle")
+# Stepping is restricted to the nodes connected to the live nodes when they are fewer
+# than this fraction of the network (see evolve_until_percolated)
+RESTRICT_FRACTION = 0.5
 
 
 class PercolationModel:
@@ -15,14 +27,17 @@ class PercolationModel:
 
     Inputs
     ------
-    network: lattice.SquareLattice
-        The underlying network upon which we perform the percolation simulation.
+    network: networks.BooleanNetwork
+        The underlying network upon which we perform the percolation simulation. This
+        is typically a lattice.SquareLattice, but any network with a nucleus and far
+        boundary will do.
     inert_prob: float
         Probability that any given node will be initially flagged as 'inert' i.e. not
         susceptible. In the notebooks, this is `q`.
     transmission_prob: float
         Probability of a 'live' node transmitting to a susceptible node it is connected
-        to upon a single refresh of the model.
+        to upon a single refresh of the model. On a networks.WeightedNetwork, this
+        multiplies the probability stored on each edge.
     recovery_time: int
         Number of time steps before a live node is considered to have recovered, and is
         no longer able to transmit.
@@ -33,13 +48,23 @@ class PercolationModel:
         nodes at any given time.
     nucleus_size: int
         Linear size (side length) of the initial nucleus (square) of live nodes.
+    n_threads: int
+        Number of threads used to update a lattice.SquareLattice. If greater than one,
+        the lattice is split into strips of rows which are updated in parallel.
+    backend: str
+        Implementation of the update: one of the names registered in
+        `backends.BACKENDS`, such as 'numpy' or 'numba', or 'auto' to time each of them
+        on this network and pick the fastest. All of them give identical results.
+    time_series: str
+        'full' to keep the number of live, susceptible and inert nodes after every
+        update, or 'streaming' to keep at most `streaming.RETAINED_STEPS` of the most
+        recent of them, and accumulate running statistics of the fractions of live and inert
+        nodes in constant memory instead (see `statistics`).
 
     Notes
     -----
-        For now, only a square lattice is implemented, but any data structure
-        that includes a set of nodes and edges (a graph) would be valid in
-        principle. This may require further modifications to this class if the
-        number of links attached to each node varies between nodes.
+        Visualisation is only supported for networks which have a two dimensional
+        Cartesian representation, such as the square lattice.
     """
 
     def __init__(
@@ -52,11 +77,12 @@ class PercolationModel:
         recovered_are_inert=True,
         shuffle_prob=0.0,
         nucleus_size=1,
+        n_threads=1,
+        backend="numpy",
+        time_series="full",
     ):
-        # TODO: upgrade so we can use more general networks
-        # For now, just check that the network is a SquareLattice
-        if type(network) != SquareLattice:
-            raise ValueError("Please provide an instance of SquareLattice.")
+        if not isinstance(network, BooleanNetwork):
+            raise ValueError("Please provide an instance of BooleanNetwork.")
         self._network = network
 
         # Set parameters which users can modify
@@ -66,6 +92,28 @@ class PercolationModel:
         self.recovered_are_inert = recovered_are_inert
         self.shuffle_prob = shuffle_prob
         self.nucleus_size = nucleus_size
+        self.n_threads = n_threads
+        self.backend = backend
+
+        # Time series' which are appended to as the model evolves
+        self._live_time_series = []
+        self._susceptible_time_series = []
+        self._inert_time_series = []
+
+        # Running statistics which replace the full time series' in streaming mode
+        if time_series == "full":
+            self._statistics = None
+        elif time_series == "streaming":
+            self._statistics = {"live": StreamingSeries(), "inert": StreamingSeries()}
+        else:
+            raise ValueError("Please choose time_series from 'full' or 'streaming'.")
+        self._n_discarded = 0
+
+        # Source of each edge, cached for the connectivity prefilter
+        self._edge_sources = None
+
+        # Rows which contain the live nodes, cached by the 'band' backend
+        self._band = None
 
         # Initalise the model and random number generator
         self.init_state(reproducible=False)
@@ -86,6 +134,7 @@ class PercolationModel:
         if new_value < 0 or new_value > 1:
             raise ValueError(f"Please enter a inert probability between 0 and 1.")
         self._inert_prob = new_value
+        self._parameters_changed()
 
     @property
     def transmission_prob(self):
@@ -102,6 +151,7 @@ class PercolationModel:
                 f"Please enter a transmission probability between 0 and 1."
             )
         self._transmission_prob = new_value
+        self._parameters_changed()
 
     @property
     def recovery_time(self):
@@ -119,6 +169,7 @@ class PercolationModel:
             new_value = maxsize - 1
         # Add one since order of update loop is to reduce step counter first
         self._recovery_time = new_value + 1
+        self._parameters_changed()
 
     @property
     def recovered_are_inert(self):
@@ -131,6 +182,7 @@ class PercolationModel:
         if type(new_flag) is not bool:
             raise TypeError("Please enter True/False for recovered_are_inert.")
         self._recovered_are_inert = new_flag
+        self._parameters_changed()
 
     @property
     def shuffle_prob(self):
@@ -145,6 +197,7 @@ class PercolationModel:
         if new_value < 0 or new_value > 1:
             raise ValueError("Please enter a travel probability between 0 and 1.")
         self._shuffle_prob = new_value
+        self._parameters_changed()
 
     @property
     def nucleus_size(self):
@@ -166,6 +219,51 @@ class PercolationModel:
             )
         self._nucleus_size = new_value
 
+    @property
+    def n_threads(self):
+        """Number of threads used to update a square lattice. With more than one
+        thread, the lattice is split into strips of rows which are updated in parallel,
+        each with its own random number generator."""
+        return self._n_threads
+
+    @n_threads.setter
+    def n_threads(self, new_value):
+        """Setter for n_threads. Raises TypeError if input is not an integer and raises
+        ValueError if input is less than one, or greater than one for networks other
+        than a square lattice."""
+        if type(new_value) is not int:
+            raise TypeError("Please provide an integer for the number of threads.")
+        if new_value < 1:
+            raise ValueError("Please provide a positive number of threads.")
+        if new_value > 1 and not isinstance(self.network, SquareLattice):
+            raise ValueError("Multiple threads are only supported for SquareLattice.")
+        self._n_threads = new_value
+        if getattr(self, "_domain", None) is not None:
+            self._domain.close()
+        self._domain = None  # rebuilt by init_state
+        self._parameters_changed()
+
+    @property
+    def backend(self):
+        """Implementation of the update, which is one of the backends registered in
+        `backends.BACKENDS`, or 'auto'. All backends give identical results given the
+        same random stream. If the chosen backend cannot update this network, for
+        example if Numba is not installed, the NumPy update is used instead. With
+        'auto', the fastest backend for the network and parameters is chosen by
+        `backends.autotune` when the state is initialised and whenever a parameter
+        changes, and the choice is cached on disk. The backend in use is given by
+        `active_backend`."""
+        return self._backend
+
+    @backend.setter
+    def backend(self, new_value):
+        """Setter for backend. Raises ValueError if input is not a known backend."""
+        options = list(BACKENDS) + ["auto"]
+        if new_value not in options:
+            raise ValueError(f"Please choose a backend from {options}.")
+        self._backend = new_value
+        self._parameters_changed()
+
     # ----------------------------------------------------------------------------------------
     #                                                                 | Read-only properties |
     #                                                                 ------------------------
@@ -176,9 +274,15 @@ class PercolationModel:
         individuals, households, counties...)."""
         return self._network
 
+    @property
+    def active_backend(self):
+        """Name of the backend currently used to update the model."""
+        return self._active_backend
+
     @property
     def state(self):
-        """Current state of the system, represented as a 2d integer array. Nodes which
+        """Current state of the system, represented as a 2d integer array (or 1d for
+        networks without a Cartesian representation). Nodes which
         have only just become live take a value of `self.recovery_time`, and this count
         decreases by one for each update. Zeros are interpreted as not being live."""
         return self.network.lexi_to_cart(self._state)
@@ -192,7 +296,8 @@ class PercolationModel:
     @property
     def live_time_series(self):
         """Numpy array containing the fraction of nodes that are live, which is appended
-        to as the model is evolved forwards."""
+        to as the model is evolved forwards. In streaming mode, only the most recent
+        values are kept, and likewise for the other time series'."""
         return np.array(self._live_time_series) / self.network.n_nodes
 
     @property
@@ -208,11 +313,25 @@ class PercolationModel:
         appended to as the model is evolved forwards."""
         return np.array(self._inert_time_series) / self.network.n_nodes
 
+    @property
+    def statistics(self):
+        """In streaming mode, a dict of streaming.StreamingSeries of the fractions of
+        'live' and 'inert' nodes after every update since the model was last reset,
+        from which their means, variances, extremes, autocorrelations and decimated
+        histories can be read. Otherwise None."""
+        return self._statistics
+
+    @property
+    def first_passage_step(self):
+        """Number of updates after which a node on the far boundary was first live, or
+        -1 if this has not happened since the model was last reset."""
+        return self._first_passage_step
+
     @property
     def has_percolated(self):
         """Returns True if the percolating substance has reached the 'far boundary'
         defined by the underlying network object."""
-        if np.any(self._state[self.network.far_boundary_mask]):
+        if np.any(self._state[self._far_nodes]):
             return True
         else:
             return False
@@ -227,24 +346,231 @@ class PercolationModel:
         """
         self._rng = np.random.default_rng(seed)
 
-    def _update_time_series(self):
+    def _allocate_workspace(self):
+        """Allocates the arrays which hold the state of the model and the scratch space
+        used by each update, if they do not already exist with one element per node.
+        These are reused by every update and every call to `reset`."""
+        n_nodes = self.network.n_nodes
+        if getattr(self, "_state", None) is not None and self._state.size == n_nodes:
+            return
+
+        self._state = np.zeros(n_nodes)
+        self._inert = np.zeros(n_nodes, dtype=bool)
+        self._live = np.zeros(n_nodes, dtype=bool)
+        self._contacts = np.zeros(n_nodes, dtype=bool)
+        self._scratch = np.zeros(n_nodes, dtype=bool)
+        self._randoms = np.zeros(n_nodes)
+
+        # Scratch space for the compiled kernels
+        self._kernel_buffer = np.empty(n_nodes, dtype=np.int64)
+
+    def _parameters_changed(self):
+        """Called by the setters of parameters on which the choice of backend depends.
+        Before the state has been initialised, this is left to `init_state`."""
+        if getattr(self, "_state", None) is not None:
+            self._resolve_backend()
+
+    def _resolve_backend(self):
+        """Sets the backend used by `_update`, timing the candidates if the backend is
+        'auto'. The strips of a multi-threaded model are always updated with NumPy."""
+        if self.n_threads > 1:
+            self._active_backend = "numpy"
+        elif self.backend == "auto":
+            self._active_backend = autotune(self)
+        elif BACKENDS[self.backend][1](self):
+            self._active_backend = self.backend
+        else:
+            self._active_backend = "numpy"
+
+    def _find_contacts(self):
+        """Sets self._contacts to True for every node in contact with a live node, where
+        self._live holds the live nodes. This is the product of the live nodes, as a row
+        vector, with the adjacency matrix, written directly into the preallocated array
+        using the columns of the matrix. If scipy's private routine is unavailable, the
+        product is computed with the public interface, which allocates a new array."""
+        csc = self.network.csc
+        if csr_matvec is None:
+            self._contacts[:] = csc.T.dot(self._live)
+            return
+        self._contacts.fill(False)
+        csr_matvec(
+            self.network.n_nodes,
+            self.network.n_nodes,
+            csc.indptr,
+            csc.indices,
+            csc.data,
+            self._live,
+            self._contacts,
+        )
+
+    def _percolating_component(self):
+        """Returns a mask of the nodes which are connected to a live node through nodes
+        which are not inert, ignoring the direction of the edges, or None if there is no
+        node on the far boundary among them. With no shuffling, only these nodes can
+        ever become live, so the model cannot percolate if None is returned."""
+        csr = self.network.csr
+        if self._edge_sources is None or self._edge_sources[0] is not csr:
+            sources = np.repeat(np.arange(self.network.n_nodes), np.diff(csr.indptr))
+            self._edge_sources = (csr, sources)
+        sources = self._edge_sources[1]
+
+        # Weakly connected components of the graph without edges to or from inert nodes
+        open_nodes = ~self._inert
+        data = open_nodes[sources] & open_nodes[csr.indices]
+        graph = csr_matrix((data, csr.indices, csr.indptr), shape=csr.shape, copy=True)
+        graph.eliminate_zeros()
+        _, labels = connected_components(graph, directed=True, connection="weak")
+
+        component = np.isin(labels, labels[self._state > 0])
+        if not np.any(component & self.network._far_boundary):
+            return None
+        return component
+
+    def _evolve_restricted(self, nodes, monitor=None):
+        """Evolves until percolated on the subgraph induced by `nodes`, which must
+        contain every node which can become live, and writes the result back. The
+        random stream is consumed exactly as it would be on the whole network."""
+        network = self.network.subnetwork(nodes, nucleus=self._state[nodes] > 0)
+        sub = PercolationModel(
+            network,
+            transmission_prob=self.transmission_prob,
+            recovery_time=self.recovery_time - 1,
+            recovered_are_inert=self.recovered_are_inert,
+            backend=self.active_backend,
+        )
+        sub._state[:] = self._state[nodes]
+        sub._inert[:] = self._inert[nodes]
+        sub._rng = self._rng
+        sub._live_time_series.clear()
+        sub._susceptible_time_series.clear()
+        sub._inert_time_series.clear()
+        sub._update_time_series()
+
+        sub.evolve_until_percolated()
+        if monitor is not None:
+            # Counted as updates of the whole network, like every other update
+            monitor.record_steps(len(sub._live_time_series) - 1, self.network.n_nodes)
+            monitor.record_runs(1)
+
+        if self._first_passage_step < 0 and sub._first_passage_step >= 0:
+            self._first_passage_step = sub._first_passage_step + self._n_updates
+
+        self._state[nodes] = sub._state
+        self._inert[nodes] = sub._inert
+        self._band = None
+
+        # Nodes outside the subgraph are unchanged, so just offset its time series'
+        inert_outside = np.count_nonzero(self._inert) - np.count_nonzero(sub._inert)
+        for n_live, n_inert in zip(
+            sub._live_time_series[1:], sub._inert_time_series[1:]
+        ):
+            self._append_time_series(n_live, n_inert + inert_outside)
+
+    @property
+    def _n_updates(self):
+        """Number of updates since the model was last reset, including those whose
+        entries in the time series' have been discarded in streaming mode."""
+        return len(self._live_time_series) - 1 + self._n_discarded
+
+    def _update_time_series(self, n_live=None, n_inert=None):
         """Helper function that appends information about the current state of the model to
-        lists containing time series'."""
-        n_live = self._state.astype(bool).sum()
-        n_inert = self._inert.astype(bool).sum()
+        lists containing time series', and records the first passage to the far
+        boundary. The numbers of live and inert nodes are counted unless given."""
+        if self._first_passage_step < 0 and np.any(self._state[self._far_nodes]):
+            self._first_passage_step = self._n_updates + 1
+
+        if n_live is None:
+            n_live = np.count_nonzero(self._state)
+        if n_inert is None:
+            n_inert = np.count_nonzero(self._inert)
+        self._append_time_series(n_live, n_inert)
+
+    def _append_time_series(self, n_live, n_inert):
+        """Appends the numbers of live, susceptible and inert nodes to the time series'.
+        In streaming mode, they are also added to the running statistics, and all but
+        the latest entries are discarded once there are more than RETAINED_STEPS."""
+        n_nodes = self.network.n_nodes
         self._live_time_series.append(n_live)
         self._inert_time_series.append(n_inert)
-        self._susceptible_time_series.append(self.network.n_nodes - n_live - n_inert)
+        self._susceptible_time_series.append(n_nodes - n_live - n_inert)
+
+        if self._statistics is None:
+            return
+        self._statistics["live"].append(n_live / n_nodes)
+        self._statistics["inert"].append(n_inert / n_nodes)
+        if len(self._live_time_series) > RETAINED_STEPS:
+            self._n_discarded += len(self._live_time_series) - 1
+            del self._live_time_series[:-1]
+            del self._susceptible_time_series[:-1]
+            del self._inert_time_series[:-1]
 
     def _shuffle_nodes(self):
         """Shuffle a subset of the nodes based on drawing uniform random numbers and
         comparing these to the travel probability."""
-        i_shuffle = np.where(self._rng.random(self._state.size) < self.shuffle_prob)[0]
+        self._rng.random(out=self._randoms)
+        np.less(self._randoms, self.shuffle_prob, out=self._scratch)
+        i_shuffle = np.flatnonzero(self._scratch)
         if i_shuffle.size > 0:
             i_shuffle_permuted = self._rng.permutation(i_shuffle)
             self._state[i_shuffle] = self._state[i_shuffle_permuted]
             self._inert[i_shuffle] = self._inert[i_shuffle_permuted]
 
+    def _weighted_transmissions(self):
+        """Returns the indices of nodes to which the virus is transmitted on a weighted
+        network. Every edge from a live node to a susceptible node is an independent
+        trial, succeeding with probability equal to its weight multiplied by
+        self.transmission_prob. The edges are gathered for all live nodes at once."""
+        edges, targets = self.network.out_edges(np.flatnonzero(self._state))
+
+        # Keep only the edges which end at a susceptible node
+        susceptible = ~np.logical_or(self._state.astype(bool), self._inert)
+        active = susceptible[targets]
+        edges, targets = edges[active], targets[active]
+
+        probs = self.network.weights[edges] * self.transmission_prob
+        return np.unique(targets[self._rng.random(edges.size) <= probs])
+
+    def _halting_steps(self):
+        """Returns the number of updates without any transmissions after which
+        transmission is considered to have halted, which is the reciprocal of the
+        smallest non-zero probability of transmission along an edge."""
+        prob = self.transmission_prob
+        if isinstance(self.network, WeightedNetwork):
+            weights = self.network.weights
+            weights = weights[weights > 0]
+            if weights.size > 0:
+                prob *= weights.min()
+        return 1 / prob
+
+    def _recover(self):
+        """Reduces the 'days' counter of the live nodes, first flagging those which are
+        about to recover as inert if self.recovered_are_inert."""
+        if self.recovered_are_inert:
+            np.equal(self._state, 1, out=self._scratch)
+            np.logical_or(self._inert, self._scratch, out=self._inert)
+
+        np.subtract(self._state, 1, out=self._state)
+        np.maximum(self._state, 0, out=self._state)
+
+    def _susceptible_contacts(self):
+        """Returns the indices, in increasing order, of the 'susceptible' nodes in
+        self._contacts, which can potentially be transmitted to. Overwrites
+        self._contacts, and self._live must hold the live nodes."""
+        np.logical_or(self._live, self._inert, out=self._scratch)
+        np.logical_not(self._scratch, out=self._scratch)
+        np.logical_and(self._contacts, self._scratch, out=self._contacts)
+        return np.flatnonzero(self._contacts)
+
+    def _transmit(self, i_potentials):
+        """Draws one random number for each of the potential transmissions, in order,
+        and sets the state of the nodes which the virus is transmitted to. Returns the
+        number of transmissions."""
+        randoms = self._randoms[: i_potentials.size]
+        self._rng.random(out=randoms)
+        i_transmissions = i_potentials[randoms <= self.transmission_prob]
+        self._state[i_transmissions] = self.recovery_time
+        return i_transmissions.size
+
     def _update(self):
         """Performs a single update of the model.
 
@@ -263,39 +589,40 @@ class PercolationModel:
             self._update_time_series()
             return 0
 
-        # Update array of inert nodes with those that are about to recover
-        if self.recovered_are_inert:
-            np.logical_or(self._inert, (self._state == 1), out=self._inert)
-
-        # Update state by reducing the 'days' counter
-        np.clip(self._state - 1, a_min=0, a_max=None, out=self._state)
-
-        # Mask of nodes with contact with a live node
-        mask_contacts = self._state.astype(np.bool8) * self.network.matrix
-
-        # Mask of 'susceptible' contacts who can potentially be transmitted to
-        mask_potentials = np.logical_and(
-                            np.logical_and(
-                                ~self._state.astype(bool),
-                                ~self._inert.astype(bool)),
-                            mask_contacts)
-
-        # Indices of 'susceptible' contacts who can potentially be transmitted to
-        i_potentials = np.where(mask_potentials == True)[0]
-
-        # Indices of nodes to which the virus has just been transmitted
-        i_transmissions = i_potentials[self._rng.random(i_potentials.size) <= self.transmission_prob]
-
+        # Update strips of the lattice in parallel
+        if self._domain is not None:
+            n_transmissions = self._domain.update(self)
+            self._update_time_series()
+            return n_transmissions
+
+        # Update using another backend, which may also count the live and inert nodes
+        backend_update = BACKENDS[self._active_backend][0]
+        if backend_update is not None:
+            result = backend_update(self)
+            if isinstance(result, tuple):
+                n_transmissions, n_live, n_inert = result
+                self._update_time_series(n_live, n_inert)
+            else:
+                n_transmissions = result
+                self._update_time_series()
+            return n_transmissions
 
-        # Update state with new live nodes
-        self._state[i_transmissions] = self.recovery_time
+        self._recover()
 
-        
+        if isinstance(self.network, WeightedNetwork):
+            i_transmissions = self._weighted_transmissions()
+            self._state[i_transmissions] = self.recovery_time
+            n_transmissions = len(i_transmissions)
+        else:
+            # Mask of nodes with contact with a live node
+            np.not_equal(self._state, 0, out=self._live)
+            self._find_contacts()
+            n_transmissions = self._transmit(self._susceptible_contacts())
 
         # Append the latest data to the time series'
         self._update_time_series()
 
-        return len(i_transmissions)
+        return n_transmissions
 
     # ----------------------------------------------------------------------------------------
     #                                                                       | Public methods |
@@ -318,30 +645,64 @@ class PercolationModel:
         else:
             self._seed_rng(seed=None)
 
+        self._allocate_workspace()
+        self.reset()
+        self._resolve_backend()
+
+    def reset(self):
+        """Returns the model to a new initial state, with a fresh nucleus and inert
+        nodes, without reseeding the random number generator. Unlike `init_state`, this
+        reuses all of the arrays which hold the state of the model, so it is the cheaper
+        way to start each of many repeated simulations.
+        """
+        self._allocate_workspace()
+
         # Generate initial nucleus
-        self._state = np.zeros(self.network.n_nodes)
-        nucleus_mask = self.network.get_nucleus_mask(nucleus_size=self.nucleus_size)
+        nucleus_mask = self.network._get_nucleus(nucleus_size=self.nucleus_size)
+        self._state.fill(0)
         self._state[nucleus_mask] = self.recovery_time
 
         # Create mask for inert nodes with same shape as state
-        self._inert = np.logical_and(
-            self._rng.random(self._state.size) < self.inert_prob,  # rand < prob
-            ~self._state.astype(bool),  # not part of initial nucleus
-        )
+        self._rng.random(out=self._randoms)
+        np.less(self._randoms, self.inert_prob, out=self._inert)  # rand < prob
+        self._inert[nucleus_mask] = False  # not part of initial nucleus
+
+        # Split the lattice into strips, each seeded from the model's generator
+        if self.n_threads > 1:
+            shape = (self.network.n_rows, self.network.n_cols)
+            if self._domain is None or self._domain.shape != shape:
+                if self._domain is not None:
+                    self._domain.close()
+                self._domain = StripDecomposition(self.network, self.n_threads)
+            self._domain.seed(self._rng)
 
         # Reset time series' to empty lists then append initial conditions
-        self._live_time_series = []
-        self._susceptible_time_series = []
-        self._inert_time_series = []
+        self._far_nodes = np.flatnonzero(self.network._far_boundary)
+        self._first_passage_step = -1
+        self._band = None
+        self._live_time_series.clear()
+        self._susceptible_time_series.clear()
+        self._inert_time_series.clear()
+        self._n_discarded = 0
+        if self._statistics is not None:
+            for series in self._statistics.values():
+                series.reset()
         self._update_time_series()
 
-    def evolve(self, n_steps):
+    def evolve(self, n_steps, first_passage=False, monitor=None):
         """Evolves the model for `n_steps` iterations.
 
         Inputs
         ------
         n_steps: int
             Number of updates.
+        first_passage: bool (optional)
+            If the model is in its initial state and transmission is deterministic (see
+            `first_passage.first_passage_applies`), jump straight to the final state
+            using a single breadth-first search instead of stepping. The results are
+            identical, except that no random numbers are drawn.
+        monitor: telemetry.ProgressMonitor (optional)
+            Records the number of updates and reports progress.
         """
         if type(n_steps) is not int:
             raise TypeError(
@@ -350,20 +711,75 @@ class PercolationModel:
         if n_steps < 1:
             raise ValueError("Please enter a positive number of steps.")
 
+        if first_passage and first_passage_applies(self):
+            FirstPassage(self).apply(self, n_steps)
+            self._band = None
+            if monitor is not None:
+                monitor.record_steps(n_steps, self.network.n_nodes)
+            return
+
         for step in range(n_steps):
             _ = self._update()
+            if monitor is not None:
+                monitor.record_steps(1, self.network.n_nodes)
 
-    def evolve_until_percolated(self):
+    def evolve_until_percolated(
+        self, first_passage=False, monitor=None, prefilter=False
+    ):
         """Evolve until percolation occurs or transmission halts. Percolation is defined
         as one or more nodes on the 'far boundary' being reached. Transmission halting
-        is defined as having no transmissions for 1 / self.transmission_prob days.
+        is defined as having no transmissions for 1 / self.transmission_prob days, or on
+        a networks.WeightedNetwork for the reciprocal of the smallest non-zero
+        probability of transmission along an edge.
+
+        Inputs
+        ------
+        first_passage: bool (optional)
+            As for `evolve`, find the final state with a single breadth-first search if
+            possible, stopping after the same number of updates as stepping would.
+        monitor: telemetry.ProgressMonitor (optional)
+            Records the number of updates and the completed simulation, and reports
+            progress.
+        prefilter: bool (optional)
+            If there is no shuffling, first find the nodes which are connected to the
+            live nodes through nodes which are not inert. If none of them is on the far
+            boundary the model cannot percolate, and it is left as it is without
+            stepping. Otherwise, if they are a small part of the network, only they are
+            updated, which gives identical results.
         """
+        if first_passage and first_passage_applies(self):
+            engine = FirstPassage(self)
+            n_steps = engine.steps_until_percolated()
+            engine.apply(self, n_steps)
+            self._band = None
+            if monitor is not None:
+                monitor.record_steps(n_steps, self.network.n_nodes)
+                monitor.record_runs(1)
+            return
+
+        if prefilter and self.shuffle_prob == 0 and self.n_threads == 1:
+            component = self._percolating_component()
+            if component is None:
+                if monitor is not None:
+                    monitor.record_runs(1)
+                return
+            n_component = np.count_nonzero(component)
+            if (
+                not isinstance(self.network, WeightedNetwork)
+                and n_component < RESTRICT_FRACTION * self.network.n_nodes
+            ):
+                self._evolve_restricted(np.flatnonzero(component), monitor)
+                return
+
         steps_without_transmission = 0
         steps_simulated = 0
+        halting_steps = self._halting_steps()
 
-        while steps_without_transmission < (1 / self.transmission_prob):
+        while steps_without_transmission < halting_steps:
             n_transmissions = self._update()
             steps_simulated += 1
+            if monitor is not None:
+                monitor.record_steps(1, self.network.n_nodes)
 
             if n_transmissions == 0:
                 steps_without_transmission += 1
@@ -374,7 +790,18 @@ class PercolationModel:
                 if self.has_percolated:
                     break
 
-    def estimate_percolation_prob(self, repeats=25, print_result=True):
+        if monitor is not None:
+            monitor.record_runs(1)
+
+    def estimate_percolation_prob(
+        self,
+        repeats=25,
+        print_result=True,
+        fast_path=True,
+        monitor=None,
+        seeds=None,
+        prefilter=True,
+    ):
         """Loops over evolve_until_percolated and returns the fraction of simulations
         which percolated.
 
@@ -385,6 +812,26 @@ class PercolationModel:
         print_result: bool (optional)
             Pretty-print the mean and standard error on the estimate of the percolation
             fraction.
+        fast_path: bool (optional)
+            If the outcome of a simulation can be found without evolving the model for
+            the current parameters (see the `exact` module), sample the outcomes
+            directly instead. The state of the model is then left unchanged.
+            Otherwise, if transmission is deterministic, each simulation is a single
+            breadth-first search (see `evolve_until_percolated`).
+        monitor: telemetry.ProgressMonitor (optional)
+            Records the simulations and their updates, and reports progress.
+        seeds: sequence of int (optional)
+            One seed for each simulation, with which the random number generator is
+            reseeded before the simulation starts. Passing the same seeds for
+            different values of a parameter gives common random numbers: each
+            simulation then compares the same uniform field against `inert_prob`, and
+            draws from the same stream for its transmissions (see
+            parameter_scan.scan_percolation_fraction). By default, the generator is
+            reseeded randomly once.
+        prefilter: bool (optional)
+            Skip simulations in which the nucleus is not connected to the far boundary
+            through nodes which are not inert, and only update the nodes which are
+            connected to the nucleus (see `evolve_until_percolated`).
         
         Returns
         -------
@@ -394,11 +841,7 @@ class PercolationModel:
             Estimate of the standard error on the above estimate of the percolation
             probability.
         """
-        num = 0
-        for rep in range(repeats):
-            self.init_state(reproducible=False)
-            self.evolve_until_percolated()
-            num += int(self.has_percolated)
+        num = self._count_percolated(repeats, fast_path, monitor, seeds, prefilter)
 
         frac = num / repeats
         stderr = np.sqrt(frac * (1 - frac) / (repeats - 1))
@@ -409,6 +852,37 @@ class PercolationModel:
         else:
             return frac, stderr
 
+    def _count_percolated(
+        self, repeats, fast_path=True, monitor=None, seeds=None, prefilter=True
+    ):
+        """Returns the number of `repeats` simulations which percolated. See
+        `estimate_percolation_prob` for the inputs."""
+        if monitor is not None:
+            monitor.expect(repeats)
+
+        if seeds is not None and len(seeds) != repeats:
+            raise ValueError("Please provide one seed for each simulation.")
+
+        num = None
+        if fast_path:
+            rng = np.random.default_rng(seeds) if seeds is not None else None
+            num = sample_percolation(self, repeats, rng)
+        if num is not None and monitor is not None:
+            monitor.record_runs(repeats)
+        if num is None:
+            # Reseed once, then reuse the model's arrays for every simulation
+            self._seed_rng(seed=None)
+            num = 0
+            for rep in range(repeats):
+                if seeds is not None:
+                    self._seed_rng(seed=seeds[rep])
+                self.reset()
+                self.evolve_until_percolated(
+                    first_passage=fast_path, monitor=monitor, prefilter=prefilter
+                )
+                num += int(self.has_percolated)
+        return num
+
     def loop_estimate_percolation_prob(self, repeats=25, loop=20):
         """Loops over estimate_percolation_prob, just to hide some confusing code from
         students."""
@@ -435,35 +909,10 @@ class PercolationModel:
             If provided, specifies path to a directory in which the plot will be saved
             as 'plot.png'.
         """
-        fig, ax = plt.subplots()
-        ax.set_title("Time evolution of the model")
-        ax.set_xlabel("Number of steps")
-        ax.set_ylabel("Fraction of nodes")
-        ax.plot(
-            self.susceptible_time_series,
-            color="blue",
-            label="susceptible",
-        )
-        ax.plot(
-            self.live_time_series,
-            color="red",
-            label="infected (live)",
-        )
-        ax.plot(
-            self.inert_time_series,
-            color="grey",
-            label="immune (inert)",
-        )
+        # Matplotlib is only imported when it is needed
+        from percolation.plotting import plot_sir
 
-        ax.legend()
-        fig.tight_layout()
-
-        if outpath is not None:
-            outpath = Path(outpath)
-            outpath.mkdir(parents=True, exist_ok=True)
-            fig.savefig(outpath / "sir_plot.png")
-        else:
-            plt.show()
+        plot_sir(self, outpath=outpath)
 
     def animate(self, n_steps=-1, interval=50, dynamic_overlay=False, outpath=None):
         """Evolves the model for `n_steps` iterations and produces an animation.
@@ -483,71 +932,12 @@ class PercolationModel:
             If provided, specifies path to a directory in which the plot will be saved
             as 'animation.gif'.
         """
-        if type(n_steps) is not int:
-            raise TypeError(
-                "Please provide an integer for the number of steps to animate."
-            )
-        if n_steps < 1:
-            n_steps = int(np.sqrt(self.network.n_nodes)) + 1
-
-        # For now, set cmap based on number of links
-        if self.network.n_links == 1:
-            cmap = "viridis"
-        elif self.network.n_links == 3:
-            cmap = "seismic_r"
-        else:
-            cmap = "YlOrRd"
-
-        fig, ax = plt.subplots()
-        ax.set_axis_off()
-
-        image = ax.imshow(
-            self.state,
-            norm=colors.Normalize(vmin=0, vmax=self.recovery_time),
-            zorder=0,
-            cmap=cmap,
-        )
-        overlay = ax.imshow(
-            self.inert,
-            cmap=colors.ListedColormap(["#66666600", "#666666"]),  # [transparent, grey]
-            norm=colors.Normalize(vmin=0, vmax=1),
-            zorder=1,
+        from percolation.plotting import animate
+
+        return animate(
+            self,
+            n_steps=n_steps,
+            interval=interval,
+            dynamic_overlay=dynamic_overlay,
+            outpath=outpath,
         )
-        step_counter = ax.annotate(
-            f"Step 0",
-            xy=(0, -0.11),
-            xycoords="axes fraction",
-        )
-
-        def loop_without_overlay(t):
-            if t == 0:  # otherwise the animation starts a frame late in Jupyter...
-                return image, step_counter
-            _ = self._update()
-            image.set_data(self.state)
-            step_counter.set_text(f"Step {t}")
-            return image, step_counter
-
-        def loop_with_overlay(t):
-            if t == 0:
-                return image, overlay, step_counter
-            _ = self._update()
-            image.set_data(self.state)
-            overlay.set_data(self.inert)
-            step_counter.set_text(f"Step {t}")
-            return image, overlay, step_counter
-
-        if dynamic_overlay:
-            loop = loop_with_overlay
-        else:
-            loop = loop_without_overlay
-
-        ani = animation.FuncAnimation(
-            fig, loop, frames=n_steps + 1, interval=interval, repeat=False, blit=True
-        )
-
-        if outpath is not None:
-            outpath = Path(outpath)
-            outpath.mkdir(parents=True, exist_ok=True)
-            ani.save(outpath / "animation.gif")
-
-        return ani
@@ -1,5 +1,7 @@
 import numpy as np
-from scipy.sparse import csc_matrix
+from scipy.sparse import csc_matrix, csr_matrix
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from pathlib import Path
 from typing import List, Tuple
 
 BooleanEdge = Tuple[int, int]
@@ -7,28 +9,671 @@ WeightedEdge = Tuple[float, Tuple[int, int]]
 
 
 class BooleanNetwork:
-    """ 
+    """
         Class describing a network with any shape, which can be represented as a graph.
         Connections betwen nodes are stored in an sparse adjecency matrix.
+
+        For networks which are not lattices, the initial nucleus of live nodes and the
+        'far boundary' which defines percolation must be provided explicitly, either as
+        boolean masks or as arrays of node indices.
+
+        The nodes can be renumbered so that neighbouring nodes are stored close to each
+        other (see `reorder_nodes`), in which case the original numbering is kept for
+        everything which is passed in or returned by the network.
     """
-    def __init__(self, size: int, edges: List[BooleanEdge], directed=True):
+    # Original index of each node, if the nodes have been reordered
+    _order = None
+
+    def __init__(
+        self,
+        size: int,
+        edges: List[BooleanEdge],
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+        reorder=None,
+    ):
         self.create_adjecency_matrix(size, edges, directed)
-    
+        self.set_special_nodes(nucleus, far_boundary)
+        if reorder is not None:
+            self.reorder_nodes(reorder)
+
     def create_adjecency_matrix(self, size: int, edges: List[BooleanEdge], directed=True):
+        edges = np.asarray(edges).reshape(-1, 2)
+        self._create_from_arrays(size, edges[:, 0], edges[:, 1], directed)
+
+    def _create_from_arrays(self, size: int, rows, columns, directed=True):
+        """Build the adjacency matrix from two arrays of node indices, where an edge
+        points from rows[k] to columns[k]."""
         self.shape = (size, )
 
-        data = len(edges) * [True]
-        rows, columns = zip(*edges)
-        
         self.directed = directed
         if not self.directed:
-            data *= 2
-            columns_copy = columns[:]
-            columns += rows
-            rows += columns_copy
+            rows, columns = (
+                np.concatenate((rows, columns)),
+                np.concatenate((columns, rows)),
+            )
 
+        data = np.ones(len(rows), dtype=np.bool8)
         self._matrix = csc_matrix((data, (rows, columns)), shape=2*self.shape, dtype=np.bool8)
+        self._csr = None
+        self._csc = self._matrix
+
+    def _create_from_csr(self, size: int, indptr, indices, directed=True):
+        """Use existing compressed sparse row index arrays as the adjacency matrix,
+        without copying them."""
+        self.shape = (size, )
+        self.directed = directed
+
+        data = np.ones(len(indices), dtype=np.bool8)
+        self._matrix = _csr_in_place(data, indptr, indices, 2*self.shape)
+        self._csr = self._matrix
+        self._csc = None
+
+    # ----------------------------------------------------------------------------------------
+    #                                                             | Alternative constructors |
+    #                                                             ----------------------------
+
+    @classmethod
+    def from_arrays(
+        cls,
+        size: int,
+        rows,
+        columns,
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+        reorder=None,
+    ):
+        """Create a network from two arrays of node indices, such that there is an edge
+        from rows[k] to columns[k]. This avoids building a Python list of edges, and
+        accepts any array-like including memory-mapped arrays.
+
+        Inputs
+        ------
+        size: int
+            Number of nodes in the network.
+        rows: numpy.ndarray
+            Indices of the nodes at which each edge starts.
+        columns: numpy.ndarray
+            Indices of the nodes at which each edge ends.
+        directed: bool (optional)
+            If False, each edge is also added in the reverse direction.
+        nucleus: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the initial live nodes.
+        far_boundary: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the nodes which, once reached,
+            mean that the network has percolated.
+        reorder: str (optional)
+            If given, renumber the nodes to improve locality (see `reorder_nodes`).
+        """
+        network = cls.__new__(cls)
+        network._create_from_arrays(size, rows, columns, directed)
+        network.set_special_nodes(nucleus, far_boundary)
+        if reorder is not None:
+            network.reorder_nodes(reorder)
+        return network
+
+    @classmethod
+    def from_csr(
+        cls, indptr, indices, size=None, directed=True, nucleus=None, far_boundary=None
+    ):
+        """Create a network directly from a compressed sparse row representation of the
+        adjacency matrix, where the neighbours of node i are
+        indices[indptr[i]:indptr[i+1]]. The index arrays are used as they are, without
+        copying, so they may be memory-mapped from disk.
+
+        Index arrays of type int64 are also used in place, although scipy would
+        otherwise downcast them to int32. Since no copy is made, `directed=False` is
+        only recorded; the caller is responsible for providing both directions of every
+        undirected edge.
+
+        Inputs
+        ------
+        indptr: numpy.ndarray
+            Row pointer array of length size + 1.
+        indices: numpy.ndarray
+            Column indices of the non-zero entries.
+        size: int (optional)
+            Number of nodes. By default, inferred from the length of indptr.
+        directed: bool (optional)
+            Whether the network is directed.
+        nucleus: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the initial live nodes.
+        far_boundary: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the far boundary.
+        """
+        if size is None:
+            size = len(indptr) - 1
+        if len(indptr) != size + 1:
+            raise ValueError("Please provide an indptr array of length size + 1.")
+
+        network = cls.__new__(cls)
+        network._create_from_csr(size, indptr, indices, directed)
+        network.set_special_nodes(nucleus, far_boundary)
+        return network
+
+    @classmethod
+    def from_edge_file(
+        cls,
+        path,
+        size=None,
+        dtype=np.int32,
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+        reorder=None,
+    ):
+        """Create a network from a binary edge list on disk, which is memory-mapped
+        rather than read into memory. The file should contain pairs (row, column) of
+        node indices, either as a `.npy` array of shape (n_edges, 2) or as raw binary
+        data of type `dtype`.
+
+        Inputs
+        ------
+        path: str
+            Path to the edge list.
+        size: int (optional)
+            Number of nodes. By default, one more than the largest node index.
+        dtype: numpy.dtype (optional)
+            Integer type of raw binary files. Ignored for `.npy` files.
+        directed: bool (optional)
+            If False, each edge is also added in the reverse direction.
+        nucleus: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the initial live nodes.
+        far_boundary: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the far boundary.
+        reorder: str (optional)
+            If given, renumber the nodes to improve locality (see `reorder_nodes`).
+        """
+        edges = _load_array(path, dtype).reshape(-1, 2)
+        rows, columns = edges[:, 0], edges[:, 1]
+        if size is None:
+            size = int(max(rows.max(), columns.max())) + 1
+        return cls.from_arrays(
+            size,
+            rows,
+            columns,
+            directed=directed,
+            nucleus=nucleus,
+            far_boundary=far_boundary,
+            reorder=reorder,
+        )
+
+    @classmethod
+    def from_csr_files(
+        cls,
+        indptr_path,
+        indices_path,
+        dtype=np.int32,
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+    ):
+        """Create a network by memory-mapping the `indptr` and `indices` arrays of a
+        compressed sparse row adjacency matrix, stored either as `.npy` files or as raw
+        binary data of type `dtype`. No copy of either array is made.
+
+        See `from_csr` for details of the remaining inputs.
+        """
+        indptr = _load_array(indptr_path, dtype)
+        indices = _load_array(indices_path, dtype)
+        return cls.from_csr(
+            indptr,
+            indices,
+            directed=directed,
+            nucleus=nucleus,
+            far_boundary=far_boundary,
+        )
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                 | Read-only properties |
+    #                                                                 ------------------------
 
     @property
     def matrix(self):
-        return self._matrix
\ No newline at end of file
+        return self._matrix
+
+    @property
+    def csr(self):
+        """The adjacency matrix in compressed sparse row format, so that the neighbours
+        of node i are csr.indices[csr.indptr[i]:csr.indptr[i+1]]. Converted from the
+        stored matrix and cached on first access if necessary."""
+        if self._csr is None:
+            self._csr = self._matrix.tocsr()
+        return self._csr
+
+    @property
+    def csc(self):
+        """The adjacency matrix in compressed sparse column format, so that the nodes
+        with an edge leading to node j are csc.indices[csc.indptr[j]:csc.indptr[j+1]].
+        Converted from the stored matrix and cached on first access if necessary."""
+        if self._csc is None:
+            self._csc = self._matrix.tocsc()
+        return self._csc
+
+    @property
+    def n_nodes(self):
+        """Number of nodes in the network."""
+        return self.shape[0]
+
+    @property
+    def node_order(self):
+        """Original index of each node, if the nodes have been reordered, or None."""
+        return self._order
+
+    @property
+    def far_boundary_mask(self):
+        """A boolean mask which selects the nodes at the 'far' boundary, in the original
+        numbering of the nodes."""
+        return self.to_original(self._far_boundary)
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                       | Public methods |
+    #                                                                       ------------------
+
+    def set_special_nodes(self, nucleus=None, far_boundary=None):
+        """Set the initial nucleus of live nodes and the far boundary of the network.
+
+        Inputs
+        ------
+        nucleus: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the initial live nodes.
+        far_boundary: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the far boundary.
+        """
+        self._nucleus_mask = self.from_original(self._as_mask(nucleus))
+        self._far_boundary_mask = self.from_original(self._as_mask(far_boundary))
+
+    def reorder_nodes(self, method="rcm"):
+        """Renumbers the nodes so that nodes which share an edge tend to have nearby
+        indices, which improves the locality of memory accesses in each update of a
+        network whose nodes were numbered arbitrarily. The adjacency matrix, nucleus and
+        far boundary are permuted in place, and the permutation is kept, so that
+        `lexi_to_cart`, and hence PercolationModel.state and inert, as well as
+        `far_boundary_mask` and `get_nucleus_mask`, return arrays in the original
+        numbering. Nuclei and far boundaries set afterwards are also given in
+        the original numbering. Reordering an already reordered network composes the
+        permutations. Random numbers are drawn in the new order of the nodes, so a
+        given seed gives a different (but equally likely) simulation.
+
+        Inputs
+        ------
+        method: str (optional)
+            'rcm' for the reverse Cuthill-McKee ordering, which minimises the bandwidth
+            of the adjacency matrix, or 'bfs' for a breadth-first ordering starting
+            from the nucleus, so that the live nodes of a spreading front are close to
+            contiguous. Edges are followed in both directions.
+        """
+        csr = self.csr
+        if method == "rcm":
+            order = reverse_cuthill_mckee(csr, symmetric_mode=False)
+        elif method == "bfs":
+            nucleus = getattr(self, "_nucleus_mask", None)
+            order = _breadth_first_order(
+                csr, np.flatnonzero(nucleus) if nucleus is not None else []
+            )
+        else:
+            raise ValueError("Please choose a reordering method from 'rcm' or 'bfs'.")
+        order = order.astype(np.int64)
+
+        permuted = csr[order][:, order]
+        if isinstance(self._matrix, csc_matrix):
+            self._matrix = permuted.tocsc()
+            self._csr, self._csc = permuted, self._matrix
+        else:
+            self._matrix = permuted
+            self._csr, self._csc = permuted, None
+
+        for name in ("_nucleus_mask", "_far_boundary_mask"):
+            mask = getattr(self, name, None)
+            if mask is not None:
+                setattr(self, name, mask[order])
+        self._order = order if self._order is None else self._order[order]
+
+    def to_original(self, values):
+        """Returns an array with one element per node, such as the state, in the
+        original numbering of the nodes. See `reorder_nodes`."""
+        if self._order is None or values is None:
+            return values
+        original = np.empty_like(values)
+        original[self._order] = values
+        return original
+
+    def from_original(self, values):
+        """Inverse of `to_original`: returns an array with one element per node, given
+        in the original numbering, in the numbering used by the network."""
+        if self._order is None or values is None:
+            return values
+        return np.asarray(values)[self._order]
+
+    def out_edges(self, nodes):
+        """Returns the edges leaving a set of nodes, gathered without looping over the
+        nodes in Python.
+
+        Inputs
+        ------
+        nodes: numpy.ndarray
+            Indices of the nodes whose outgoing edges are required.
+
+        Returns
+        -------
+        edges: numpy.ndarray
+            Positions of the edges in the data array of `self.csr`.
+        targets: numpy.ndarray
+            Indices of the nodes at which each edge ends.
+        """
+        indptr = self.csr.indptr
+        starts = indptr[nodes]
+        counts = indptr[nodes + 1] - starts
+        # Offset of each edge from the start of its own node's block
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        edges = np.repeat(starts, counts) + offsets
+        return edges, self.csr.indices[edges]
+
+    def in_edges(self, nodes):
+        """Returns the edges arriving at a set of nodes. As for `out_edges`, with
+        `edges` indexing the data array of `self.csc` and `sources` giving the indices of
+        the nodes at which each edge starts."""
+        indptr = self.csc.indptr
+        starts = indptr[nodes]
+        counts = indptr[nodes + 1] - starts
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        edges = np.repeat(starts, counts) + offsets
+        return edges, self.csc.indices[edges]
+
+    def subnetwork(self, nodes, nucleus=None):
+        """Returns the subgraph induced by a set of nodes as a BooleanNetwork, whose node
+        k is node nodes[k] of this network. The far boundary is restricted to the
+        subgraph.
+
+        Inputs
+        ------
+        nodes: numpy.ndarray
+            Indices of the nodes to keep, in increasing order.
+        nucleus: numpy.ndarray (optional)
+            Boolean mask or array of indices selecting the initial live nodes of the
+            subgraph.
+        """
+        csr = self.csr[nodes][:, nodes]
+        return BooleanNetwork.from_csr(
+            csr.indptr,
+            csr.indices,
+            size=len(nodes),
+            directed=getattr(self, "directed", True),
+            nucleus=nucleus,
+            far_boundary=self._far_boundary[nodes],
+        )
+
+    def lexi_to_cart(self, state_lexi):
+        """A general network has no Cartesian representation, so the state is returned
+        as a one dimensional array, in the original numbering of the nodes."""
+        return self.to_original(state_lexi)
+
+    def get_nucleus_mask(self, nucleus_size=1):
+        """Returns the 1d boolean mask which selects the initial live nodes, in the
+        original numbering of the nodes. The nucleus is fixed when the network is
+        created, so `nucleus_size` is ignored."""
+        return self.to_original(self._get_nucleus(nucleus_size))
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                    | Protected methods |
+    #                                                                    ---------------------
+
+    @property
+    def _far_boundary(self):
+        """As `far_boundary_mask`, in the numbering used by the network, which is the
+        one the state of a model is stored in."""
+        if self._far_boundary_mask is None:
+            raise ValueError("No far boundary was provided for this network.")
+        return self._far_boundary_mask
+
+    def _get_nucleus(self, nucleus_size=1):
+        """As `get_nucleus_mask`, in the numbering used by the network."""
+        if self._nucleus_mask is None:
+            raise ValueError("No nucleus was provided for this network.")
+        return self._nucleus_mask
+
+    def _shared_arrays(self):
+        """Returns the arrays which describe the network, and a dict of other
+        attributes, from which `_from_shared_arrays` can rebuild it. Used by
+        shared.SharedNetwork to publish the network to other processes."""
+        arrays = {}
+        for name, matrix in (("csr", self.csr), ("csc", self.csc)):
+            arrays[f"{name}_indptr"] = matrix.indptr
+            arrays[f"{name}_indices"] = matrix.indices
+            arrays[f"{name}_data"] = matrix.data
+        for name in ("nucleus", "far_boundary"):
+            mask = getattr(self, f"_{name}_mask", None)
+            if mask is not None:
+                arrays[name] = mask
+        if self._order is not None:
+            arrays["order"] = self._order
+        return arrays, {"size": self.n_nodes, "directed": self.directed}
+
+    @classmethod
+    def _from_shared_arrays(cls, arrays, attributes):
+        """Rebuilds a network from the output of `_shared_arrays`, using the arrays as
+        they are, without copying them."""
+        network = cls.__new__(cls)
+        network.shape = (attributes["size"],)
+        network.directed = attributes["directed"]
+
+        network._csr = csr_matrix(
+            (arrays["csr_data"], arrays["csr_indices"], arrays["csr_indptr"]),
+            shape=2 * network.shape,
+            copy=False,
+        )
+        network._csc = csc_matrix(
+            (arrays["csc_data"], arrays["csc_indices"], arrays["csc_indptr"]),
+            shape=2 * network.shape,
+            copy=False,
+        )
+        network._matrix = network._csc
+        network._nucleus_mask = arrays.get("nucleus")
+        network._far_boundary_mask = arrays.get("far_boundary")
+        network._order = arrays.get("order")
+        return network
+
+    def _as_mask(self, nodes):
+        """Convert a boolean mask or an array of node indices to a boolean mask."""
+        if nodes is None:
+            return None
+        nodes = np.asarray(nodes)
+        if nodes.dtype == bool:
+            if nodes.shape != self.shape:
+                raise ValueError("Please provide a mask with one element per node.")
+            return nodes
+        mask = np.zeros(self.shape, dtype=bool)
+        mask[nodes] = True
+        return mask
+
+
+class WeightedNetwork(BooleanNetwork):
+    """
+        Class describing a network in which each edge carries its own probability of
+        transmission. The probabilities are stored as the values of a sparse adjacency
+        matrix in compressed sparse row format.
+
+        Edges are given as (weight, (i, j)) tuples. Duplicate edges should not be
+        provided, since their weights would be summed.
+    """
+    def __init__(
+        self,
+        size: int,
+        edges: List[WeightedEdge],
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+    ):
+        weights = np.array([weight for weight, _ in edges], dtype=float)
+        pairs = np.array([pair for _, pair in edges]).reshape(-1, 2)
+        self._create_from_weighted_arrays(size, pairs[:, 0], pairs[:, 1], weights, directed)
+        self.set_special_nodes(nucleus, far_boundary)
+
+    def _create_from_weighted_arrays(self, size: int, rows, columns, weights, directed=True):
+        """Build the weighted adjacency matrix, where the edge from rows[k] to columns[k]
+        has a probability of transmission weights[k]."""
+        weights = np.asarray(weights, dtype=float)
+        if np.any(weights < 0) or np.any(weights > 1):
+            raise ValueError("Please provide edge weights between 0 and 1.")
+
+        self.shape = (size, )
+        self.directed = directed
+        if not self.directed:
+            rows, columns = (
+                np.concatenate((rows, columns)),
+                np.concatenate((columns, rows)),
+            )
+            weights = np.concatenate((weights, weights))
+
+        self._matrix = csr_matrix((weights, (rows, columns)), shape=2*self.shape)
+        self._csr = self._matrix
+        self._csc = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        size: int,
+        rows,
+        columns,
+        weights,
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+    ):
+        """Create a weighted network from arrays of node indices and weights, such that
+        there is an edge from rows[k] to columns[k] with a probability of transmission
+        weights[k]. See `BooleanNetwork.from_arrays` for the remaining inputs."""
+        network = cls.__new__(cls)
+        network._create_from_weighted_arrays(size, rows, columns, weights, directed)
+        network.set_special_nodes(nucleus, far_boundary)
+        return network
+
+    @classmethod
+    def from_csr(
+        cls,
+        indptr,
+        indices,
+        weights,
+        size=None,
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+    ):
+        """Create a weighted network from compressed sparse row arrays, where `weights`
+        holds the probability of transmission along each edge. The arrays are used
+        without copying. See `BooleanNetwork.from_csr` for the remaining inputs."""
+        if size is None:
+            size = len(indptr) - 1
+        if len(indptr) != size + 1:
+            raise ValueError("Please provide an indptr array of length size + 1.")
+
+        network = cls.__new__(cls)
+        network.shape = (size, )
+        network.directed = directed
+        network._matrix = _csr_in_place(weights, indptr, indices, 2*network.shape)
+        network._csr = network._matrix
+        network._csc = None
+        network.set_special_nodes(nucleus, far_boundary)
+        return network
+
+    @classmethod
+    def from_edge_file(
+        cls,
+        path,
+        size=None,
+        dtype=np.int32,
+        weights_dtype=np.float64,
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+    ):
+        """Create a weighted network from a binary edge list on disk, which is
+        memory-mapped rather than read into memory. The file should contain records
+        (row, column, weight), either as a `.npy` structured array or as raw binary
+        data with fields of type `dtype`, `dtype` and `weights_dtype`. See
+        `BooleanNetwork.from_edge_file` for the remaining inputs."""
+        record = np.dtype([("row", dtype), ("column", dtype), ("weight", weights_dtype)])
+        edges = _load_array(path, record)
+        rows, columns, weights = (edges[name] for name in edges.dtype.names)
+        if size is None:
+            size = int(max(rows.max(), columns.max())) + 1
+        return cls.from_arrays(
+            size,
+            rows,
+            columns,
+            weights,
+            directed=directed,
+            nucleus=nucleus,
+            far_boundary=far_boundary,
+        )
+
+    @classmethod
+    def from_csr_files(
+        cls,
+        indptr_path,
+        indices_path,
+        weights_path,
+        dtype=np.int32,
+        weights_dtype=np.float64,
+        directed=True,
+        nucleus=None,
+        far_boundary=None,
+    ):
+        """Create a weighted network by memory-mapping the `indptr`, `indices` and
+        weights arrays of a compressed sparse row adjacency matrix. See
+        `BooleanNetwork.from_csr_files` for details."""
+        return cls.from_csr(
+            _load_array(indptr_path, dtype),
+            _load_array(indices_path, dtype),
+            _load_array(weights_path, weights_dtype),
+            directed=directed,
+            nucleus=nucleus,
+            far_boundary=far_boundary,
+        )
+
+    @property
+    def weights(self):
+        """Probability of transmission along each edge, in the order of the data array
+        of `self.csr`."""
+        return self.csr.data
+
+
+def _breadth_first_order(csr, starts):
+    """Order in which a breadth-first search visits the nodes, following edges in both
+    directions, from `starts`, and then from the first node not yet visited until every
+    node has been visited."""
+    n_nodes = csr.shape[0]
+    symmetric = (csr + csr.T).tocsr()
+    visited = np.zeros(n_nodes, dtype=bool)
+    order = []
+    n_visited = 0
+    frontier = np.unique(np.asarray(starts, dtype=np.int64))
+    while n_visited < n_nodes:
+        if frontier.size == 0:
+            frontier = np.flatnonzero(~visited)[:1]
+        visited[frontier] = True
+        order.append(frontier)
+        n_visited += frontier.size
+        neighbours = symmetric[frontier].indices
+        frontier = np.unique(neighbours[~visited[neighbours]])
+    return np.concatenate(order)
+
+
+def _csr_in_place(data, indptr, indices, shape):
+    """Wrap existing compressed sparse row arrays as a matrix without copying them."""
+    matrix = csr_matrix((data, indices, indptr), shape=shape, copy=False)
+    # scipy may downcast the index arrays, which would silently copy them
+    if not np.shares_memory(matrix.indices, indices):
+        matrix.indices = indices
+        matrix.indptr = indptr
+    return matrix
+
+
+def _load_array(path, dtype):
+    """Memory-map a one dimensional array from a `.npy` file or raw binary file."""
+    path = Path(path)
+    if path.suffix == ".npy":
+        return np.load(path, mmap_mode="r")
+    return np.memmap(path, dtype=dtype, mode="r")
@@ -0,0 +1,421 @@
+import numpy as np
+import scipy.ndimage as ndimage
+import scipy.sparse as sparse
+from scipy.sparse.csgraph import connected_components
+
+from percolation.lattice import SquareLattice
+
+
+class ClusterStatistics:
+    """Accumulates cluster observables over an ensemble of configurations of a network.
+
+    A cluster is a set of occupied (i.e. not inert) nodes which are connected by edges
+    of the network, regardless of their direction. Configurations are added in batches,
+    and every batch is labelled in a single pass: by scipy.ndimage.label for a square
+    lattice, with the batch stacked along an extra axis which has no connections, or by
+    scipy.sparse.csgraph.connected_components for a general network, with the batch
+    treated as one large graph made of disconnected copies of the network.
+
+    Inputs
+    ------
+    network: networks.BooleanNetwork
+        The network whose clusters are to be measured.
+    """
+
+    def __init__(self, network):
+        self.network = network
+
+        if isinstance(network, SquareLattice):
+            # Nearest neighbours along each axis which has links, in the middle plane
+            axes = {axis for _, axis in network.links}
+            self._structure = np.zeros((3, 3, 3), dtype=bool)
+            self._structure[1, 1, 1] = True
+            if 0 in axes:
+                self._structure[1, :, 1] = True
+            if 1 in axes:
+                self._structure[1, 1, :] = True
+            self._axes = axes
+        else:
+            coo = network.matrix.tocoo()
+            self._rows, self._cols = coo.row, coo.col
+
+        self.reset()
+
+    def reset(self):
+        """Discards all of the configurations added so far."""
+        self.n_samples = 0
+        self._size_counts = np.zeros(self.network.n_nodes + 1, dtype=np.int64)
+        self._largest = np.zeros(2)  # sum and sum of squares
+        self._finite = np.zeros(2)
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                    | Protected methods |
+    #                                                                    ---------------------
+
+    def _label_lattice(self, occupied):
+        """Labels the clusters of a batch of configurations on a square lattice. Returns
+        an array of labels, with 0 for unoccupied nodes, and the number of labels."""
+        lattice = self.network
+        occupied = occupied.reshape(-1, lattice.n_rows, lattice.n_cols)
+        labels, n_labels = ndimage.label(occupied, structure=self._structure)
+
+        if not lattice.periodic or n_labels == 0:
+            return labels.reshape(len(occupied), -1), n_labels
+
+        # Clusters which touch opposite boundaries are joined across the boundary
+        pairs = []
+        if 0 in self._axes:
+            pairs.append((labels[:, 0, :], labels[:, -1, :]))
+        if 1 in self._axes:
+            pairs.append((labels[:, :, 0], labels[:, :, -1]))
+        first = np.concatenate([a[(a > 0) & (b > 0)] for a, b in pairs])
+        second = np.concatenate([b[(a > 0) & (b > 0)] for a, b in pairs])
+
+        graph = sparse.coo_matrix(
+            (np.ones(first.size, dtype=bool), (first, second)),
+            shape=(n_labels + 1, n_labels + 1),
+        )
+        n_labels, merged = connected_components(graph, directed=False)
+        labels = np.where(labels > 0, merged[labels] + 1, 0)
+        return labels.reshape(len(occupied), -1), n_labels
+
+    def _label_network(self, occupied):
+        """Labels the clusters of a batch of configurations on a general network. Returns
+        an array of labels, with 0 for unoccupied nodes, and the number of labels."""
+        batch_size, n_nodes = occupied.shape
+
+        # Keep the edges whose ends are both occupied, in each copy of the network
+        keep = occupied[:, self._rows] & occupied[:, self._cols]
+        sample, edge = np.nonzero(keep)
+        offset = sample * n_nodes
+        graph = sparse.coo_matrix(
+            (
+                np.ones(edge.size, dtype=bool),
+                (self._rows[edge] + offset, self._cols[edge] + offset),
+            ),
+            shape=(batch_size * n_nodes, batch_size * n_nodes),
+        )
+        n_labels, labels = connected_components(graph, directed=False)
+        labels = np.where(occupied.ravel(), labels + 1, 0)
+        return labels.reshape(batch_size, n_nodes), n_labels
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                       | Public methods |
+    #                                                                       ------------------
+
+    def label(self, occupied):
+        """Labels the clusters of a batch of configurations.
+
+        Inputs
+        ------
+        occupied: numpy.ndarray
+            Boolean array of shape (batch size, number of nodes), or (number of nodes,)
+            for a single configuration, which is True for occupied nodes.
+
+        Returns
+        -------
+        labels: numpy.ndarray
+            Integer array of shape (batch size, number of nodes), in which the nodes of
+            each cluster share a label. Unoccupied nodes are labelled 0, and labels are
+            not shared between configurations.
+        n_labels: int
+            Upper bound on the labels.
+        """
+        occupied = np.atleast_2d(np.asarray(occupied, dtype=bool))
+        if isinstance(self.network, SquareLattice):
+            return self._label_lattice(occupied)
+        return self._label_network(occupied)
+
+    def add(self, occupied):
+        """Labels a batch of configurations and adds their clusters to the statistics.
+        See `label` for the input."""
+        labels, n_labels = self.label(occupied)
+        batch_size, n_nodes = labels.shape
+
+        # Size of each cluster and the configuration it belongs to
+        sizes = np.bincount(labels.ravel(), minlength=n_labels + 1)
+        owner = np.zeros(n_labels + 1, dtype=np.int64)
+        owner[labels] = np.arange(batch_size)[:, None]
+        sizes, owner = sizes[1:], owner[1:]
+        owner, sizes = owner[sizes > 0], sizes[sizes > 0]
+
+        self._size_counts += np.bincount(sizes, minlength=n_nodes + 1)
+
+        largest = np.zeros(batch_size, dtype=np.int64)
+        np.maximum.at(largest, owner, sizes)
+
+        # Mean size of the cluster containing a random occupied node, excluding the
+        # largest cluster of each configuration
+        s1 = np.bincount(owner, weights=sizes, minlength=batch_size) - largest
+        s2 = np.bincount(owner, weights=sizes ** 2, minlength=batch_size) - largest ** 2
+        finite = np.divide(s2, s1, out=np.zeros(batch_size), where=s1 > 0)
+
+        fraction = largest / n_nodes
+        self._largest += (fraction.sum(), (fraction ** 2).sum())
+        self._finite += (finite.sum(), (finite ** 2).sum())
+        self.n_samples += batch_size
+
+    def add_model(self, model):
+        """Adds the current configuration of a model, whose occupied nodes are those
+        which are not inert."""
+        self.add(~model._inert)
+
+    def sample(self, inert_prob, n_samples, batch_size=100, seed=None):
+        """Adds `n_samples` random configurations in which each node is inert with
+        probability `inert_prob`, in batches of `batch_size`.
+
+        Inputs
+        ------
+        inert_prob: float
+            Probability for each node to be inert (unoccupied).
+        n_samples: int
+            Number of configurations.
+        batch_size: int (optional)
+            Number of configurations labelled together.
+        seed: int (optional)
+            Seed for the random number generator.
+        """
+        rng = np.random.default_rng(seed)
+        for start in range(0, n_samples, batch_size):
+            size = min(batch_size, n_samples - start)
+            self.add(rng.random((size, self.network.n_nodes)) >= inert_prob)
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                 | Read-only properties |
+    #                                                                 ------------------------
+
+    @property
+    def cluster_size_histogram(self):
+        """Total number of clusters of each size, indexed by size, summed over every
+        configuration added so far."""
+        return self._size_counts.copy()
+
+    @property
+    def cluster_size_distribution(self):
+        """Mean number of clusters of each size per node, n_s, indexed by size s."""
+        return self._size_counts / (max(self.n_samples, 1) * self.network.n_nodes)
+
+    @property
+    def largest_cluster_fraction(self):
+        """Mean fraction of nodes belonging to the largest cluster, and its standard
+        error."""
+        return _mean_and_stderr(self._largest, self.n_samples)
+
+    @property
+    def mean_cluster_size(self):
+        """Mean size of the cluster containing a randomly chosen occupied node, excluding
+        the largest cluster, and its standard error."""
+        return _mean_and_stderr(self._finite, self.n_samples)
+
+
+class CorrelationFunction:
+    """Accumulates the two-point correlation function of a field on a square lattice,
+    such as the live or inert nodes, over an ensemble of configurations.
+
+    The connected correlation function is
+
+        C(r) = < s(x) s(x + r) > - < s >^2
+
+    where s is the field, r is a displacement on the lattice and the averages are over
+    every pair of nodes separated by r in every configuration. The sum over pairs of
+    each configuration is its autocorrelation, which is computed for a whole batch of
+    configurations at once with the fast Fourier transform. The autocorrelation wraps
+    around on a periodic lattice, while on an open lattice the configurations are padded
+    with zeros to twice their size, so that no pairs wrap around, and the number of
+    pairs separated by each displacement is found in the same way from a field of ones.
+    The correlation length is estimated from the structure factor at the smallest wave
+    vectors, which is accumulated alongside.
+
+    Inputs
+    ------
+    lattice: lattice.SquareLattice
+        The lattice on which the field lives.
+    """
+
+    def __init__(self, lattice):
+        if not isinstance(lattice, SquareLattice):
+            raise ValueError("Correlation functions require a SquareLattice.")
+        self.network = lattice
+
+        n_rows, n_cols = lattice.n_rows, lattice.n_cols
+        if lattice.periodic:
+            self._shape = (n_rows, n_cols)
+        else:
+            self._shape = (2 * n_rows, 2 * n_cols)
+        self._pairs = np.rint(self._autocorrelate(np.ones((1, n_rows, n_cols)))[0])
+        self._has_pairs = self._pairs > 0
+
+        # Fourier modes with the smallest non-zero wave vector along each axis
+        self._phases = [
+            np.exp(-2j * np.pi * np.arange(n) / n) for n in (n_rows, n_cols)
+        ]
+
+        # Displacement represented by each element of the autocorrelation, with the
+        # shortest distance across the boundary of a periodic lattice
+        rows, cols = (np.fft.fftfreq(n, 1 / n) for n in self._shape)
+        self._distance = np.hypot(rows[:, None], cols[None, :])
+
+        self.reset()
+
+    def reset(self):
+        """Discards all of the configurations added so far."""
+        self.n_samples = 0
+        self._total = 0.0
+        self._total_squares = 0.0
+        self._modes = np.zeros(2)  # sum of |F(k)|^2 along the rows and columns
+        self._products = np.zeros(self._shape)
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                    | Protected methods |
+    #                                                                    ---------------------
+
+    def _autocorrelate(self, maps):
+        """Autocorrelation of each of a batch of 2d maps, of shape self._shape."""
+        transform = np.fft.rfft2(maps, s=self._shape)
+        return np.fft.irfft2(np.abs(transform) ** 2, s=self._shape)
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                       | Public methods |
+    #                                                                       ------------------
+
+    def add(self, field):
+        """Adds a batch of configurations of the field to the statistics.
+
+        Inputs
+        ------
+        field: numpy.ndarray
+            Array of shape (batch size, number of nodes), or (number of nodes,) for a
+            single configuration, which holds the value of the field at each node, e.g.
+            True for live nodes.
+        """
+        lattice = self.network
+        maps = np.asarray(field, dtype=np.float64).reshape(
+            -1, lattice.n_rows, lattice.n_cols
+        )
+        self._products += self._autocorrelate(maps).sum(axis=0)
+
+        totals = maps.sum(axis=(1, 2))
+        self._total += totals.sum()
+        self._total_squares += (totals ** 2).sum()
+        for axis, phase in enumerate(self._phases):
+            modes = maps.sum(axis=2 - axis) @ phase
+            self._modes[axis] += (np.abs(modes) ** 2).sum()
+        self.n_samples += len(maps)
+
+    def add_model(self, model, field="live"):
+        """Adds the current configuration of a model, where the field is one for the
+        nodes which are `field` ('live' or 'inert') and zero otherwise."""
+        if field == "live":
+            self.add(model._state > 0)
+        elif field == "inert":
+            self.add(model._inert)
+        else:
+            raise ValueError("Please choose a field from 'live' or 'inert'.")
+
+    def sample_model(
+        self,
+        model,
+        n_samples,
+        field="live",
+        batch_size=100,
+        first_passage=True,
+        prefilter=False,
+    ):
+        """Evolves the model from `n_samples` new initial states until it percolates or
+        transmission halts, and adds the final configurations in batches of
+        `batch_size`. See `add_model` for the field, and
+        PercolationModel.evolve_until_percolated for `first_passage` and `prefilter`.
+        With the prefilter, runs which cannot percolate are added in their initial
+        state, so it is off by default."""
+        if field not in ("live", "inert"):
+            raise ValueError("Please choose a field from 'live' or 'inert'.")
+        batch = np.empty((min(batch_size, n_samples), model.network.n_nodes), dtype=bool)
+        n_batch = 0
+        for _ in range(n_samples):
+            model.reset()
+            model.evolve_until_percolated(
+                first_passage=first_passage, prefilter=prefilter
+            )
+            batch[n_batch] = model._state > 0 if field == "live" else model._inert
+            n_batch += 1
+            if n_batch == len(batch):
+                self.add(batch)
+                n_batch = 0
+        if n_batch > 0:
+            self.add(batch[:n_batch])
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                 | Read-only properties |
+    #                                                                 ------------------------
+
+    @property
+    def mean(self):
+        """Mean of the field over every node of every configuration."""
+        return self._total / (max(self.n_samples, 1) * self.network.n_nodes)
+
+    @property
+    def correlation_map(self):
+        """Connected correlation C(r) for each displacement r = (rows, columns), indexed
+        as the output of numpy.fft.fft2, so that negative displacements come after the
+        positive ones. Displacements which no pair of nodes has are NaN."""
+        products = np.divide(
+            self._products,
+            self._pairs * max(self.n_samples, 1),
+            out=np.full(self._shape, np.nan),
+            where=self._has_pairs,
+        )
+        return products - self.mean ** 2
+
+    @property
+    def radial_correlation(self):
+        """Distances r = 0, 1, 2, ... and the connected correlation at each of them,
+        averaged over the pairs of nodes whose separation rounds to r."""
+        bins = np.rint(self._distance[self._has_pairs]).astype(np.int64)
+        weights = self._pairs[self._has_pairs]
+        correlation = self.correlation_map[self._has_pairs]
+        counts = np.bincount(bins, weights=weights)
+        sums = np.bincount(bins, weights=weights * correlation)
+        radial = np.divide(
+            sums, counts, out=np.full(counts.size, np.nan), where=counts > 0
+        )
+        return np.arange(counts.size), radial
+
+    @property
+    def structure_factor(self):
+        """Structure factor S(k) = < |sum_x (s(x) - < s >) exp(-i k.x)|^2 > / N, where N is
+        the number of nodes, at k = 0 and at the smallest non-zero wave vector along the
+        rows and along the columns, as an array [S(0), S(k_rows), S(k_cols)]."""
+        n = max(self.n_samples, 1)
+        n_nodes = self.network.n_nodes
+        total = self._total / n
+        s0 = (self._total_squares / n - total ** 2) / n_nodes
+        return np.array([s0, *(self._modes / (n * n_nodes))])
+
+    @property
+    def correlation_length(self):
+        """Second-moment correlation lengths along the rows and along the columns,
+        estimated from the structure factor as
+
+            xi^2 = (S(0) / S(k) - 1) / (4 sin^2(k / 2))
+
+        with k = 2 pi / L the smallest wave vector along a side of length L. This
+        equals the second moment of C(r) for an infinite lattice, without the noise
+        of summing C(r) over every displacement. Lengths are NaN where S(k) is zero."""
+        s0, *sk = self.structure_factor
+        lengths = []
+        for side, s in zip((self.network.n_rows, self.network.n_cols), sk):
+            if not s > 0:
+                lengths.append(np.nan)
+                continue
+            xi2 = (s0 / s - 1) / (4 * np.sin(np.pi / side) ** 2)
+            lengths.append(np.sqrt(max(xi2, 0)))
+        return np.array(lengths)
+
+
+def _mean_and_stderr(sums, n):
+    """Mean and standard error from a sum and sum of squares over n samples."""
+    if n == 0:
+        return np.nan, np.nan
+    mean = sums[0] / n
+    var = max(sums[1] / n - mean ** 2, 0)
+    return mean, np.sqrt(var / max(n - 1, 1))
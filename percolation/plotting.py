@@ -0,0 +1,343 @@
+import numpy as np
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+from matplotlib import colors, animation
+from pathlib import Path
+
+
+plt.style.use(Path(__file__).resolve().parent / "p1b.mplstyle")
+
+
+def plot_sir(model, outpath=None):
+    """Plots the time evolution of the model.
+
+    More specifically, plots the evolution of the fraction of nodes that are (a)
+    susceptible, (b) live, and (c) inert. This can be seen as a 'susceptible-
+    infected-removed' plot if we interpret the simulation as an epidem model.
+
+    Inputs
+    ------
+    model: model.PercolationModel
+        The model whose time series' are plotted.
+    outpath: str (optional)
+        If provided, specifies path to a directory in which the plot will be saved
+        as 'plot.png'.
+    """
+    fig, ax = plt.subplots()
+    ax.set_title("Time evolution of the model")
+    ax.set_xlabel("Number of steps")
+    ax.set_ylabel("Fraction of nodes")
+    ax.plot(
+        model.susceptible_time_series,
+        color="blue",
+        label="susceptible",
+    )
+    ax.plot(
+        model.live_time_series,
+        color="red",
+        label="infected (live)",
+    )
+    ax.plot(
+        model.inert_time_series,
+        color="grey",
+        label="immune (inert)",
+    )
+
+    ax.legend()
+    fig.tight_layout()
+
+    if outpath is not None:
+        outpath = Path(outpath)
+        outpath.mkdir(parents=True, exist_ok=True)
+        fig.savefig(outpath / "sir_plot.png")
+    else:
+        plt.show()
+
+
+def animate(model, n_steps=-1, interval=50, dynamic_overlay=False, outpath=None):
+    """Evolves the model for `n_steps` iterations and produces an animation.
+
+    Inputs
+    ------
+    model: model.PercolationModel
+        The model to evolve. Its network must have a 2d Cartesian representation.
+    n_steps: int (optional)
+        Number of updates. By default, equal to the square root of the number of
+        nodes, plus 1.
+    interval: int (optional)
+        Number of millisconds delay between each update.
+    dynamic_overlay: bool (optional)
+        If True, updates the overlay of inert nodes as well as the live nodes.
+        This is useful if you have set recovered_are_inert and care about the
+        recovered nodes taking the same colour as the initial inert ones.
+    outpath: str (optional)
+        If provided, specifies path to a directory in which the plot will be saved
+        as 'animation.gif'.
+    """
+    if type(n_steps) is not int:
+        raise TypeError(
+            "Please provide an integer for the number of steps to animate."
+        )
+    if n_steps < 1:
+        n_steps = int(np.sqrt(model.network.n_nodes)) + 1
+
+    # For now, set cmap based on number of links
+    if model.network.n_links == 1:
+        cmap = "viridis"
+    elif model.network.n_links == 3:
+        cmap = "seismic_r"
+    else:
+        cmap = "YlOrRd"
+
+    fig, ax = plt.subplots()
+    ax.set_axis_off()
+
+    image = ax.imshow(
+        model.state,
+        norm=colors.Normalize(vmin=0, vmax=model.recovery_time),
+        zorder=0,
+        cmap=cmap,
+    )
+    overlay = ax.imshow(
+        model.inert,
+        cmap=colors.ListedColormap(["#66666600", "#666666"]),  # [transparent, grey]
+        norm=colors.Normalize(vmin=0, vmax=1),
+        zorder=1,
+    )
+    step_counter = ax.annotate(
+        f"Step 0",
+        xy=(0, -0.11),
+        xycoords="axes fraction",
+    )
+
+    def loop_without_overlay(t):
+        if t == 0:  # otherwise the animation starts a frame late in Jupyter...
+            return image, step_counter
+        _ = model._update()
+        image.set_data(model.state)
+        step_counter.set_text(f"Step {t}")
+        return image, step_counter
+
+    def loop_with_overlay(t):
+        if t == 0:
+            return image, overlay, step_counter
+        _ = model._update()
+        image.set_data(model.state)
+        overlay.set_data(model.inert)
+        step_counter.set_text(f"Step {t}")
+        return image, overlay, step_counter
+
+    if dynamic_overlay:
+        loop = loop_with_overlay
+    else:
+        loop = loop_without_overlay
+
+    ani = animation.FuncAnimation(
+        fig, loop, frames=n_steps + 1, interval=interval, repeat=False, blit=True
+    )
+
+    if outpath is not None:
+        outpath = Path(outpath)
+        outpath.mkdir(parents=True, exist_ok=True)
+        ani.save(outpath / "animation.gif")
+
+    return ani
+
+
+def plot_parameter_scan(
+    values,
+    percolation_fraction,
+    errors,
+    fit_x,
+    fit_values,
+    residuals,
+    label,
+    parameter="inert_prob",
+    outpath=None,
+    filename="parameter_scan.png",
+):
+    """Plots the results of a parameter scan, along with a theoretical or best-fit
+    curve and the residuals.
+
+    Inputs
+    ------
+    values: numpy.ndarray
+        Values of the parameter which were scanned over.
+    percolation_fraction: numpy.ndarray
+        Fraction of simulations which percolated for each value of the parameter.
+    errors: numpy.ndarray
+        Standard errors on the percolation fractions.
+    fit_x: numpy.ndarray
+        Values of the parameter at which the curve is evaluated.
+    fit_values: numpy.ndarray
+        Values of the curve.
+    residuals: numpy.ndarray
+        Percolation fractions minus the curve evaluated at `values`.
+    label: str
+        Legend label for the curve.
+    parameter: str (optional)
+        The parameter that was scanned over.
+    outpath: str (optional)
+        Path to directory in which to save plot.
+    filename: str (optional)
+        Name of the file in which to save the plot.
+    """
+    # Modify error bars for plot so that they don't fall outside [0, 1]
+    errors_above = errors.copy()
+    errors_below = errors.copy()
+    upper_cap = percolation_fraction + errors
+    lower_cap = percolation_fraction - errors
+    cap_above_one = upper_cap > 1
+    cap_below_zero = lower_cap < 0
+    errors_above[cap_above_one] = 1 - percolation_fraction[cap_above_one]
+    errors_below[cap_below_zero] = percolation_fraction[cap_below_zero]
+    errors_for_plot = np.stack((errors_below, errors_above), axis=0)
+
+    spec = mpl.gridspec.GridSpec(nrows=2, ncols=1, height_ratios=(3, 1))
+    fig = plt.figure()
+
+    ax = fig.add_subplot(spec[0])
+    ax2 = fig.add_subplot(spec[1])
+
+    ax.set_title("Parameter scan")
+    ax.set_ylabel("Percolation fraction ($f$)")
+    ax2.set_ylabel("Residuals")
+    ax2.set_xlabel(parameter.replace("_", " "))
+    if parameter == "inert_prob":
+        ax2.set_xlabel("Inert probability ($q$)")  # this is all students will use
+    ax.xaxis.set_ticklabels([])
+
+    ax.errorbar(
+        x=values,
+        y=percolation_fraction,
+        yerr=errors_for_plot,
+        fmt="o",
+        color="green",
+        capsize=2,
+        elinewidth=1.5,
+        ecolor="black",
+        capthick=1.5,
+        markeredgecolor="black",
+        label="data",
+        zorder=0,
+    )
+
+    ax.plot(
+        fit_x,
+        fit_values,
+        color="r",
+        linestyle="--",
+        linewidth="2.0",
+        label=label,
+        zorder=1,
+    )
+
+    # Plot residuals
+    ax2.errorbar(
+        x=values,
+        y=residuals,
+        yerr=errors_for_plot,
+        fmt="o",
+        color="green",
+        capsize=2,
+        elinewidth=1.5,
+        ecolor="black",
+        capthick=1.5,
+        markeredgecolor="black",
+        label="data",
+        zorder=0,
+    )
+    ax2.axhline(
+        0,
+        color="r",
+        linestyle="--",
+        linewidth="2.0",
+        label=label,
+        zorder=1,
+    )
+
+    ax.legend()
+
+    if outpath is not None:
+        outpath = Path(outpath)
+        outpath.mkdir(parents=True, exist_ok=True)
+        fig.savefig(outpath / filename)
+    else:
+        plt.show()
+
+
+def plot_finite_size_scaling(results, outpath=None):
+    """Plots the mid-point and width of the transition against lattice size, along with
+    the finite-size scaling fits.
+
+    Inputs
+    ------
+    results: dict
+        Results returned by scripts.finite_size.finite_size_scaling.
+    outpath: str (optional)
+        Path to directory in which to save plot.
+    """
+    fit = results["fit"]
+    sizes = np.array([scan["size"] for scan in results["scans"]])
+    loc, e_loc, width, e_width = (
+        np.array([scan[key] for scan in results["scans"]])
+        for key in ("loc", "e_loc", "width", "e_width")
+    )
+    fit_x = np.linspace(sizes.min(), sizes.max(), 1000)
+
+    fig, (ax, ax2) = plt.subplots(1, 2, figsize=(10, 4))
+    ax.set_title("Mid-point of the transition")
+    ax.set_xlabel("Lattice size ($L$)")
+    ax.set_ylabel("$q_0$")
+    ax2.set_title("Width of the transition")
+    ax2.set_xlabel("Lattice size ($L$)")
+    ax2.set_ylabel("$1 / \\lambda$")
+    ax2.set_xscale("log")
+    ax2.set_yscale("log")
+
+    for axis, y, yerr in ((ax, loc, e_loc), (ax2, width, e_width)):
+        axis.errorbar(
+            x=sizes,
+            y=y,
+            yerr=yerr,
+            fmt="o",
+            color="green",
+            capsize=2,
+            elinewidth=1.5,
+            ecolor="black",
+            capthick=1.5,
+            markeredgecolor="black",
+            label="data",
+            zorder=0,
+        )
+
+    ax.plot(
+        fit_x,
+        fit["q_c"] + fit["a"] * fit_x ** (-fit["inv_nu_loc"]),
+        color="r",
+        linestyle="--",
+        linewidth="2.0",
+        label="least squares fit",
+        zorder=1,
+    )
+    ax.axhline(fit["q_c"], color="grey", linestyle=":", label="$q_c$")
+    ax2.plot(
+        fit_x,
+        fit["b"] * fit_x ** (-fit["inv_nu_width"]),
+        color="r",
+        linestyle="--",
+        linewidth="2.0",
+        label="least squares fit",
+        zorder=1,
+    )
+
+    ax.legend()
+    ax2.legend()
+    fig.tight_layout()
+
+    if outpath is not None:
+        outpath = Path(outpath)
+        outpath.mkdir(parents=True, exist_ok=True)
+        fig.savefig(outpath / "finite_size_scaling.png")
+    else:
+        plt.show()
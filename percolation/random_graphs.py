@@ -0,0 +1,271 @@
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from percolation.networks import BooleanNetwork
+
+# Maximum number of attempts to re-pair stubs which form self-loops or multi-edges
+MAX_REPAIRS = 100
+
+
+class RandomNetwork(BooleanNetwork):
+    """Base class for undirected random graphs, which are generated directly in
+    compressed sparse row format using vectorised operations.
+
+    Unless provided explicitly, the nucleus is node 0 and the far boundary is the set
+    of nodes at the greatest (finite) graph distance from the nucleus.
+    """
+
+    def _build(self, n_nodes, rows, cols, nucleus=None, far_boundary=None):
+        """Symmetrise and de-duplicate the edges (rows[k], cols[k]), store them as a
+        CSR adjacency matrix and set the nucleus and far boundary."""
+        indptr, indices = _csr_from_edges(n_nodes, rows, cols)
+        self._create_from_csr(n_nodes, indptr, indices, directed=False)
+
+        if nucleus is None:
+            nucleus = [0]
+        self.set_special_nodes(nucleus, far_boundary)
+        if far_boundary is None:
+            self._far_boundary_mask = self._farthest_nodes()
+
+    def _farthest_nodes(self):
+        """Mask selecting the nodes furthest from the nucleus, by breadth-first search."""
+        distances = dijkstra(
+            self.matrix,
+            unweighted=True,
+            indices=np.flatnonzero(self._nucleus_mask),
+            min_only=True,
+        )
+        reached = np.isfinite(distances)
+        return reached & (distances == distances[reached].max())
+
+    @property
+    def degrees(self):
+        """Number of neighbours of each node."""
+        return np.diff(self.matrix.indptr)
+
+
+class ErdosRenyiNetwork(RandomNetwork):
+    """Erdős–Rényi random graph G(n, p), in which each of the n(n-1)/2 possible edges is
+    present independently with probability p = mean_degree / (n - 1).
+
+    Edges are sampled by drawing geometrically distributed gaps between consecutive
+    edges, so the cost is proportional to the number of edges rather than n^2.
+
+    Inputs
+    ------
+    n_nodes: int
+        Number of nodes.
+    mean_degree: float
+        Expected number of neighbours of each node.
+    seed: int (optional)
+        Seed for the random number generator.
+    nucleus: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the initial live nodes.
+    far_boundary: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the far boundary.
+    """
+
+    def __init__(
+        self, n_nodes: int, mean_degree: float, seed=None, nucleus=None, far_boundary=None
+    ):
+        edge_prob = mean_degree / (n_nodes - 1)
+        if edge_prob < 0 or edge_prob > 1:
+            raise ValueError(
+                f"Please provide a mean degree between 0 and {n_nodes - 1}."
+            )
+        rng = np.random.default_rng(seed)
+
+        n_pairs = n_nodes * (n_nodes - 1) // 2
+        positions = _bernoulli_positions(rng, n_pairs, edge_prob)
+
+        # Map positions in the strictly lower triangle to (row, col) with col < row
+        rows = ((1 + np.sqrt(1 + 8 * positions.astype(float))) // 2).astype(np.int64)
+        rows -= rows * (rows - 1) // 2 > positions  # correct floating point rounding
+        rows += (rows + 1) * rows // 2 <= positions
+        cols = positions - rows * (rows - 1) // 2
+
+        self._build(n_nodes, rows, cols, nucleus, far_boundary)
+
+
+class WattsStrogatzNetwork(RandomNetwork):
+    """Watts–Strogatz small-world graph. Each node starts connected to its k nearest
+    neighbours on a ring, and then the far end of each edge is rewired to a uniformly
+    chosen node with probability `rewire_prob`. Rewired edges which duplicate existing
+    ones are merged.
+
+    Inputs
+    ------
+    n_nodes: int
+        Number of nodes.
+    k: int
+        Number of nearest neighbours on the ring. Must be even.
+    rewire_prob: float
+        Probability of rewiring each edge.
+    seed: int (optional)
+        Seed for the random number generator.
+    nucleus: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the initial live nodes.
+    far_boundary: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the far boundary.
+    """
+
+    def __init__(
+        self,
+        n_nodes: int,
+        k: int,
+        rewire_prob: float,
+        seed=None,
+        nucleus=None,
+        far_boundary=None,
+    ):
+        if k % 2 != 0 or k < 2 or k >= n_nodes:
+            raise ValueError("Please provide an even k between 2 and n_nodes - 1.")
+        if rewire_prob < 0 or rewire_prob > 1:
+            raise ValueError("Please provide a rewiring probability between 0 and 1.")
+        rng = np.random.default_rng(seed)
+
+        nodes = np.arange(n_nodes, dtype=np.int64)
+        rows = np.tile(nodes, k // 2)
+        cols = (rows + np.repeat(np.arange(1, k // 2 + 1), n_nodes)) % n_nodes
+
+        # Rewire to any node other than the source, avoiding self-loops by construction
+        rewire = rng.random(rows.size) < rewire_prob
+        offsets = rng.integers(1, n_nodes, size=np.count_nonzero(rewire))
+        cols[rewire] = (rows[rewire] + offsets) % n_nodes
+
+        self._build(n_nodes, rows, cols, nucleus, far_boundary)
+
+
+class ConfigurationModelNetwork(RandomNetwork):
+    """Random graph with a given degree sequence, generated by the configuration
+    model: each node is given as many 'stubs' as its degree, and stubs are paired
+    uniformly at random.
+
+    Stubs which form self-loops or multi-edges are repeatedly re-paired together with
+    a random sample of the other pairs, and any which remain after `MAX_REPAIRS`
+    attempts are discarded, so the degree sequence is reproduced exactly except in
+    rare cases.
+
+    Inputs
+    ------
+    degrees: numpy.ndarray
+        Degree of each node. The sum must be even.
+    seed: int (optional)
+        Seed for the random number generator.
+    nucleus: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the initial live nodes.
+    far_boundary: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the far boundary.
+    """
+
+    def __init__(self, degrees, seed=None, nucleus=None, far_boundary=None):
+        degrees = np.asarray(degrees, dtype=np.int64)
+        if np.any(degrees < 0):
+            raise ValueError("Please provide a non-negative degree sequence.")
+        if degrees.sum() % 2 != 0:
+            raise ValueError("Please provide a degree sequence with an even sum.")
+        rng = np.random.default_rng(seed)
+
+        n_nodes = degrees.size
+        stubs = rng.permutation(np.repeat(np.arange(n_nodes, dtype=np.int64), degrees))
+        pairs = stubs.reshape(-1, 2)
+
+        for _ in range(MAX_REPAIRS):
+            bad = _bad_pairs(n_nodes, pairs)
+            n_bad = np.count_nonzero(bad)
+            if n_bad == 0:
+                break
+            # Re-pair the bad stubs along with as many randomly chosen good pairs
+            good = np.flatnonzero(~bad)
+            redo = np.concatenate(
+                (
+                    np.flatnonzero(bad),
+                    rng.choice(good, size=min(n_bad, good.size), replace=False),
+                )
+            )
+            pairs[redo] = rng.permutation(pairs[redo].ravel()).reshape(-1, 2)
+
+        pairs = pairs[~_bad_pairs(n_nodes, pairs)]
+
+        self._build(n_nodes, pairs[:, 0], pairs[:, 1], nucleus, far_boundary)
+
+
+class RandomRegularNetwork(ConfigurationModelNetwork):
+    """Random graph in which every node has exactly `degree` neighbours, generated by
+    the configuration model.
+
+    Inputs
+    ------
+    n_nodes: int
+        Number of nodes.
+    degree: int
+        Number of neighbours of every node. n_nodes * degree must be even.
+    seed: int (optional)
+        Seed for the random number generator.
+    nucleus: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the initial live nodes.
+    far_boundary: numpy.ndarray (optional)
+        Boolean mask or array of indices selecting the far boundary.
+    """
+
+    def __init__(
+        self, n_nodes: int, degree: int, seed=None, nucleus=None, far_boundary=None
+    ):
+        if degree < 0 or degree >= n_nodes:
+            raise ValueError("Please provide a degree between 0 and n_nodes - 1.")
+        super().__init__(
+            np.full(n_nodes, degree),
+            seed=seed,
+            nucleus=nucleus,
+            far_boundary=far_boundary,
+        )
+
+
+def _bernoulli_positions(rng, n_trials, prob):
+    """Positions of the successes in a sequence of `n_trials` Bernoulli trials, found by
+    sampling the geometrically distributed gaps between them in large chunks."""
+    if prob == 0 or n_trials == 0:
+        return np.empty(0, dtype=np.int64)
+
+    chunk_size = int(n_trials * prob + 5 * np.sqrt(n_trials * prob) + 10)
+    chunks = []
+    last = -1
+    while last < n_trials:
+        gaps = rng.geometric(prob, size=chunk_size)
+        positions = last + np.cumsum(gaps)
+        chunks.append(positions)
+        last = positions[-1]
+    positions = np.concatenate(chunks)
+    return positions[positions < n_trials]
+
+
+def _bad_pairs(n_nodes, pairs):
+    """Mask selecting pairs of stubs which form self-loops, or which duplicate an
+    earlier pair."""
+    lo = pairs.min(axis=1)
+    hi = pairs.max(axis=1)
+    keys = lo * n_nodes + hi
+
+    # Multi-edges are rare, so find the repeated keys first and only then locate them
+    sorted_keys = np.sort(keys)
+    repeated = sorted_keys[1:][sorted_keys[1:] == sorted_keys[:-1]]
+    candidates = np.flatnonzero(np.isin(keys, repeated))
+    _, first = np.unique(keys[candidates], return_index=True)
+    duplicate = np.zeros(len(keys), dtype=bool)
+    duplicate[np.delete(candidates, first)] = True
+
+    return (lo == hi) | duplicate
+
+
+def _csr_from_edges(n_nodes, rows, cols):
+    """Compressed sparse row index arrays for the undirected simple graph with edges
+    (rows[k], cols[k]). Self-loops and duplicate edges are removed."""
+    rows, cols = np.concatenate((rows, cols)), np.concatenate((cols, rows))
+    keys = np.unique(rows[rows != cols] * n_nodes + cols[rows != cols])  # sorted
+    rows, indices = np.divmod(keys, n_nodes)
+
+    # Use the index type that scipy would otherwise convert to
+    index_dtype = np.int32 if keys.size < 2 ** 31 else np.int64
+    indptr = np.zeros(n_nodes + 1, dtype=index_dtype)
+    np.cumsum(np.bincount(rows, minlength=n_nodes), out=indptr[1:])
+    return indptr, indices.astype(index_dtype)
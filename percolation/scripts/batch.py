@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import numpy as np
+import configargparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from time import perf_counter
+
+from percolation.config import parser as config_parser
+from percolation.scripts.shell_scripts import load_lattice, load_model
+from percolation.scripts.parameter_scan import (
+    scan_percolation_fraction,
+    scan_errors,
+    fit_logistic,
+    exact_percolation_prob,
+)
+
+ACTIONS = ("scan", "estimate", "evolve")
+
+# Lattices built by this process, keyed by geometry, so that they are reused by every
+# config with the same geometry that this worker runs
+_LATTICES = {}
+
+
+def read_manifest(path):
+    """Reads a manifest, which lists one config file per line, optionally followed by
+    the action to run for it (one of ACTIONS, by default 'scan'). Blank lines and
+    anything after a '#' are ignored, and relative paths are taken relative to the
+    manifest.
+
+    Returns
+    -------
+    entries: list
+        (config path, action) for each config.
+    """
+    path = Path(path)
+    entries = []
+    for line in path.read_text().splitlines():
+        line = line.split("#")[0].strip()
+        if not line:
+            continue
+        config, *action = line.split()
+        action = action[0] if action else "scan"
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action '{action}', please choose from {ACTIONS}.")
+        entries.append((path.parent / config, action))
+    return entries
+
+
+def geometry(args):
+    """Key which is shared by configs whose lattices are identical."""
+    return (args.rows, args.cols or args.rows, args.links, args.periodic)
+
+
+def cached_lattice(args):
+    """Returns the lattice described by `args`, building it only if this process has
+    not already built one with the same geometry."""
+    key = geometry(args)
+    if key not in _LATTICES:
+        _LATTICES[key] = load_lattice(args)
+    return _LATTICES[key]
+
+
+def output_name(config, action):
+    """Name of the results file of a config, which is made unique by a short hash of
+    the resolved path of the config, since configs in different directories may end
+    with the same directory and file names."""
+    digest = hashlib.sha1(str(Path(config).resolve()).encode()).hexdigest()[:8]
+    stem = "_".join(Path(config).with_suffix("").parts[-2:])
+    return f"{stem}_{digest}_{action}.json"
+
+
+def run_config(config, action, outdir):
+    """Runs a single config and writes its results to a JSON file in `outdir`.
+
+    Inputs
+    ------
+    config: pathlib.Path
+        Path to the config file.
+    action: str
+        One of ACTIONS: 'scan' runs a parameter scan, 'estimate' estimates the
+        percolation probability and 'evolve' records the time series'.
+    outdir: pathlib.Path
+        Directory for the results file, which is named after the config (see
+        `output_name`).
+
+    Returns
+    -------
+    outfile: pathlib.Path
+        Path to the results file.
+    """
+    args = config_parser.parse_args(["-f", str(config)])
+
+    model = load_model(args, lattice=cached_lattice(args))
+
+    t_start = perf_counter()
+    if action == "scan":
+        values = np.linspace(args.start, args.stop, args.num)
+        fraction = scan_percolation_fraction(
+            model, values, args.repeats, parameter=args.parameter
+        )
+        errors = scan_errors(model, values, fraction, args.repeats, args.parameter)
+        results = {
+            "parameter": args.parameter,
+            "values": values.tolist(),
+            "percolation_fraction": fraction.tolist(),
+            "errors": errors.tolist(),
+        }
+        if exact_percolation_prob(model, values, args.parameter) is None:
+            popt, perr = fit_logistic(values, fraction, errors)
+            results.update(
+                loc=popt[0], steepness=popt[1], e_loc=perr[0], e_steepness=perr[1]
+            )
+    elif action == "estimate":
+        frac, stderr = model.estimate_percolation_prob(args.repeats, print_result=False)
+        results = {"percolation_fraction": frac, "stderr": stderr}
+    else:
+        model.evolve(args.steps)
+        results = {
+            "live": model.live_time_series.tolist(),
+            "susceptible": model.susceptible_time_series.tolist(),
+            "inert": model.inert_time_series.tolist(),
+            "has_percolated": model.has_percolated,
+        }
+
+    record = {
+        "config": str(config),
+        "action": action,
+        "arguments": vars(args),
+        "results": results,
+        "seconds": perf_counter() - t_start,
+    }
+
+    outfile = outdir / output_name(config, action)
+    outfile.write_text(json.dumps(record, indent=2, default=float))
+    return outfile
+
+
+def run_group(entries, outdir):
+    """Runs a list of (config, action) entries in this process, in order."""
+    return [run_config(config, action, outdir) for config, action in entries]
+
+
+def batch(manifest, outdir="batch_results", workers=None):
+    """Runs every config in a manifest on a shared pool of worker processes.
+
+    Configs with the same lattice geometry are grouped together, so that each worker
+    builds the lattice once and reuses it for the whole group. Groups are split if
+    there are fewer of them than workers, and the largest groups are started first.
+
+    Inputs
+    ------
+    manifest: str
+        Path to the manifest. See `read_manifest` for the format.
+    outdir: str (optional)
+        Directory in which to write one JSON results file per config.
+    workers: int (optional)
+        Number of worker processes. By default, the number of CPUs.
+
+    Returns
+    -------
+    outfiles: list
+        Paths to the results files, in no particular order.
+    """
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    groups = {}
+    for config, action in read_manifest(manifest):
+        args = config_parser.parse_args(["-f", str(config)])
+        groups.setdefault(geometry(args), []).append((config, action))
+
+    workers = workers or _cpu_count()
+    tasks = []
+    for entries in groups.values():
+        n_chunks = min(len(entries), max(1, workers // len(groups)))
+        tasks += [entries[i::n_chunks] for i in range(n_chunks)]
+    tasks.sort(key=len, reverse=True)
+
+    outfiles = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_group, entries, outdir) for entries in tasks]
+        for future in as_completed(futures):
+            outfiles += future.result()
+            print(f"{len(outfiles)} configs completed")
+
+    return outfiles
+
+
+def _cpu_count():
+    """Number of CPUs available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count()
+
+
+def main():
+    parser = configargparse.ArgParser()
+    parser.add("manifest", type=str, help="path to a manifest listing config files")
+    parser.add(
+        "-o",
+        "--outpath",
+        type=str,
+        default="batch_results",
+        help="path to directory for the results files, default: 'batch_results'",
+    )
+    parser.add(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes, default: number of CPUs",
+    )
+    args = parser.parse_args()
+
+    batch(args.manifest, outdir=args.outpath, workers=args.workers)
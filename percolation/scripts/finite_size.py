@@ -0,0 +1,310 @@
+import json
+import numpy as np
+import scipy.optimize as optim
+import configargparse
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+from percolation.config import parser as config_parser
+from percolation.scripts.batch import cached_lattice, _cpu_count
+from percolation.scripts.shell_scripts import load_model
+from percolation.scripts.parameter_scan import binomial_errors, fit_logistic
+
+
+def simulation_cost(size):
+    """Relative cost of one simulation on a `size` x `size` lattice: the number of
+    nodes times the number of steps needed to cross the lattice."""
+    return float(size) ** 3
+
+
+def allocate_repeats(sizes, num, budget):
+    """Shares a total budget of node updates between the lattice sizes so that each
+    size receives compute in proportion to the cost of one of its simulations, which
+    gives every size the same number of simulations per parameter value.
+
+    Inputs
+    ------
+    sizes: list
+        Linear sizes of the lattices.
+    num: int
+        Number of parameter values scanned for each size.
+    budget: float
+        Total number of node updates, summed over all sizes and values.
+
+    Returns
+    -------
+    repeats: int
+        Number of simulations for each size and parameter value.
+    """
+    repeats = int(budget / (num * sum(simulation_cost(size) for size in sizes)))
+    if repeats < 2:
+        raise ValueError(
+            "Budget is too small to run at least two simulations per parameter value."
+        )
+    return repeats
+
+
+def schedule(sizes, values, repeats, n_chunks=1):
+    """Splits a finite-size scaling run into tasks, each of which estimates the
+    percolation probability for one size and parameter value from a share of the
+    simulations. Tasks are ordered by decreasing cost, so that the largest lattices
+    are started first and the pool of workers is kept busy until the end.
+
+    Returns
+    -------
+    tasks: list
+        (size, index of parameter value, value, number of simulations) for each task.
+    """
+    tasks = []
+    for size in sizes:
+        for i, value in enumerate(values):
+            for chunk in np.array_split(np.arange(repeats), n_chunks):
+                if chunk.size > 0:
+                    tasks.append((size, i, value, chunk.size))
+    tasks.sort(key=lambda task: simulation_cost(task[0]) * task[3], reverse=True)
+    return tasks
+
+
+def run_task(arguments, size, value, repeats):
+    """Estimates the percolation probability on a `size` x `size` lattice, for one value
+    of the scanned parameter. `arguments` is a dict of parsed config arguments.
+
+    Returns
+    -------
+    n_percolated: int
+        Number of the `repeats` simulations that percolated.
+    """
+    args = Namespace(**{**arguments, "rows": size, "cols": size})
+    model = load_model(args, lattice=cached_lattice(args))
+    setattr(model, args.parameter, value)
+    frac, _ = model.estimate_percolation_prob(repeats, print_result=False)
+    return int(round(frac * repeats))
+
+
+def power_law(size, amplitude, exponent):
+    """amplitude * size ** (-exponent)"""
+    return amplitude * np.power(size, -exponent)
+
+
+def shifted_power_law(size, limit, amplitude, exponent):
+    """limit + amplitude * size ** (-exponent)"""
+    return limit + amplitude * np.power(size, -exponent)
+
+
+def fit_scaling(sizes, loc, e_loc, width, e_width):
+    """Fits the finite-size scaling forms
+
+        width(L) = b L^(-1/nu),    q_0(L) = q_c + a L^(-1/nu),
+
+    to the mid-points and widths of the transition at each lattice size. The width fit
+    gives 1/nu, which is also used as the starting point for the fit of q_0. With
+    fewer than four sizes there are not enough degrees of freedom to fit 1/nu to the
+    mid-points as well, so it is held fixed at the value from the widths.
+
+    Returns
+    -------
+    fit: dict
+        Best-fit values and standard errors of q_c, a, b and 1/nu.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    if sizes.size < 3:
+        raise ValueError("At least three lattice sizes are needed to fit the scaling.")
+
+    (b, inv_nu), pcov = optim.curve_fit(
+        power_law, sizes, width, sigma=e_width, p0=(width[0] * sizes[0], 1)
+    )
+    e_b, e_inv_nu = np.sqrt(pcov.diagonal())
+
+    # Starting point for the amplitude from the smallest and largest sizes
+    a0 = (loc[0] - loc[-1]) / (sizes[0] ** (-inv_nu) - sizes[-1] ** (-inv_nu))
+
+    if sizes.size > 3:
+        (q_c, a, inv_nu_loc), pcov = optim.curve_fit(
+            shifted_power_law, sizes, loc, sigma=e_loc, p0=(loc[-1], a0, inv_nu)
+        )
+        e_q_c, e_a, e_inv_nu_loc = np.sqrt(pcov.diagonal())
+    else:
+
+        def fixed_exponent(size, limit, amplitude):
+            return shifted_power_law(size, limit, amplitude, inv_nu)
+
+        (q_c, a), pcov = optim.curve_fit(
+            fixed_exponent,
+            sizes,
+            loc,
+            sigma=e_loc,
+            p0=(loc[-1], a0),
+        )
+        e_q_c, e_a = np.sqrt(pcov.diagonal())
+        inv_nu_loc, e_inv_nu_loc = inv_nu, e_inv_nu
+
+    return {
+        "q_c": q_c,
+        "e_q_c": e_q_c,
+        "a": a,
+        "e_a": e_a,
+        "b": b,
+        "e_b": e_b,
+        "inv_nu_width": inv_nu,
+        "e_inv_nu_width": e_inv_nu,
+        "inv_nu_loc": inv_nu_loc,
+        "e_inv_nu_loc": e_inv_nu_loc,
+    }
+
+
+def finite_size_scaling(
+    config, sizes, budget=None, workers=None, outpath=None, plot=True
+):
+    """Runs parameter scans over a list of lattice sizes in parallel, fits a logistic
+    curve to each, and extrapolates the mid-point of the transition to infinite size.
+
+    The scan parameters (parameter, start, stop, num, repeats) and the model are taken
+    from a config file, with square lattices of each size in `sizes`. Simulations for
+    every size and parameter value are split into tasks which run on a shared pool of
+    worker processes, largest lattices first.
+
+    Inputs
+    ------
+    config: str
+        Path to a config file.
+    sizes: list
+        Linear sizes of the lattices. At least three are needed for the fits.
+    budget: float (optional)
+        Total number of node updates to spend, shared between sizes in proportion to
+        their cost (see `allocate_repeats`). By default, the config's `repeats`
+        simulations are run for each size and parameter value.
+    workers: int (optional)
+        Number of worker processes. By default, the number of CPUs.
+    outpath: str (optional)
+        Path to directory in which to save the results and the plot.
+    plot: bool (optional)
+        Plot the mid-points and widths of the transition against lattice size.
+
+    Returns
+    -------
+    results: dict
+        Percolation fractions, logistic fits for each size and the scaling fit.
+    """
+    args = config_parser.parse_args(["-f", str(config)])
+    sizes = sorted(sizes)
+    values = np.linspace(args.start, args.stop, args.num)
+    workers = workers or _cpu_count()
+
+    if budget is None:
+        repeats = args.repeats
+    else:
+        repeats = allocate_repeats(sizes, args.num, budget)
+
+    # Split each size into enough chunks for the largest to be shared by all workers
+    tasks = schedule(sizes, values, repeats, n_chunks=min(workers, repeats))
+
+    # --------------------------------------------------------------------------------
+    #                                                              | Run simulations |
+    #                                                              -------------------
+    t_start = perf_counter()
+    n_percolated = {size: np.zeros(args.num, dtype=int) for size in sizes}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_task, vars(args), size, value, n): (size, i)
+            for size, i, value, n in tasks
+        }
+        for future, (size, i) in futures.items():
+            n_percolated[size][i] += future.result()
+
+    # --------------------------------------------------------------------------------
+    #                                                                     | Fit data |
+    #                                                                     ------------
+    scans = []
+    for size in sizes:
+        fraction = n_percolated[size] / repeats
+        errors = binomial_errors(fraction, repeats)
+        (loc, steepness), (e_loc, e_steepness) = fit_logistic(values, fraction, errors)
+        scans.append(
+            {
+                "size": size,
+                "percolation_fraction": fraction.tolist(),
+                "errors": errors.tolist(),
+                "loc": loc,
+                "e_loc": e_loc,
+                "width": 1 / steepness,
+                "e_width": e_steepness / steepness ** 2,
+            }
+        )
+
+    loc, e_loc, width, e_width = (
+        np.array([scan[key] for scan in scans])
+        for key in ("loc", "e_loc", "width", "e_width")
+    )
+    fit = fit_scaling(sizes, loc, e_loc, width, e_width)
+
+    print(f"Infinite-size threshold is q_c = {fit['q_c']} +/- {fit['e_q_c']}")
+    print(f"Width exponent is 1/nu = {fit['inv_nu_width']} +/- {fit['e_inv_nu_width']}")
+
+    results = {
+        "parameter": args.parameter,
+        "values": values.tolist(),
+        "repeats": repeats,
+        "scans": scans,
+        "fit": fit,
+        "seconds": perf_counter() - t_start,
+    }
+
+    if outpath is not None:
+        outpath = Path(outpath)
+        outpath.mkdir(parents=True, exist_ok=True)
+        (outpath / "finite_size_scaling.json").write_text(
+            json.dumps(results, indent=2, default=float)
+        )
+
+    if plot:
+        # Matplotlib is only imported when it is needed
+        from percolation.plotting import plot_finite_size_scaling
+
+        plot_finite_size_scaling(results, outpath=outpath)
+
+    return results
+
+
+def main():
+    parser = configargparse.ArgParser()
+    parser.add("config", type=str, help="path to a config file for the scans")
+    parser.add(
+        "-L",
+        "--sizes",
+        type=int,
+        nargs="+",
+        required=True,
+        help="linear sizes of the lattices, at least three",
+    )
+    parser.add(
+        "-b",
+        "--budget",
+        type=float,
+        default=None,
+        help="total number of node updates to spend, default: 'repeats' simulations per size and value",
+    )
+    parser.add(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes, default: number of CPUs",
+    )
+    parser.add(
+        "-o",
+        "--outpath",
+        type=str,
+        default=".",
+        help="path to directory for output files, default: '.'",
+    )
+    args = parser.parse_args()
+
+    finite_size_scaling(
+        args.config,
+        args.sizes,
+        budget=args.budget,
+        workers=args.workers,
+        outpath=args.outpath,
+    )
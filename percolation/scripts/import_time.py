@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import numpy as np
+
+# Modules which should not be imported unless plotting is requested
+HEAVY_MODULES = ("matplotlib", "numba")
+
+
+def import_time(module="percolation", repeats=10):
+    """Measures the time taken to import `module` in a fresh interpreter, which is what
+    every batch job and process pool worker pays on startup.
+
+    Inputs
+    ------
+    module: str (optional)
+        The module to import.
+    repeats: int (optional)
+        Number of fresh interpreters to time.
+
+    Returns
+    -------
+    times: numpy.ndarray
+        Cumulative import time of `module` in seconds, for each interpreter.
+    heavy: list
+        Modules in HEAVY_MODULES which were imported along with `module`.
+    """
+    times = np.empty(repeats)
+    for i in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        # Lines look like 'import time: self [us] | cumulative | imported package'
+        lines = [line for line in result.stderr.splitlines() if "|" in line]
+        cumulative = {
+            line.split("|")[2].strip(): int(line.split("|")[1]) for line in lines[1:]
+        }
+        times[i] = cumulative[module] * 1e-6
+
+    heavy = [name for name in HEAVY_MODULES if name in cumulative]
+    return times, heavy
+
+
+def main():
+    """Prints the import time of the package and its simulation modules."""
+    for module in ("percolation", "percolation.scripts.parameter_scan"):
+        times, heavy = import_time(module)
+        print(
+            f"""
+    Module:                 {module}
+    Import time:            {np.median(times) * 1e3:.4g} ms (median of {times.size})
+    Heavy modules imported: {", ".join(heavy) or "none"}
+    """
+        )
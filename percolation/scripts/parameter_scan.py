@@ -1,10 +1,12 @@
 import numpy as np
 import scipy.optimize as optim
-import matplotlib.pyplot as plt
-import matplotlib as mpl
 from tqdm import tqdm, tqdm_notebook
-from pathlib import Path
-import sys
+
+from percolation.ensemble import run_ensemble
+from percolation.exact import (
+    percolation_probability,
+    percolation_probability_curve,
+)
 
 # NOTE: the following would be better but results in ExperimentalFeatureWarning
 # from tqdm.autonotebook import tqdm
@@ -15,6 +17,290 @@ def logistic(x, loc, steepness):
     return 1 / (1 + np.exp(steepness * (x - loc)))
 
 
+def scan_percolation_fraction(
+    model,
+    values,
+    repeats,
+    parameter="inert_prob",
+    pbar=None,
+    monitor=None,
+    coupled=False,
+    seed=None,
+):
+    """Estimates the percolation probability for each of a sequence of values of a
+    parameter of the model.
+
+    By default, the simulations for each value are independent. If `coupled` is True,
+    they use common random numbers instead: the i'th simulation at every value starts
+    from the same seed, so it compares one uniform field against each value of
+    `inert_prob`, and shares one stream of random numbers for its transmissions. With
+    deterministic transmission, whether each simulation percolates is then monotonic in
+    `inert_prob`, and the noise in the differences between neighbouring values is much
+    smaller, so the scan is a smooth curve. The statistical error on the position of
+    the whole curve is not reduced, since every value shares the same simulations.
+
+    Inputs
+    ------
+    model: PercolationModel
+        The model object.
+    values: numpy.ndarray
+        Values of the parameter to loop over.
+    repeats: int
+        The number of simulations to run for each value of the parameter.
+    parameter: str (optional)
+        The parameter to vary. Must be an attribute of model.
+    pbar: tqdm.tqdm (optional)
+        Progress bar, which is updated after each value of the parameter.
+    monitor: telemetry.ProgressMonitor (optional)
+        Records the simulations and reports progress while they run.
+    coupled: bool (optional)
+        Use common random numbers for every value of the parameter.
+    seed: int (optional)
+        Seed from which the seeds of the coupled simulations are generated. Ignored
+        unless `coupled` is True.
+
+    Returns
+    -------
+    percolation_fraction: numpy.ndarray
+        Fraction of the simulations that percolated, for each value of the parameter.
+    """
+    if monitor is not None:
+        monitor.expect(len(values) * repeats)
+
+    seeds = None
+    if coupled:
+        seeds = np.random.SeedSequence(seed).generate_state(repeats)
+
+    percolation_fraction = np.empty(len(values))
+    for i, value in enumerate(values):
+
+        # Update model with new value for parameter
+        setattr(model, parameter, value)
+
+        # Run 'repeats' simulations and record the fraction that percolate
+        percolation_fraction[i], _ = model.estimate_percolation_prob(
+            repeats, print_result=False, monitor=monitor, seeds=seeds
+        )
+
+        if pbar is not None:
+            pbar.update(repeats)
+
+    return percolation_fraction
+
+
+def scan_ensemble(
+    model,
+    values,
+    repeats,
+    parameter="inert_prob",
+    pbar=None,
+    monitor=None,
+    coupled=False,
+    seed=None,
+):
+    """As for `scan_percolation_fraction`, but returns a record of every simulation
+    rather than the percolation fractions (see the `ensemble` module).
+
+    Returns
+    -------
+    runs: numpy.ndarray
+        Structured array with dtype ensemble.RUN_DTYPE and shape (len(values), repeats).
+    """
+    if monitor is not None:
+        monitor.expect(len(values) * repeats)
+
+    seed_sequence = np.random.SeedSequence(seed)
+    if coupled:
+        seeds = seed_sequence.generate_state(repeats)
+
+    runs = []
+    for value in values:
+        setattr(model, parameter, value)
+        if not coupled:
+            seeds = seed_sequence.spawn(1)[0].generate_state(repeats)
+        runs.append(run_ensemble(model, repeats, seeds=seeds, monitor=monitor))
+
+        if pbar is not None:
+            pbar.update(repeats)
+
+    return np.stack(runs)
+
+
+def scan_errors(model, values, percolation_fraction, repeats, parameter="inert_prob"):
+    """Returns the standard errors on the percolation fractions from a parameter scan.
+    See `scan_percolation_fraction` for the inputs."""
+    p = exact_percolation_prob(model, values, parameter)
+    if p is not None:
+        # If the percolation probability is known exactly, so is the SE
+        errors = np.sqrt(p * (1 - p) / repeats)
+        return np.fmax(errors, 1 / repeats)
+
+    # Otherwise errors are SE on the sample mean for a Binomial distribution
+    return binomial_errors(percolation_fraction, repeats)
+
+
+def binomial_errors(percolation_fraction, repeats):
+    """Standard errors on percolation fractions estimated from `repeats` simulations,
+    treating the number which percolated as a Binomial random variable."""
+    errors = np.sqrt((percolation_fraction * (1 - percolation_fraction)) / repeats)
+
+    # Enforce a minimum error (should base on the Geometric distribution - num steps
+    # before first 'hit')
+    errors = np.fmax(errors, 1 / repeats)  # TODO this needs justifying
+
+    return errors
+
+
+def fit_logistic(values, percolation_fraction, errors):
+    """Least squares fit of the logistic function to the results of a parameter scan.
+
+    Returns
+    -------
+    popt: numpy.ndarray
+        Best-fit values of (loc, steepness).
+    perr: numpy.ndarray
+        Standard errors on (loc, steepness) from the covariance of the fit.
+    """
+    popt, pcov = optim.curve_fit(
+        logistic,
+        xdata=values,
+        ydata=percolation_fraction,
+        sigma=errors,
+        p0=(0.5, 10),
+        bounds=((0, 0), (1, np.inf)),
+    )
+    return popt, np.sqrt(pcov.diagonal())
+
+
+def fit_logistic_batch(values, percolation_fraction, repeats, max_iter=100, tol=1e-8):
+    """Maximum likelihood fits of the logistic function to many parameter scans at once.
+
+    The number of simulations which percolate at each value is treated as Binomial,
+    and the fit is done by iteratively reweighted least squares on the linear predictor
+    a + b x = -steepness * (x - loc). Each iteration solves the 2x2 weighted normal
+    equations for every scan simultaneously, so there is no loop over scans.
+
+    If a scan jumps straight from one to zero there is no finite maximum, and the
+    steepness just keeps growing until `max_iter` is reached.
+
+    Inputs
+    ------
+    values: numpy.ndarray
+        Values of the parameter which were scanned over, shape (num,).
+    percolation_fraction: numpy.ndarray
+        Percolation fractions, shape (..., num), where the leading dimensions index
+        separate scans.
+    repeats: int
+        Number of simulations behind each percolation fraction.
+    max_iter: int (optional)
+        Maximum number of iterations.
+    tol: float (optional)
+        Iterations stop once no coefficient changes by more than this.
+
+    Returns
+    -------
+    loc: numpy.ndarray
+        Best-fit mid-points, shape (...).
+    steepness: numpy.ndarray
+        Best-fit steepness parameters, shape (...).
+    """
+    x = np.asarray(values, dtype=float)
+    y = np.asarray(percolation_fraction, dtype=float)
+    a = np.zeros(y.shape[:-1])
+    b = np.zeros(y.shape[:-1])
+
+    for _ in range(max_iter):
+        eta = a[..., None] + b[..., None] * x
+        with np.errstate(over="ignore"):
+            p = 1 / (1 + np.exp(-eta))
+        w = np.fmax(repeats * p * (1 - p), 1e-12)
+        r = repeats * (y - p)  # score contributions
+
+        # Newton step: solve [[sum w, sum wx], [sum wx, sum wxx]] d = [sum r, sum rx]
+        s0, s1, s2 = w.sum(-1), (w * x).sum(-1), (w * x * x).sum(-1)
+        g0, g1 = r.sum(-1), (r * x).sum(-1)
+        det = s0 * s2 - s1 ** 2
+        da = (s2 * g0 - s1 * g1) / det
+        db = (s0 * g1 - s1 * g0) / det
+
+        a += da
+        b += db
+        if np.all(np.abs(da) < tol) and np.all(np.abs(db) < tol):
+            break
+
+    return -a / b, -b
+
+
+def bootstrap_logistic(
+    values, percolation_fraction, repeats, n_boot=2000, confidence=0.68, seed=None
+):
+    """Bootstrap confidence intervals on the parameters of the logistic function.
+
+    The outcomes of the individual simulations are resampled with replacement, which
+    for each value of the parameter amounts to drawing the number which percolated
+    from a Binomial distribution with the observed percolation fraction. Every
+    resample is refitted at once by `fit_logistic_batch`.
+
+    Inputs
+    ------
+    values: numpy.ndarray
+        Values of the parameter which were scanned over.
+    percolation_fraction: numpy.ndarray
+        Fraction of the simulations that percolated, for each value of the parameter.
+    repeats: int
+        Number of simulations run for each value of the parameter.
+    n_boot: int (optional)
+        Number of bootstrap resamples.
+    confidence: float (optional)
+        Confidence level of the percentile intervals.
+    seed: int (optional)
+        Seed for the random number generator used to resample.
+
+    Returns
+    -------
+    popt: numpy.ndarray
+        Maximum likelihood estimates of (loc, steepness) from the original data.
+    intervals: numpy.ndarray
+        Lower and upper limits of the percentile intervals, shape (2, 2), where the
+        rows correspond to (loc, steepness).
+    """
+    rng = np.random.default_rng(seed)
+    resamples = (
+        rng.binomial(repeats, percolation_fraction, size=(n_boot, len(values)))
+        / repeats
+    )
+    loc, steepness = fit_logistic_batch(values, resamples, repeats)
+
+    tail = 50 * (1 - confidence)
+    intervals = np.percentile(
+        np.stack((loc, steepness)), (tail, 100 - tail), axis=1
+    ).T
+
+    popt = np.array(fit_logistic_batch(values, percolation_fraction, repeats))
+    return popt, intervals
+
+
+def exact_percolation_prob(model, values, parameter="inert_prob"):
+    """Returns the exact percolation probability for each of a sequence of values of a
+    parameter of the model, or None if it is not known in closed form for all of them
+    (see the `exact` module). The parameter is restored to its original value."""
+    if parameter == "inert_prob":
+        return percolation_probability_curve(model, values)
+
+    original = getattr(model, parameter)
+    try:
+        probs = []
+        for value in values:
+            setattr(model, parameter, value)
+            probs.append(percolation_probability(model))
+    finally:
+        setattr(model, parameter, original)
+
+    if any(prob is None for prob in probs):
+        return None
+    return np.array(probs)
+
+
 def parameter_scan(
     model,
     start,
@@ -24,6 +310,11 @@ def parameter_scan(
     parameter="inert_prob",
     notebook_friendly=True,
     outpath=None,
+    bootstrap=0,
+    monitor=None,
+    coupled=False,
+    runs_path=None,
+    exact=False,
 ):
     """Loops over a range of values for a given parameter of the model, evolving the
     model forwards until it has either percolated or transmission has stopped.
@@ -47,10 +338,38 @@ def parameter_scan(
         Use tqdm bar specifically tailored for Jupyter notebooks.
     outpath: str (optional)
         Path to directory in which to save plot.
+    bootstrap: int (optional)
+        If greater than zero, also report 68% percentile intervals on the parameters of
+        the logistic fit from this many bootstrap resamples of the simulations.
+    monitor: telemetry.ProgressMonitor (optional)
+        Reports progress and throughput metrics while the scan runs (see
+        telemetry.ProgressMonitor).
+    coupled: bool (optional)
+        Use common random numbers for every value of the parameter (see
+        `scan_percolation_fraction`). The bootstrap still resamples each value
+        independently, so its intervals are then conservative.
+    runs_path: str (optional)
+        If given, keep a record of every simulation (see `scan_ensemble`) and save
+        them to this path with numpy.save.
+    exact: bool (optional)
+        If the percolation probability is known exactly for every value (see the
+        `exact` module), plot it in place of the percolation fractions, without
+        running any simulations.
     """
     values = np.linspace(start, stop, num)
 
-    if notebook_friendly:
+    if exact:
+        exact_values = exact_percolation_prob(model, values, parameter)
+        if exact_values is None:
+            raise ValueError(
+                "The percolation probability is not known exactly for this model."
+            )
+        if runs_path is not None:
+            raise ValueError("No simulations are run, so there are no runs to save.")
+
+    if exact:
+        pbar = None
+    elif notebook_friendly:
         pbar = tqdm_notebook(
             total=(num * repeats),
             desc="Simulations completed",
@@ -64,153 +383,91 @@ def parameter_scan(
     # --------------------------------------------------------------------------------
     #                                                           | Run parameter scan |
     #                                                           ----------------------
-    percolation_fraction = np.empty(len(values))
-    for i, value in enumerate(values):
-
-        # Update model with new value for parameter
-        setattr(model, parameter, value)
-
-        # Run 'repeats' simulations and record the fraction that percolate
-        percolation_fraction[i], _ = model.estimate_percolation_prob(
-            repeats, print_result=False
+    if exact:
+        percolation_fraction = exact_values
+    elif runs_path is not None:
+        runs = scan_ensemble(
+            model,
+            values,
+            repeats,
+            parameter=parameter,
+            pbar=pbar,
+            monitor=monitor,
+            coupled=coupled,
         )
-
-        pbar.update(repeats)
-
-    pbar.close()
+        np.save(runs_path, runs)
+        percolation_fraction = runs["percolated"].mean(axis=1)
+    else:
+        percolation_fraction = scan_percolation_fraction(
+            model,
+            values,
+            repeats,
+            parameter=parameter,
+            pbar=pbar,
+            monitor=monitor,
+            coupled=coupled,
+        )
+    if pbar is not None:
+        pbar.close()
+    if monitor is not None:
+        monitor.report(force=True)
 
     # --------------------------------------------------------------------------------
     #                                                               | Compute errors |
     #                                                               ------------------
-    if parameter == "inert_prob" and model.network.n_links == 1:
-        # In the case of one connection per node, the SE is known in terms of Bernoulli prob
-        r = model.network.n_rows
-        c = model.network.n_cols
-        p = 1 - (1 - (1 - values) ** r) ** c
-        errors = np.sqrt(p * (1 - p) / repeats)
+    if exact:
+        errors = np.zeros_like(percolation_fraction)
     else:
-        # Otherwise errors are SE on the sample mean for a Binomial distribution
-        errors = np.sqrt((percolation_fraction * (1 - percolation_fraction)) / repeats)
-
-    # Enforce a minimum error (should base on the Geometric distribution - num steps
-    # before first 'hit')
-    errors = np.fmax(errors, 1 / repeats)  # TODO this needs justifying
-
-    # Modify error bars for plot so that they don't fall outside [0, 1]
-    errors_above = errors.copy()
-    errors_below = errors.copy()
-    upper_cap = percolation_fraction + errors
-    lower_cap = percolation_fraction - errors
-    cap_above_one = upper_cap > 1
-    cap_below_zero = lower_cap < 0
-    errors_above[cap_above_one] -= upper_cap[cap_above_one] - 1
-    errors_below[cap_below_zero] += lower_cap[cap_below_zero]
-    errors_for_plot = np.stack((errors_below, errors_above), axis=0)
+        errors = scan_errors(model, values, percolation_fraction, repeats, parameter)
 
     # --------------------------------------------------------------------------------
-    #                                                                    | Plot data |
-    #                                                                    -------------
-
-    spec = mpl.gridspec.GridSpec(nrows=2, ncols=1, height_ratios=(3, 1))
-    fig = plt.figure()
-
-    ax = fig.add_subplot(spec[0])
-    ax2 = fig.add_subplot(spec[1])
-
-    ax.set_title("Parameter scan")
-    ax.set_ylabel("Percolation fraction ($f$)")
-    ax2.set_ylabel("Residuals")
-    ax2.set_xlabel(parameter.replace("_", " "))
-    if parameter == "inert_prob":
-        ax2.set_xlabel("Inert probability ($q$)")  # this is all students will use
-    ax.xaxis.set_ticklabels([])
-
-    ax.errorbar(
-        x=values,
-        y=percolation_fraction,
-        yerr=errors_for_plot,
-        fmt="o",
-        color="green",
-        capsize=2,
-        elinewidth=1.5,
-        ecolor="black",
-        capthick=1.5,
-        markeredgecolor="black",
-        label="data",
-        zorder=0,
-    )
-
+    #                                                                     | Fit data |
+    #                                                                     ------------
     fit_x = np.linspace(values.min(), values.max(), 1000)
 
-    # In this case we just plot the theoretical curve
-    if parameter == "inert_prob" and model.network.n_links == 1:
-        r = model.network.n_rows
-        c = model.network.n_cols
-        fit_values = 1 - (1 - (1 - fit_x) ** r) ** c
-        residuals = percolation_fraction - (1 - (1 - (1 - values) ** r) ** c)
+    # If the percolation probability is known exactly, we just plot the theoretical curve
+    exact_values = exact_percolation_prob(model, values, parameter)
+    if exact_values is not None:
+        fit_values = exact_percolation_prob(model, fit_x, parameter)
+        residuals = percolation_fraction - exact_values
         label = "theoretical probability"
 
     # Otherwise we attempt to fit a logistic curve with two parameters
     else:
-        popt, pcov = optim.curve_fit(
-            logistic,
-            xdata=values,
-            ydata=percolation_fraction,
-            sigma=errors,
-            p0=(0.5, 10),
-            bounds=((0, 0), (1, np.inf)),
+        (loc, steepness), (e_loc, e_steepness) = fit_logistic(
+            values, percolation_fraction, errors
         )
-
-        loc, steepness = popt
-        e_loc, e_steepness = np.sqrt(pcov.diagonal())
         print(f"Mid-point of transition is q_0 = {loc} +/- {e_loc}")
         print(f"Steepness parameter is lambda = {steepness} +/- {e_steepness}")
 
+        if bootstrap > 0:
+            _, intervals = bootstrap_logistic(
+                values, percolation_fraction, repeats, n_boot=bootstrap
+            )
+            print(f"Bootstrap 68% interval on q_0: {intervals[0]}")
+            print(f"Bootstrap 68% interval on lambda: {intervals[1]}")
+
         fit_values = logistic(fit_x, loc=loc, steepness=steepness)
         residuals = percolation_fraction - logistic(
             values, loc=loc, steepness=steepness
         )
         label = r"least squares fit"
 
-    ax.plot(
+    # --------------------------------------------------------------------------------
+    #                                                                    | Plot data |
+    #                                                                    -------------
+    # Matplotlib is only imported when it is needed
+    from percolation.plotting import plot_parameter_scan
+
+    plot_parameter_scan(
+        values,
+        percolation_fraction,
+        errors,
         fit_x,
         fit_values,
-        color="r",
-        linestyle="--",
-        linewidth="2.0",
-        label=label,
-        zorder=1,
-    )
-
-    # Plot residuals
-    ax2.errorbar(
-        x=values,
-        y=residuals,
-        yerr=errors_for_plot,
-        fmt="o",
-        color="green",
-        capsize=2,
-        elinewidth=1.5,
-        ecolor="black",
-        capthick=1.5,
-        markeredgecolor="black",
-        label="data",
-        zorder=0,
-    )
-    ax2.axhline(
-        0,
-        color="r",
-        linestyle="--",
-        linewidth="2.0",
-        label=label,
-        zorder=1,
+        residuals,
+        label,
+        parameter=parameter,
+        outpath=outpath,
+        filename=f"parameter_scan_L{model.network.n_rows}.png",
     )
-
-    ax.legend()
-
-    if outpath is not None:
-        outpath = Path(outpath)
-        outpath.mkdir(parents=True, exist_ok=True)
-        fig.savefig(outpath / f"parameter_scan_L{model.network.n_rows}.png")
-    else:
-        plt.show()
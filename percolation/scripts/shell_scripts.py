@@ -5,82 +5,95 @@ from percolation.lattice import SquareLattice
 from percolation.model import PercolationModel
 from percolation.config import parser
 from percolation.scripts.parameter_scan import parameter_scan
+from percolation.telemetry import ProgressMonitor
 
 
-ARGS = parser.parse_args()
+def load_lattice(args):
+    """Returns a lattice built from parsed command line arguments."""
+    return SquareLattice(
+        n_rows=args.rows,
+        n_cols=args.cols,
+        n_links=args.links,
+        periodic=args.periodic,
+    )
 
 
-def load_model():
-    """Returns loaded model."""
-    lattice = SquareLattice(
-        n_rows=ARGS.rows,
-        n_cols=ARGS.cols,
-        n_links=ARGS.links,
-        periodic=ARGS.periodic,
-    )
+def load_model(args, lattice=None):
+    """Returns loaded model. If a lattice is not provided, one is built from `args`."""
+    if lattice is None:
+        lattice = load_lattice(args)
     model = PercolationModel(
         lattice,
-        inert_prob=ARGS.inert_prob,
-        transmission_prob=ARGS.transmission_prob,
-        recovery_time=ARGS.recovery_time,
-        recovered_are_inert=ARGS.recovered_are_inert,
-        shuffle_prob=ARGS.shuffle_prob,
-        nucleus_size=ARGS.nucleus_size,
+        inert_prob=args.inert_prob,
+        transmission_prob=args.transmission_prob,
+        recovery_time=args.recovery_time,
+        recovered_are_inert=args.recovered_are_inert,
+        shuffle_prob=args.shuffle_prob,
+        nucleus_size=args.nucleus_size,
+        backend=args.backend,
     )
-    model.init_state(reproducible=ARGS.reproducible)
+    model.init_state(reproducible=args.reproducible)
 
     return model
 
 
-MODEL = load_model()
-
-
 def anim():
-
-    MODEL.animate(
-        n_steps=ARGS.steps,
-        interval=ARGS.interval,
-        dynamic_overlay=ARGS.dynamic_overlay,
-        outpath=ARGS.outpath,
+    args = parser.parse_args()
+    model = load_model(args)
+
+    model.animate(
+        n_steps=args.steps,
+        interval=args.interval,
+        dynamic_overlay=args.dynamic_overlay,
+        outpath=args.outpath,
     )
-    MODEL.plot_sir(outpath=ARGS.outpath)
+    model.plot_sir(outpath=args.outpath)
 
 
 def time():
+    args = parser.parse_args()
+    model = load_model(args)
 
     t_excl = timeit(
         stmt="MODEL.evolve(n_steps=ARGS.steps)",
         setup="MODEL.init_state()",
-        number=ARGS.repeats,
-        globals=globals(),
+        number=args.repeats,
+        globals={"MODEL": model, "ARGS": args},
     )
     t_incl = timeit(
         stmt="MODEL.init_state; MODEL.evolve(n_steps=ARGS.steps)",
-        number=ARGS.repeats,
-        globals=globals(),
+        number=args.repeats,
+        globals={"MODEL": model, "ARGS": args},
     )
 
     print(
         f"""
-    Number of nodes:        {MODEL.network.n_nodes}
-    Simulation length:      {ARGS.steps} steps
-    Number of simulations:  {ARGS.repeats}
+    Number of nodes:        {model.network.n_nodes}
+    Simulation length:      {args.steps} steps
+    Number of simulations:  {args.repeats}
     Timings:
-        Excluding initialisation:   {t_excl:.4g} seconds    
+        Excluding initialisation:   {t_excl:.4g} seconds
         Including initialisation:   {t_incl:.4g} seconds
     """
     )
 
 
 def scan():
+    args = parser.parse_args()
+    model = load_model(args)
 
     parameter_scan(
-        MODEL,
-        start=ARGS.start,
-        stop=ARGS.stop,
-        num=ARGS.num,
-        repeats=ARGS.repeats,
-        parameter=ARGS.parameter,
+        model,
+        start=args.start,
+        stop=args.stop,
+        num=args.num,
+        repeats=args.repeats,
+        parameter=args.parameter,
         notebook_friendly=False,
-        outpath=ARGS.outpath,
+        outpath=args.outpath,
+        bootstrap=args.bootstrap,
+        monitor=ProgressMonitor(path=args.metrics) if args.metrics else None,
+        coupled=args.coupled,
+        runs_path=args.runs,
+        exact=args.exact,
     )
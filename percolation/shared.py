@@ -0,0 +1,137 @@
+"""Sharing networks between worker processes without copying them.
+
+A SharedNetwork publishes the index arrays, boundary masks and nucleus mask of a network
+once, as .npy files in a directory which is in memory (/dev/shm) where available. The
+handle itself only holds the directory and a few attributes, so it is cheap to pickle
+and send to workers, which call `attach` to memory-map the arrays and rebuild a view of
+the network. Every worker then reads the same physical memory.
+"""
+import os
+import shutil
+import tempfile
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from percolation.model import PercolationModel
+
+# Directory backed by memory, where available, in which to publish networks
+SHM_DIR = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+
+
+class SharedNetwork:
+    """Handle to a network whose arrays have been published for other processes.
+
+    Inputs
+    ------
+    network: networks.BooleanNetwork
+        The network to publish. Any subclass which implements `_shared_arrays` and
+        `_from_shared_arrays`, including lattice.SquareLattice, is supported.
+    directory: str (optional)
+        Directory in which to write the arrays. By default, a new temporary directory is
+        created, in memory if possible, and removed by `unlink`.
+
+    Notes
+    -----
+        Use the handle as a context manager, or call `unlink` once the workers have
+        finished, to remove the published arrays. Views created by `attach` are
+        read-only; changing the dimensions of an attached lattice rebuilds it as a
+        private copy.
+    """
+
+    def __init__(self, network, directory=None):
+        arrays, attributes = network._shared_arrays()
+
+        self._owner = directory is None
+        self._owner_pid = os.getpid()
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="percolation-", dir=SHM_DIR)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        for name, array in arrays.items():
+            np.save(self.directory / f"{name}.npy", np.ascontiguousarray(array))
+
+        self.names = list(arrays)
+        self.attributes = attributes
+        self.network_class = type(network)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.unlink()
+
+    def attach(self):
+        """Memory-maps the published arrays and returns a view of the network."""
+        arrays = {
+            name: np.load(self.directory / f"{name}.npy", mmap_mode="r")
+            for name in self.names
+        }
+        return self.network_class._from_shared_arrays(arrays, self.attributes)
+
+    def unlink(self):
+        """Removes the published arrays, if they were written to a temporary directory
+        by this process. Views which are already attached remain valid."""
+        if self._owner and os.getpid() == self._owner_pid:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# ----------------------------------------------------------------------------------------
+#                                                                  | Parallel estimation |
+#                                                                  -----------------------
+
+# Network attached by each worker process when it starts
+_WORKER_NETWORK = None
+
+
+def _attach_worker(shared):
+    global _WORKER_NETWORK
+    _WORKER_NETWORK = shared.attach()
+
+
+def _count_percolated(model_kwargs, repeats):
+    model = PercolationModel(_WORKER_NETWORK, **model_kwargs)
+    return model._count_percolated(repeats)
+
+
+def parallel_estimate_percolation_prob(shared, repeats, workers=None, **model_kwargs):
+    """Estimates the percolation probability with the simulations split between a pool
+    of worker processes, each of which attaches to the shared network once.
+
+    Inputs
+    ------
+    shared: SharedNetwork
+        The published network.
+    repeats: int
+        Total number of simulations.
+    workers: int (optional)
+        Number of worker processes. By default, the number of CPUs. At most `repeats`
+        workers are started.
+    **model_kwargs
+        Parameters of the model.PercolationModel, such as `inert_prob`.
+
+    Returns
+    -------
+    frac: float
+        Fraction of the `repeats` simulations that percolated.
+    stderr: float
+        Estimate of the standard error on the above estimate of the percolation
+        probability.
+    """
+    workers = min(workers or os.cpu_count(), repeats)
+    chunks = [
+        chunk.size
+        for chunk in np.array_split(np.arange(repeats), workers)
+        if chunk.size > 0
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_attach_worker, initargs=(shared,)
+    ) as pool:
+        counts = pool.map(_count_percolated, [model_kwargs] * len(chunks), chunks)
+        num = sum(counts)
+
+    frac = num / repeats
+    stderr = np.sqrt(frac * (1 - frac) / (repeats - 1))
+    return frac, stderr
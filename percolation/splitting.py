@@ -0,0 +1,238 @@
+"""Multilevel splitting estimator for very small percolation probabilities.
+
+Deep in the non-percolating regime, almost every simulation dies out close to the
+nucleus, and estimating the percolation probability by brute force needs of order
+1 / p simulations just to see one success. Fixed-effort multilevel splitting instead
+splits the way to the far boundary into levels, which are distances from the far
+boundary, and estimates the probability of reaching each level from the states in which
+runs first reached the previous one. In each stage, `effort` runs are started from
+copies of those states, chosen uniformly at random, and the percolation probability is
+estimated by the product of the fractions of runs which reach the next level. Every
+copy in a stage carries the same weight, so no further bookkeeping of weights is needed,
+and the product is an unbiased estimate.
+
+For the copies of a run to have independent futures, the randomness which has not yet
+been used must not be part of the copied state. Each copy therefore gets a fresh random
+number generator, and whether a node is inert is only drawn the first time the node is
+in contact with a live node, which gives the same distribution of outcomes as drawing
+the inert nodes when the model is reset, as long as nodes do not shuffle. Errors are
+estimated from independent replicates of the whole procedure.
+"""
+import numpy as np
+
+from percolation.networks import WeightedNetwork
+
+
+def distance_to_far_boundary(network):
+    """Returns the smallest number of edges from each node to a node on the far
+    boundary, ignoring inert nodes, or -1 for nodes from which it cannot be reached."""
+    distance = np.full(network.n_nodes, -1, dtype=np.int64)
+    frontier = np.flatnonzero(network._far_boundary)
+    distance[frontier] = 0
+    d = 0
+    while frontier.size > 0:
+        _, sources = network.in_edges(frontier)
+        frontier = np.unique(sources[distance[sources] < 0])
+        d += 1
+        distance[frontier] = d
+    return distance
+
+
+class MultilevelSplitting:
+    """Fixed-effort multilevel splitting estimator for the probability that the model
+    percolates, as defined by PercolationModel.evolve_until_percolated.
+
+    Inputs
+    ------
+    model: model.PercolationModel
+        The model, which must have an unweighted network, a shuffle probability of zero
+        and a single thread. It is used to run the simulations, and is left in a new
+        initial state.
+    effort: int (optional)
+        Number of runs in each stage.
+    level_spacing: int (optional)
+        Distance between consecutive levels. The default of one gives a level for every
+        distance from the far boundary.
+
+    Attributes
+    ----------
+    levels: numpy.ndarray
+        Distances from the far boundary which define the intermediate levels, in the
+        order in which they are reached. The final stage is percolation itself.
+    """
+
+    def __init__(self, model, effort=1000, level_spacing=1):
+        if isinstance(model.network, WeightedNetwork):
+            raise ValueError("Splitting is not supported for weighted networks.")
+        if model.shuffle_prob > 0:
+            raise ValueError("Splitting requires a shuffle probability of zero.")
+        if model.n_threads > 1:
+            raise ValueError("Splitting requires a single thread.")
+        if type(effort) is not int or effort < 1:
+            raise ValueError("Please provide a positive integer for the effort.")
+        if type(level_spacing) is not int or level_spacing < 1:
+            raise ValueError("Please provide a positive integer level spacing.")
+
+        self.model = model
+        self.effort = effort
+
+        # Replicates are seeded by sequences spawned from this, which `estimate` resets
+        self._seed_sequence = np.random.SeedSequence()
+
+        self._distance = distance_to_far_boundary(model.network)
+        self._nucleus = model.network._get_nucleus(nucleus_size=model.nucleus_size)
+        reachable = self._distance[self._nucleus]
+        reachable = reachable[reachable >= 0]
+        start = reachable.min() if reachable.size > 0 else -1
+        self.levels = np.arange(start - level_spacing, 0, -level_spacing)
+
+        # Unreachable nodes are never closer than any level
+        self._score_distance = np.where(self._distance >= 0, self._distance, np.inf)
+        self._reachable = start >= 0
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                    | Protected methods |
+    #                                                                    ---------------------
+
+    def _initial_run(self):
+        """Returns a run in the initial state, with only the nucleus revealed. A run is a
+        tuple of the state, inert mask, revealed mask, number of updates and number of
+        consecutive updates without transmissions."""
+        model = self.model
+        state = np.zeros(model.network.n_nodes)
+        state[self._nucleus] = model.recovery_time
+        inert = np.zeros(model.network.n_nodes, dtype=bool)
+        return state, inert, self._nucleus.copy(), 0, 0
+
+    def _score(self):
+        """Smallest distance from the far boundary of any live node of the model."""
+        live = self.model._state > 0
+        if not np.any(live):
+            return np.inf
+        return self._score_distance[live].min()
+
+    def _update(self, revealed, rng):
+        """Performs a single update of the model, drawing whether each node is inert the
+        first time it is in contact with a live node. Returns the number of
+        transmissions."""
+        model = self.model
+        model._recover()
+        np.not_equal(model._state, 0, out=model._live)
+        model._find_contacts()
+        i_potentials = model._susceptible_contacts()
+
+        new = i_potentials[~revealed[i_potentials]]
+        revealed[new] = True
+        model._inert[new] = rng.random(new.size) < model.inert_prob
+
+        return model._transmit(i_potentials[~model._inert[i_potentials]])
+
+    def _advance(self, run, level, rng):
+        """Continues `run` until it reaches `level`, or percolates if `level` is None.
+        Returns the run in the state in which it succeeded, or None if it failed."""
+        model = self.model
+        state, inert, revealed, n_steps, n_idle = run
+        model._state[:] = state
+        model._inert[:] = inert
+        revealed = revealed.copy()
+        model._rng = rng
+
+        if level is not None and self._score() <= level:
+            return run
+
+        # Same stopping rule as evolve_until_percolated, which also counts a far node
+        # which is live when transmission halts
+        while n_idle < (1 / model.transmission_prob):
+            n_transmissions = self._update(revealed, rng)
+            n_steps += 1
+            n_idle = n_idle + 1 if n_transmissions == 0 else 0
+
+            if level is None:
+                if n_steps % 10 == 0 and model.has_percolated:
+                    break
+            elif self._score() <= level:
+                break
+        else:
+            if level is not None or not model.has_percolated:
+                return None
+
+        return model._state.copy(), model._inert.copy(), revealed, n_steps, n_idle
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                       | Public methods |
+    #                                                                       ------------------
+
+    def run_replicate(self, seed=None):
+        """Runs the splitting procedure once.
+
+        Inputs
+        ------
+        seed: int or numpy.random.SeedSequence (optional)
+            Seed of the replicate, from which the seeds of its runs are spawned. By
+            default, a new sequence is spawned from the one kept by the estimator.
+
+        Returns
+        -------
+        prob: float
+            Estimate of the percolation probability.
+        conditional: numpy.ndarray
+            Fraction of the runs in each stage which reached the next level, or
+            percolated in the final stage. Stages after one in which no run succeeded
+            are omitted.
+        """
+        if seed is None:
+            (seed,) = self._seed_sequence.spawn(1)
+        elif not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        rng = np.random.default_rng(seed)
+        conditional = []
+        if not self._reachable:
+            return 0.0, np.array(conditional)
+
+        runs = [self._initial_run()]
+        for level in list(self.levels) + [None]:
+            starts = rng.integers(len(runs), size=self.effort)
+            streams = [
+                np.random.default_rng(child) for child in seed.spawn(self.effort)
+            ]
+            reached = [
+                self._advance(runs[i], level, stream)
+                for i, stream in zip(starts, streams)
+            ]
+            runs = [run for run in reached if run is not None]
+            conditional.append(len(runs) / self.effort)
+            if not runs:
+                break
+
+        return float(np.prod(conditional)), np.array(conditional)
+
+    def estimate(self, replicates=10, seed=None):
+        """Estimates the percolation probability from independent replicates of the
+        splitting procedure.
+
+        Inputs
+        ------
+        replicates: int (optional)
+            Number of independent replicates, which must be at least two.
+        seed: int (optional)
+            Seed for the random number generator.
+
+        Returns
+        -------
+        prob: float
+            Mean of the estimates of the replicates.
+        stderr: float
+            Standard error on the mean, from the spread of the replicates.
+        """
+        if type(replicates) is not int or replicates < 2:
+            raise ValueError("Please provide at least two replicates.")
+
+        self._seed_sequence = np.random.SeedSequence(seed)
+        original_rng = self.model._rng
+        try:
+            estimates = np.array([self.run_replicate()[0] for _ in range(replicates)])
+        finally:
+            self.model._rng = original_rng
+            self.model.reset()
+
+        return estimates.mean(), estimates.std(ddof=1) / np.sqrt(replicates)
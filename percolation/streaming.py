@@ -0,0 +1,220 @@
+"""Statistics of long time series' which are updated one value at a time, in constant
+memory.
+
+With `time_series="streaming"`, PercolationModel keeps at most RETAINED_STEPS of the
+most recent values of each of its time series', and instead accumulates a
+StreamingSeries of the fractions of live and inert nodes (see
+PercolationModel.statistics), however many updates are performed.
+
+The mean and variance are accumulated with Welford's algorithm. For the autocorrelation
+up to a lag of `max_lag`, the sums of products of the values with the `max_lag`
+preceding ones are accumulated, together with the first and most recent `max_lag`
+values, which is enough to give exactly the usual estimator
+
+    r_k = sum_t (x_t - m) (x_{t+k} - m) / sum_t (x_t - m)^2
+
+where m is the mean. All of these are accumulated for the values less the first of
+them, so that they don't lose precision when the fluctuations are much smaller than
+the mean. An optional decimated history keeps every `stride`-th value, doubling
+the stride and discarding every other value kept whenever the history is full.
+
+Two accumulators can be merged with Chan et al.'s parallel form of Welford's update,
+giving the statistics of one series followed by the other, so that an ensemble of
+simulations can be summarised in constant memory however many runs it has (see
+ensemble.run_ensemble).
+"""
+import numpy as np
+from collections import deque
+
+# Largest number of recent values kept in the time series' of a streaming model
+RETAINED_STEPS = 1000
+
+
+class StreamingSeries:
+    """Running statistics of a series of values, which is updated one value at a time
+    and uses constant memory.
+
+    Inputs
+    ------
+    max_lag: int (optional)
+        Largest lag at which the autocorrelation is accumulated.
+    history_size: int (optional)
+        Largest number of values kept in the decimated history, or zero to keep none.
+
+    Attributes
+    ----------
+    n: int
+        Number of values appended.
+    min, max, last: float
+        Smallest, largest and most recent values, or NaN if there are none.
+    """
+
+    def __init__(self, max_lag=10, history_size=1000):
+        if type(max_lag) is not int or max_lag < 0:
+            raise ValueError("Please provide a non-negative integer for the lag.")
+        if type(history_size) is not int or history_size == 1 or history_size < 0:
+            raise ValueError("Please provide a history size of zero, or at least two.")
+        self.max_lag = max_lag
+        self.history_size = history_size
+        self.reset()
+
+    def reset(self):
+        """Discards all of the values appended so far."""
+        self.n = 0
+        self.min, self.max, self.last = np.nan, np.nan, np.nan
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        # Sums of the shifted values and their lagged products
+        self._shift = None
+        self._total = 0.0
+        self._lagged = [0.0] * self.max_lag
+        self._head = []
+        self._tail = deque(maxlen=self.max_lag)
+
+        self._history = []
+        self._stride = 1
+
+    def append(self, value):
+        """Adds the next value of the series to the statistics."""
+        value = float(value)
+        if self.n == 0:
+            self.min = self.max = value
+            self._shift = value
+        else:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+        self.last = value
+
+        # Welford's update of the mean and sum of squared deviations, of shifted values
+        shifted = value - self._shift
+        self.n += 1
+        delta = shifted - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (shifted - self._mean)
+
+        for k, previous in enumerate(reversed(self._tail)):
+            self._lagged[k] += shifted * previous
+        self._tail.append(shifted)
+        if len(self._head) < self.max_lag:
+            self._head.append(shifted)
+        self._total += shifted
+
+        if self.history_size > 0 and (self.n - 1) % self._stride == 0:
+            self._history.append((self.n - 1, value))
+            if len(self._history) > self.history_size:
+                del self._history[1::2]
+                self._stride *= 2
+
+    def merge(self, other):
+        """Adds the statistics of another series to these, as if its values had been
+        appended after those appended so far. The other series is left unchanged.
+
+        The lagged products across the join, of the last values of this series and the
+        first of the other, are included, so that the autocorrelation is exactly that
+        of the joined series. After a merge, the history holds the values kept by both
+        histories, decimated until they fit into `history_size` values, so it is
+        evenly spaced within each of the merged series but not necessarily across them.
+        """
+        if other.max_lag != self.max_lag:
+            raise ValueError("Please merge series with the same maximum lag.")
+        if other.n == 0:
+            return
+        if self.n == 0:
+            self._shift = other._shift
+            self.min, self.max = other.min, other.max
+
+        # Values of the other series, shifted by the shift of this one
+        offset = other._shift - self._shift
+        head = [value + offset for value in other._head]
+        tail = [value + offset for value in other._tail]
+
+        # Lagged products within the other series, then across the join
+        for k in range(1, min(self.max_lag, other.n - 1) + 1):
+            first = other._total - sum(other._tail[i] for i in range(-k, 0))
+            last = other._total - sum(other._head[:k])
+            self._lagged[k - 1] += (
+                other._lagged[k - 1]
+                + offset * (first + last)
+                + (other.n - k) * offset ** 2
+            )
+        previous = list(reversed(self._tail))
+        for k in range(1, self.max_lag + 1):
+            for i in range(1, min(k, len(previous)) + 1):
+                if k - i < len(head):
+                    self._lagged[k - 1] += previous[i - 1] * head[k - i]
+
+        # Chan et al.'s update of the mean and sum of squared deviations
+        n = self.n + other.n
+        delta = other._mean + offset - self._mean
+        self._m2 += other._m2 + delta ** 2 * self.n * other.n / n
+        self._mean += delta * other.n / n
+        self._total += other._total + other.n * offset
+
+        self._head = (self._head + head)[: self.max_lag]
+        self._tail.extend(tail)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.last = other.last
+
+        if self.history_size > 0:
+            self._history += [(self.n + step, value) for step, value in other._history]
+            self._stride = max(self._stride, other._stride)
+            while len(self._history) > self.history_size:
+                del self._history[1::2]
+                self._stride *= 2
+        self.n = n
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                 | Read-only properties |
+    #                                                                 ------------------------
+
+    @property
+    def mean(self):
+        """Mean of the values, or NaN if there are none."""
+        return self._shift + self._mean if self.n > 0 else np.nan
+
+    @property
+    def variance(self):
+        """Sample variance of the values, or NaN if there are fewer than two."""
+        return self._m2 / (self.n - 1) if self.n > 1 else np.nan
+
+    @property
+    def std(self):
+        """Sample standard deviation of the values."""
+        return np.sqrt(self.variance)
+
+    @property
+    def autocorrelation(self):
+        """Autocorrelation of the values at lags 0, 1, ..., max_lag. Lags for which it
+        is not defined, because there are too few values or they are all equal, are
+        NaN."""
+        correlation = np.full(self.max_lag + 1, np.nan)
+        if self.n == 0:
+            return correlation
+        mean = self._total / self.n
+        variance = self._m2
+        if not variance > 0:
+            return correlation
+
+        tail = list(self._tail)
+        correlation[0] = 1.0
+        for k in range(1, min(self.max_lag, self.n - 1) + 1):
+            # Sums over the first n - k and the last n - k values
+            first = self._total - sum(tail[len(tail) - k :])
+            last = self._total - sum(self._head[:k])
+            covariance = (
+                self._lagged[k - 1] - mean * (first + last) + (self.n - k) * mean ** 2
+            )
+            correlation[k] = covariance / variance
+        return correlation
+
+    @property
+    def history(self):
+        """Indices and values of the decimated history, which are every `stride`-th
+        value for the smallest power of two `stride` for which they fit into
+        `history_size` values."""
+        if not self._history:
+            return np.array([], dtype=np.int64), np.array([])
+        steps, values = zip(*self._history)
+        return np.array(steps), np.array(values)
@@ -0,0 +1,99 @@
+import json
+import time
+from pathlib import Path
+
+
+class ProgressMonitor:
+    """Collects progress and throughput metrics from long runs, and reports them at a
+    bounded rate to a callback and/or a JSON-lines file.
+
+    Pass a monitor to PercolationModel.evolve, evolve_until_percolated or
+    estimate_percolation_prob, or to parameter_scan, using the `monitor` argument. The
+    metrics reported are
+
+        runs                        number of simulations completed
+        total_runs                  number of simulations expected, if known
+        steps                       total number of updates
+        node_updates                total number of node updates (updates x nodes)
+        elapsed                     seconds since the monitor was created
+        node_updates_per_second     throughput since the monitor was created
+        mean_steps_per_run          mean number of updates per completed simulation
+        eta                         estimated seconds until total_runs are complete
+
+    Inputs
+    ------
+    callback: callable (optional)
+        Called with a dict of the metrics at most once every `interval` seconds.
+    path: str (optional)
+        Path to a file to which the metrics are appended as one JSON object per line,
+        at most once every `interval` seconds, so that it can be followed with `tail`.
+    interval: float (optional)
+        Minimum number of seconds between reports.
+    """
+
+    def __init__(self, callback=None, path=None, interval=1.0):
+        self.callback = callback
+        self.path = Path(path) if path is not None else None
+        self.interval = interval
+
+        self.runs = 0
+        self.total_runs = None
+        self.steps = 0
+        self.node_updates = 0
+
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    # ----------------------------------------------------------------------------------------
+    #                                                                       | Public methods |
+    #                                                                       ------------------
+
+    def expect(self, n_runs):
+        """Records that `n_runs` simulations are about to be run. Where an outer loop has
+        already announced them, as parameter_scan does for estimate_percolation_prob,
+        the expected total is not increased."""
+        self.total_runs = max(self.total_runs or 0, self.runs + n_runs)
+
+    def record_steps(self, n_steps, n_nodes):
+        """Records `n_steps` updates of a network with `n_nodes` nodes."""
+        self.steps += n_steps
+        self.node_updates += n_steps * n_nodes
+        self.report()
+
+    def record_runs(self, n_runs=1):
+        """Records that `n_runs` simulations have been completed."""
+        self.runs += n_runs
+        self.report()
+
+    def metrics(self):
+        """Returns a dict of the current metrics."""
+        elapsed = time.perf_counter() - self._start
+        rate = self.node_updates / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total_runs is not None and self.runs > 0:
+            eta = elapsed / self.runs * max(self.total_runs - self.runs, 0)
+        return {
+            "runs": self.runs,
+            "total_runs": self.total_runs,
+            "steps": self.steps,
+            "node_updates": self.node_updates,
+            "elapsed": elapsed,
+            "node_updates_per_second": rate,
+            "mean_steps_per_run": self.steps / self.runs if self.runs > 0 else None,
+            "eta": eta,
+        }
+
+    def report(self, force=False):
+        """Passes the metrics to the callback and appends them to the file, unless the
+        last report was less than `interval` seconds ago and `force` is False."""
+        now = time.perf_counter()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+
+        metrics = self.metrics()
+        if self.callback is not None:
+            self.callback(metrics)
+        if self.path is not None:
+            with self.path.open("a") as f:
+                f.write(json.dumps({"time": time.time(), **metrics}) + "\n")
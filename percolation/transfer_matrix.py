@@ -0,0 +1,148 @@
+"""Exact percolation probabilities for narrow square lattice strips, by the transfer
+matrix method.
+
+On a SquareLattice whose links never point up (n_links = 2 or 3), with a transmission
+probability of one and no recovery, the nodes which are ever live are exactly those
+which can be reached from the nucleus, the top row, through nodes which are not inert.
+Because nothing travels up the lattice, which nodes of a row are reached depends only on
+which nodes of the row above were reached, and on which nodes of the row itself are
+inert. The state of a row is therefore the set of its nodes which are reached, stored as
+a bitmask with bit c for column c, and going down one row is a Markov chain on the
+2^n_cols states:
+
+    1. a node is seeded if it is not inert and the node above it is reached
+    2. the seeds spread along the row through nodes which are not inert, to the right
+       only for n_links = 2, or both ways for n_links = 3, wrapping around on a periodic
+       lattice
+
+The model percolates if and only if some node of the bottom row is reached, i.e. the
+chain has not been absorbed by the empty state.
+
+The transition from each state, for each pattern of inert nodes in the next row, depends
+only on the width, n_links and whether the lattice is periodic, and is cached. The
+transitions are grouped by the number of nodes in the pattern which are not inert, k,
+since a pattern then has probability (1 - q)^k q^(n_cols - k) for an inert probability
+q, and the probability is evaluated on any number of values of q at once. The cost of
+each row is of order 4^n_cols, which limits the method to strips at most MAX_WIDTH nodes
+wide.
+"""
+import numpy as np
+import scipy.sparse
+
+# Widest strip for which transitions are computed (about 4^MAX_WIDTH transitions)
+MAX_WIDTH = 10
+
+# Transitions, keyed by (n_cols, n_links, periodic)
+_TRANSITIONS = {}
+
+
+def _spread(seeds, open_nodes, n_cols, n_links, periodic):
+    """Returns the nodes reached from `seeds` within a row, through `open_nodes`. All
+    arguments are bitmasks with one bit per column."""
+    full = (1 << n_cols) - 1
+    reached = seeds & open_nodes
+    while True:
+        # Link to the right: node c + 1 is a contact of node c
+        grow = (reached << 1) & full
+        if periodic:
+            grow |= reached >> (n_cols - 1)
+        if n_links == 3:
+            grow |= reached >> 1
+            if periodic:
+                grow |= (reached & 1) << (n_cols - 1)
+        new = reached | (grow & open_nodes)
+        if np.array_equal(new, reached):
+            return reached
+        reached = new
+
+
+def row_transitions(n_cols, n_links, periodic):
+    """Returns the transitions between the states of consecutive rows.
+
+    Inputs
+    ------
+    n_cols: int
+        Width of the strip, at most MAX_WIDTH.
+    n_links: int
+        Number of links of each node, either 2 or 3.
+    periodic: bool
+        Whether the rows wrap around.
+
+    Returns
+    -------
+    transitions: list of scipy.sparse.csr_matrix
+        One matrix for each number of nodes k = 0, ..., n_cols in the next row which
+        are not inert, of shape (2^n_cols, 2^n_cols), whose element [new, old] is the
+        number of patterns of inert nodes with k nodes which are not inert that take
+        the state `old` to the state `new`.
+    """
+    if n_links not in (2, 3):
+        raise ValueError("Transfer matrices require n_links to be 2 or 3.")
+    if type(n_cols) is not int or not 1 <= n_cols <= MAX_WIDTH:
+        raise ValueError(
+            f"Transfer matrices require a width between 1 and {MAX_WIDTH} nodes."
+        )
+    key = (n_cols, n_links, bool(periodic))
+    if key in _TRANSITIONS:
+        return _TRANSITIONS[key]
+
+    n_states = 1 << n_cols
+    old, open_nodes = (
+        a.ravel() for a in np.indices((n_states, n_states), dtype=np.int64)
+    )
+    new = _spread(old, open_nodes, n_cols, n_links, periodic)
+
+    n_open = np.zeros(n_states, dtype=np.int64)
+    for c in range(n_cols):
+        n_open += (np.arange(n_states) >> c) & 1
+    n_open = n_open[open_nodes]
+
+    transitions = []
+    for k in range(n_cols + 1):
+        select = n_open == k
+        transitions.append(
+            scipy.sparse.csr_matrix(
+                (np.ones(select.sum()), (new[select], old[select])),
+                shape=(n_states, n_states),
+            )
+        )
+
+    _TRANSITIONS[key] = transitions
+    return transitions
+
+
+def percolation_probability(n_rows, n_cols, n_links, periodic, inert_prob):
+    """Returns the exact probability that a strip percolates.
+
+    Inputs
+    ------
+    n_rows: int
+        Length of the strip, including the nucleus in the top row.
+    n_cols: int
+        Width of the strip, at most MAX_WIDTH.
+    n_links: int
+        Number of links of each node, either 2 or 3.
+    periodic: bool
+        Whether the lattice is periodic.
+    inert_prob: float or numpy.ndarray
+        Probability that a node is inert, or an array of them.
+
+    Returns
+    -------
+    prob: float or numpy.ndarray
+        Percolation probability for each inert probability.
+    """
+    q = np.asarray(inert_prob, dtype=np.float64)
+    transitions = row_transitions(n_cols, n_links, periodic)
+    p = 1 - q.ravel()
+    weights = [p ** k * q.ravel() ** (n_cols - k) for k in range(n_cols + 1)]
+
+    # Distribution over states of the current row, with every node of the top row live
+    dist = np.zeros((1 << n_cols, q.size))
+    dist[-1] = 1
+    for _ in range(n_rows - 1):
+        dist = sum(matrix @ dist * w for matrix, w in zip(transitions, weights))
+
+    # The empty state is absorbing, and the only state which has not percolated
+    prob = np.clip(1 - dist[0], 0, 1)
+    return prob.reshape(q.shape) if q.ndim > 0 else float(prob[0])
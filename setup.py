@@ -16,6 +16,9 @@ setup(
             "perc-anim = percolation.scripts.shell_scripts:anim",
             "perc-time = percolation.scripts.shell_scripts:time",
             "perc-scan = percolation.scripts.shell_scripts:scan",
+            "perc-fss = percolation.scripts.finite_size:main",
+            "perc-batch = percolation.scripts.batch:main",
+            "perc-import-time = percolation.scripts.import_time:main",
         ]
     },
 )
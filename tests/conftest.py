@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def backend_cache(tmp_path, monkeypatch):
+    """Keeps the choices of the backend autotuner out of the user's cache."""
+    monkeypatch.setenv("PERCOLATION_CACHE_DIR", str(tmp_path / "cache"))
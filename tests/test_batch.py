@@ -0,0 +1,61 @@
+import json
+import pytest
+
+from percolation.scripts.batch import read_manifest, run_group, batch, output_name
+
+CONFIG = """
+rows: 10
+links: 1
+inert-prob: 0.3
+steps: 10
+start: 0.1
+stop: 0.5
+num: 3
+repeats: 5
+reproducible: true
+"""
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "input.yml").write_text(CONFIG)
+    path = tmp_path / "manifest.txt"
+    path.write_text("# comment\na/input.yml\n\nb/input.yml estimate  # comment\n")
+    return path
+
+
+class TestBatch:
+    def test_read_manifest(self, manifest):
+        entries = read_manifest(manifest)
+        assert [action for _, action in entries] == ["scan", "estimate"]
+        assert all(config.exists() for config, _ in entries)
+
+    def test_unknown_action(self, tmp_path):
+        path = tmp_path / "manifest.txt"
+        path.write_text("input.yml plot\n")
+        with pytest.raises(ValueError):
+            read_manifest(path)
+
+    def test_results(self, manifest, tmp_path):
+        outdir = tmp_path / "out"
+        outfiles = batch(manifest, outdir=outdir, workers=1)
+        assert sorted(f.name for f in outfiles) == [
+            output_name(tmp_path / "a" / "input.yml", "scan"),
+            output_name(tmp_path / "b" / "input.yml", "estimate"),
+        ]
+        scan = json.loads(sorted(outfiles)[0].read_text())
+        assert len(scan["results"]["percolation_fraction"]) == 3
+        assert scan["arguments"]["rows"] == 10
+
+    def test_run_group(self, manifest, tmp_path):
+        outfiles = run_group(read_manifest(manifest), tmp_path)
+        record = json.loads(outfiles[1].read_text())
+        assert record["action"] == "estimate"
+        assert 0 <= record["results"]["percolation_fraction"] <= 1
+
+    def test_output_names_unique(self, tmp_path):
+        names = [output_name(tmp_path / d / "x" / "y.yml", "scan") for d in ("a", "b")]
+        assert names[0] != names[1]
+        assert names[0].startswith("x_y_") and names[0].endswith("_scan.json")
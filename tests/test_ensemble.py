@@ -0,0 +1,47 @@
+import numpy as np
+
+from percolation.ensemble import RUN_DTYPE, percolation_fraction, run_ensemble
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+from percolation.scripts.parameter_scan import scan_ensemble
+
+
+class TestEnsemble:
+    def test_records(self):
+        model = PercolationModel(SquareLattice(20, 20, n_links=2), 0.35)
+        runs = run_ensemble(model, 30, seed=0)
+        assert runs.dtype == RUN_DTYPE and runs.shape == (30,)
+        assert np.all(runs["inert_prob"] == 0.35)
+        assert np.all(runs["recovery_time"] == -1)
+
+        # Percolated runs reached the far boundary; the others never did
+        assert np.all(runs["first_passage_step"][runs["percolated"]] >= 0)
+        assert np.all(runs["first_passage_step"][~runs["percolated"]] == -1)
+        assert np.all(runs["first_passage_step"] <= runs["steps"])
+        totals = runs["n_live"] + runs["n_inert"] + runs["n_susceptible"]
+        assert np.all(totals == model.network.n_nodes)
+
+    def test_reproducible(self):
+        model = PercolationModel(SquareLattice(15, 15, n_links=3), 0.3)
+        model.transmission_prob = 0.7
+        runs = run_ensemble(model, 10, seed=1)
+
+        # Each run can be reproduced from its seed
+        model._seed_rng(int(runs["seed"][3]))
+        model.reset()
+        model.evolve_until_percolated()
+        assert model.has_percolated == runs["percolated"][3]
+        assert len(model.live_time_series) - 1 == runs["steps"][3]
+        assert model.first_passage_step == runs["first_passage_step"][3]
+        peak = model.live_time_series.max()
+        assert np.isclose(peak, runs["peak_live_fraction"][3])
+
+    def test_scan(self):
+        model = PercolationModel(SquareLattice(10, 10, n_links=2), 0.0)
+        values = np.linspace(0.2, 0.6, 4)
+        runs = scan_ensemble(model, values, 8, coupled=True, seed=2)
+        assert runs.shape == (4, 8)
+        np.testing.assert_array_equal(runs["seed"][0], runs["seed"][-1])
+        scanned, fraction = percolation_fraction(runs.ravel())
+        np.testing.assert_allclose(scanned, values)
+        np.testing.assert_allclose(fraction, runs["percolated"].mean(axis=1))
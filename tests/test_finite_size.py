@@ -0,0 +1,98 @@
+import json
+import sys
+import numpy as np
+import pytest
+
+from percolation.scripts.finite_size import (
+    allocate_repeats,
+    schedule,
+    simulation_cost,
+    fit_scaling,
+    shifted_power_law,
+    power_law,
+    main,
+)
+
+# Small enough for the transfer-matrix fast path, so that many repeats are cheap and
+# the fits always converge
+CONFIG = """
+rows: 4
+links: 2
+start: 0.0
+stop: 0.7
+num: 8
+repeats: 100
+reproducible: true
+"""
+
+
+class TestSchedule:
+    def test_allocate_repeats(self):
+        sizes = [10, 20, 40]
+        repeats = allocate_repeats(sizes, num=5, budget=1e8)
+        spent = repeats * 5 * sum(simulation_cost(size) for size in sizes)
+        assert spent <= 1e8
+        assert (repeats + 1) * 5 * sum(simulation_cost(size) for size in sizes) > 1e8
+
+    def test_budget_too_small(self):
+        with pytest.raises(ValueError):
+            allocate_repeats([100, 200], num=10, budget=1e6)
+
+    def test_tasks(self):
+        values = np.linspace(0, 1, 4)
+        tasks = schedule([8, 32, 16], values, repeats=10, n_chunks=3)
+        assert tasks[0][0] == 32 and tasks[-1][0] == 8
+        for size in (8, 16, 32):
+            for i in range(len(values)):
+                assert sum(t[3] for t in tasks if t[:2] == (size, i)) == 10
+
+
+class TestFitScaling:
+    sizes = np.array([8, 16, 32, 64, 128])
+    loc = shifted_power_law(sizes, 0.35, 0.8, 0.75)
+    width = power_law(sizes, 0.5, 0.75)
+
+    def test_recovers_parameters(self):
+        fit = fit_scaling(
+            self.sizes, self.loc, np.full(5, 1e-3), self.width, np.full(5, 1e-3)
+        )
+        assert np.isclose(fit["q_c"], 0.35)
+        assert np.isclose(fit["inv_nu_width"], 0.75)
+        assert np.isclose(fit["inv_nu_loc"], 0.75)
+
+    def test_three_sizes(self):
+        fit = fit_scaling(
+            self.sizes[:3],
+            self.loc[:3],
+            np.full(3, 1e-3),
+            self.width[:3],
+            np.full(3, 1e-3),
+        )
+        assert np.isclose(fit["q_c"], 0.35)
+        assert fit["inv_nu_loc"] == fit["inv_nu_width"]
+
+    def test_too_few_sizes(self):
+        with pytest.raises(ValueError):
+            fit_scaling(self.sizes[:2], self.loc[:2], 1, self.width[:2], 1)
+
+
+class TestMain:
+    def test_end_to_end(self, tmp_path, monkeypatch):
+        config = tmp_path / "input.yml"
+        config.write_text(CONFIG)
+        outdir = tmp_path / "out"
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["perc-fss", str(config), "-L", "4", "6", "8", "-w", "1", "-o", str(outdir)],
+        )
+        main()
+
+        results = json.loads((outdir / "finite_size_scaling.json").read_text())
+        assert results["repeats"] == 100
+        assert [scan["size"] for scan in results["scans"]] == [4, 6, 8]
+        for scan in results["scans"]:
+            assert len(scan["percolation_fraction"]) == 8
+            assert {"loc", "e_loc", "width", "e_width"} <= scan.keys()
+        assert {"q_c", "e_q_c", "inv_nu_width", "inv_nu_loc"} <= results["fit"].keys()
+        assert (outdir / "finite_size_scaling.png").exists()
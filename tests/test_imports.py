@@ -0,0 +1,11 @@
+from percolation.scripts.import_time import import_time
+
+
+class TestImports:
+    def test_package_is_headless(self):
+        _, heavy = import_time("percolation", repeats=1)
+        assert heavy == []
+
+    def test_parameter_scan_is_headless(self):
+        _, heavy = import_time("percolation.scripts.parameter_scan", repeats=1)
+        assert heavy == []
@@ -2,9 +2,289 @@ from percolation.lattice import SquareLattice
 from percolation.model import PercolationModel
 from typing import List
 import numpy as np
+import pytest
 
 class TestModel:
     def test_simple_percolation(self):
         network = SquareLattice(5)
         perc = PercolationModel(network, 0.2)
-        perc.evolve(5)
\ No newline at end of file
+        perc.evolve(5)
+
+    def test_reset_reuses_arrays(self):
+        model = PercolationModel(SquareLattice(10, n_links=2), 0.3, recovery_time=3)
+        arrays = (model._state, model._inert, model._contacts)
+        model.evolve(5)
+        model.reset()
+        new_arrays = (model._state, model._inert, model._contacts)
+        assert all(a is b for a, b in zip(arrays, new_arrays))
+        assert len(model.live_time_series) == 1
+        assert not model.inert[0].any()  # nucleus
+
+    def test_reset_is_reproducible(self):
+        model = PercolationModel(SquareLattice(10, n_links=3), 0.3, transmission_prob=0.6)
+        model.init_state(reproducible=True)
+        model.evolve(10)
+        model.reset()
+        first = model.state.copy()
+        model.init_state(reproducible=True)
+        model.evolve(10)
+        model.reset()
+        np.testing.assert_array_equal(model.state, first)
+
+    def test_public_contacts_fallback(self, monkeypatch):
+        import percolation.model
+
+        states = []
+        for matvec in (percolation.model.csr_matvec, None):
+            monkeypatch.setattr(percolation.model, "csr_matvec", matvec)
+            model = PercolationModel(SquareLattice(15, n_links=3), 0.3, recovery_time=4)
+            model.init_state(reproducible=True)
+            model.evolve(20)
+            states.append(model.state)
+        np.testing.assert_array_equal(*states)
+
+class TestStripDecomposition:
+    def _compare(self, n_links, periodic):
+        network = SquareLattice(20, 17, n_links=n_links, periodic=periodic)
+        serial = PercolationModel(network, 0.3, recovery_time=3, nucleus_size=3)
+        threaded = PercolationModel(
+            network, 0.3, recovery_time=3, nucleus_size=3, n_threads=3
+        )
+        serial.init_state(reproducible=True)
+        threaded.init_state(reproducible=True)
+        serial.evolve(30)
+        threaded.evolve(30)
+
+        # With certain transmission the dynamics are deterministic after initialisation
+        np.testing.assert_array_equal(serial.state, threaded.state)
+        np.testing.assert_array_equal(serial.inert, threaded.inert)
+
+    def test_periodic(self):
+        for n_links in range(1, 5):
+            self._compare(n_links, periodic=True)
+
+    def test_bounded(self):
+        for n_links in range(1, 5):
+            self._compare(n_links, periodic=False)
+
+    def test_close(self):
+        model = PercolationModel(SquareLattice(20), n_threads=2)
+        domain = model._domain
+        model.n_threads = 3
+        with pytest.raises(RuntimeError):
+            domain.update(model)
+
+        model.reset()
+        with model._domain as domain:
+            domain.update(model)
+        with pytest.raises(RuntimeError):
+            domain.update(model)
+
+
+class TestBackends:
+    def _compare(self, network, recovery_time=3):
+        from percolation.backends import BACKENDS
+
+        kwargs = dict(
+            transmission_prob=0.7,
+            recovery_time=recovery_time,
+            recovered_are_inert=False,
+        )
+        # Long enough for most of the square lattices to percolate
+        reference = PercolationModel(network, 0.1, **kwargs)
+        reference.init_state(reproducible=True)
+        reference.evolve(60)
+
+        for backend in BACKENDS:
+            model = PercolationModel(network, 0.1, backend=backend, **kwargs)
+            model.init_state(reproducible=True)
+            model.evolve(60)
+
+            # Identical given the same random stream, or if the backend falls back
+            np.testing.assert_array_equal(reference.state, model.state)
+            np.testing.assert_array_equal(reference.inert, model.inert)
+            assert reference._live_time_series == model._live_time_series
+            assert reference._inert_time_series == model._inert_time_series
+            assert reference.first_passage_step == model.first_passage_step
+
+    def test_stencil(self):
+        for n_links in range(1, 5):
+            for periodic in (True, False):
+                for recovery_time in (3, -1):
+                    network = SquareLattice(20, 17, n_links=n_links, periodic=periodic)
+                    self._compare(network, recovery_time)
+
+    def test_sparse(self):
+        from percolation.random_graphs import ErdosRenyiNetwork
+
+        self._compare(ErdosRenyiNetwork(500, mean_degree=3, seed=0))
+
+    def test_autotune_cache(self, tmp_path, monkeypatch):
+        from percolation import backends
+
+        monkeypatch.setenv("PERCOLATION_CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(backends, "_CHOICES", {})
+        model = PercolationModel(SquareLattice(20, 20), 0.3, backend="auto")
+        assert model.active_backend in backends.available_backends(model)
+
+        cache = backends._load_cache(tmp_path / "backends.json")
+        assert cache == {backends.regime(model): model.active_backend}
+
+        # The autotuner leaves the state and random stream untouched
+        model.init_state(reproducible=True)
+        state, inert = model.state.copy(), model.inert.copy()
+        series = list(model._live_time_series)
+        backends.autotune(model, refresh=True)
+        np.testing.assert_array_equal(model.state, state)
+        np.testing.assert_array_equal(model.inert, inert)
+        assert model._live_time_series == series
+
+        reference = PercolationModel(SquareLattice(20, 20), 0.3)
+        reference.init_state(reproducible=True)
+        model.evolve(20)
+        reference.evolve(20)
+        np.testing.assert_array_equal(model.state, reference.state)
+
+
+    def test_autotune_not_on_reset(self, monkeypatch):
+        import percolation.model
+
+        calls = []
+        monkeypatch.setattr(
+            percolation.model, "autotune", lambda model: calls.append(1) or "numpy"
+        )
+        model = PercolationModel(SquareLattice(10), 0.3, backend="auto")
+        assert len(calls) == 1
+        for _ in range(3):
+            model.reset()
+            model.evolve(2)
+        assert len(calls) == 1
+
+        # Choosing again for new parameters happens when they are set
+        model.inert_prob = 0.5
+        assert len(calls) == 2
+
+
+class TestFastPaths:
+    def test_directed_columns_matches_simulation(self):
+        from percolation.exact import find_fast_path
+
+        for periodic in (False, True):
+            for recovery_time in (-1, 3):
+                network = SquareLattice(12, 5, n_links=1, periodic=periodic)
+                model = PercolationModel(network, 0.1, recovery_time=recovery_time)
+                assert find_fast_path(model) == "directed_columns"
+                for _ in range(20):
+                    model.init_state()
+                    clear = ~model.inert[1:].any(axis=0)
+                    model.evolve_until_percolated()
+                    assert model.has_percolated == clear.any()
+
+    def test_not_applied(self):
+        from percolation.exact import find_fast_path
+
+        network = SquareLattice(10, n_links=1, periodic=True)
+        model = PercolationModel(network, 0.1, recovery_time=3, recovered_are_inert=False)
+        assert find_fast_path(model) is None
+        model.recovered_are_inert = True
+        model.transmission_prob = 0.5
+        assert find_fast_path(model) is None
+        assert find_fast_path(PercolationModel(SquareLattice(20, n_links=2))) is None
+
+    def test_estimate(self):
+        from percolation.exact import percolation_probability
+
+        model = PercolationModel(SquareLattice(20, 10, n_links=1), 0.05)
+        frac, stderr = model.estimate_percolation_prob(4000, print_result=False)
+        assert abs(frac - percolation_probability(model)) < 4 * stderr
+
+    def test_no_spread(self):
+        model = PercolationModel(SquareLattice(10, n_links=2), 0.1, recovery_time=0)
+        assert model.estimate_percolation_prob(5, print_result=False)[0] == 0
+        frac, _ = model.estimate_percolation_prob(5, print_result=False, fast_path=False)
+        assert frac == 0
+
+
+class TestFirstPassage:
+    def _snapshot(self, model):
+        return (
+            model.state.copy(),
+            model.inert.copy(),
+            model.live_time_series,
+            model.susceptible_time_series,
+            model.inert_time_series,
+        )
+
+    def _compare(self, model, evolve):
+        model._seed_rng(0)
+        model.reset()
+        evolve(first_passage=False)
+        stepped = self._snapshot(model)
+        model._seed_rng(0)
+        model.reset()
+        evolve(first_passage=True)
+        for a, b in zip(stepped, self._snapshot(model)):
+            np.testing.assert_array_equal(a, b)
+
+    def test_matches_stepping(self):
+        for n_links in range(1, 5):
+            for recovery_time in (-1, 0, 3):
+                network = SquareLattice(20, 15, n_links=n_links, periodic=True)
+                model = PercolationModel(network, 0.35, recovery_time=recovery_time)
+                self._compare(model, lambda **kw: model.evolve(25, **kw))
+                self._compare(model, model.evolve_until_percolated)
+
+    def test_infection_time(self):
+        from percolation.first_passage import FirstPassage
+
+        model = PercolationModel(SquareLattice(6, n_links=1), 0.0)
+        # The virus moves down one row per update
+        expected = np.repeat(np.arange(6), 6)
+        np.testing.assert_array_equal(FirstPassage(model).infection_time, expected)
+
+    def test_not_applied(self):
+        from percolation.first_passage import first_passage_applies
+
+        model = PercolationModel(SquareLattice(10), 0.3, transmission_prob=0.5)
+        assert not first_passage_applies(model)
+        model.transmission_prob = 1.0
+        assert first_passage_applies(model)
+        model.evolve(1)
+        assert not first_passage_applies(model)
+
+
+class TestPrefilter:
+    def test_matches_stepping(self, monkeypatch):
+        import percolation.model
+
+        # Always restrict stepping to the component of the nucleus
+        monkeypatch.setattr(percolation.model, "RESTRICT_FRACTION", 1.1)
+        network = SquareLattice(25, 20, n_links=2)
+        model = PercolationModel(network, 0.4, transmission_prob=0.8)
+        n_restricted = 0
+        for seed in range(10):
+            model._seed_rng(seed)
+            model.reset()
+            component = model._percolating_component()
+            model.evolve_until_percolated()
+            stepped = (model.state.copy(), model.live_time_series, model.inert_time_series)
+            percolated = model.has_percolated
+
+            model._seed_rng(seed)
+            model.reset()
+            model.evolve_until_percolated(prefilter=True)
+            assert model.has_percolated == percolated
+            if component is not None:
+                n_restricted += 1
+                np.testing.assert_array_equal(model.state, stepped[0])
+                np.testing.assert_array_equal(model.live_time_series, stepped[1])
+                np.testing.assert_array_equal(model.inert_time_series, stepped[2])
+        assert n_restricted > 0
+
+    def test_disconnected(self):
+        network = SquareLattice(10, 10, n_links=1)
+        model = PercolationModel(network, 0.0)
+        model._inert.reshape(10, 10)[5] = True  # a row of inert nodes
+        assert model._percolating_component() is None
+        model.evolve_until_percolated(prefilter=True)
+        assert len(model.live_time_series) == 1
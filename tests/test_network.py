@@ -1,4 +1,4 @@
-from percolation.networks import BooleanNetwork, BooleanEdge
+from percolation.networks import BooleanNetwork, BooleanEdge, WeightedNetwork, WeightedEdge
 from typing import List
 import numpy as np
 
@@ -31,4 +31,205 @@ class TestBooleanNetwork:
         state = np.array([True, False, False, False], dtype=np.bool8)
         propagation = state * network.matrix
         expected = np.array([False, True, True, False], dtype=np.bool8)
-        np.testing.assert_array_equal(propagation, expected)
\ No newline at end of file
+        np.testing.assert_array_equal(propagation, expected)
+
+class TestNetworkConstructors:
+    def test_from_arrays(self):
+        rows = np.array([0, 0, 2])
+        cols = np.array([1, 2, 3])
+        network = BooleanNetwork.from_arrays(4, rows, cols, directed=False)
+        expected = BooleanNetwork(4, [(0, 1), (0, 2), (2, 3)], directed=False)
+        np.testing.assert_array_equal(
+            network.matrix.toarray(), expected.matrix.toarray()
+        )
+
+    def test_from_csr_zero_copy(self):
+        indptr = np.array([0, 1, 2, 2], dtype=np.int64)
+        indices = np.array([1, 2], dtype=np.int64)
+        network = BooleanNetwork.from_csr(indptr, indices)
+        assert np.shares_memory(network.matrix.indices, indices)
+        assert np.shares_memory(network.matrix.indptr, indptr)
+
+    def test_from_csr_files(self, tmp_path):
+        indptr = np.array([0, 1, 2, 2], dtype=np.int32)
+        indices = np.array([1, 2], dtype=np.int32)
+        np.save(tmp_path / "indptr.npy", indptr)
+        np.save(tmp_path / "indices.npy", indices)
+
+        network = BooleanNetwork.from_csr_files(
+            tmp_path / "indptr.npy", tmp_path / "indices.npy", nucleus=[0], far_boundary=[2]
+        )
+        assert not network.matrix.indices.flags.owndata
+        assert network.matrix[0, 1] == True
+        assert network.matrix[1, 2] == True
+        assert network.matrix[0, 2] == False
+
+    def test_from_edge_file(self, tmp_path):
+        edges = np.array([[0, 1], [1, 2]], dtype=np.int32)
+        edges.tofile(tmp_path / "edges.bin")
+        network = BooleanNetwork.from_edge_file(tmp_path / "edges.bin")
+        assert network.n_nodes == 3
+        assert network.matrix[1, 2] == True
+
+    def test_percolation_on_general_network(self):
+        from percolation.model import PercolationModel
+
+        # A chain 0 -> 1 -> 2 -> 3
+        network = BooleanNetwork.from_arrays(
+            4, np.arange(3), np.arange(1, 4), nucleus=[0], far_boundary=[3]
+        )
+        model = PercolationModel(network)
+        model.evolve_until_percolated()
+        assert model.has_percolated
+
+
+class TestWeightedNetwork:
+    def test_weights(self):
+        edges: List[WeightedEdge] = [(0.5, (0, 1)), (0.25, (1, 2))]
+        network = WeightedNetwork(3, edges, directed=False)
+        assert network.matrix[0, 1] == 0.5
+        assert network.matrix[2, 1] == 0.25
+        assert network.matrix[0, 2] == 0
+
+    def test_out_edges(self):
+        network = WeightedNetwork.from_arrays(
+            4, np.array([0, 0, 2]), np.array([1, 2, 3]), np.array([0.1, 0.2, 0.3])
+        )
+        edges, targets = network.out_edges(np.array([0, 2]))
+        np.testing.assert_array_equal(targets, [1, 2, 3])
+        np.testing.assert_array_equal(network.weights[edges], [0.1, 0.2, 0.3])
+
+    def test_from_edge_file(self, tmp_path):
+        record = np.dtype([("row", np.int32), ("column", np.int32), ("weight", float)])
+        edges = np.array([(0, 1, 0.5), (1, 2, 0.25)], dtype=record)
+        edges.tofile(tmp_path / "edges.bin")
+        np.save(tmp_path / "edges.npy", edges)
+
+        for path in (tmp_path / "edges.bin", tmp_path / "edges.npy"):
+            network = WeightedNetwork.from_edge_file(path, directed=False)
+            assert network.n_nodes == 3
+            assert network.matrix[0, 1] == 0.5
+            assert network.matrix[2, 1] == 0.25
+            assert network.matrix[0, 2] == 0
+
+    def test_weighted_transmission(self):
+        from percolation.model import PercolationModel
+
+        # Certain transmission along 0 -> 1 -> 2, but never along 0 -> 3
+        network = WeightedNetwork.from_arrays(
+            4,
+            np.array([0, 1, 0]),
+            np.array([1, 2, 3]),
+            np.array([1.0, 1.0, 0.0]),
+            nucleus=[0],
+            far_boundary=[2],
+        )
+        model = PercolationModel(network)
+        model.evolve(3)
+        assert model.has_percolated
+        np.testing.assert_array_equal(model.state.astype(bool), [True, True, True, False])
+
+    def test_halting_steps(self):
+        from percolation.model import PercolationModel
+
+        # Transmission halts after the same number of idle steps as a BooleanNetwork
+        # with the smallest non-zero transmission probability
+        network = WeightedNetwork.from_arrays(
+            3,
+            np.array([0, 1]),
+            np.array([1, 2]),
+            np.array([0.5, 0.0]),
+            nucleus=[0],
+            far_boundary=[2],
+        )
+        assert PercolationModel(network)._halting_steps() == 2
+        assert PercolationModel(network, transmission_prob=0.5)._halting_steps() == 4
+
+
+class TestReordering:
+    def scrambled_lattice(self):
+        from percolation.lattice import SquareLattice
+
+        lattice = SquareLattice(15, n_links=4)
+        labels = np.random.default_rng(0).permutation(lattice.n_nodes)
+        coo = lattice.csr.tocoo()
+        nucleus = labels[lattice.get_nucleus_mask(1)]
+        far_boundary = labels[lattice.far_boundary_mask]
+        return lattice.n_nodes, labels[coo.row], labels[coo.col], nucleus, far_boundary
+
+    def test_bandwidth(self):
+        size, rows, cols, _, _ = self.scrambled_lattice()
+        network = BooleanNetwork.from_arrays(size, rows, cols, reorder="rcm")
+        coo = network.matrix.tocoo()
+        assert np.abs(coo.row - coo.col).max() < 2 * 15
+        order = network.node_order
+        np.testing.assert_array_equal(np.sort(order), np.arange(size))
+        assert network.matrix.nnz == len(rows)
+        assert np.all(network.matrix[np.argsort(order)[rows], np.argsort(order)[cols]])
+
+    def test_original_order(self):
+        from percolation.model import PercolationModel
+
+        size, rows, cols, nucleus, far_boundary = self.scrambled_lattice()
+        states = []
+        for reorder in (None, "rcm", "bfs"):
+            network = BooleanNetwork.from_arrays(
+                size,
+                rows,
+                cols,
+                nucleus=nucleus,
+                far_boundary=far_boundary,
+                reorder=reorder,
+            )
+            np.testing.assert_array_equal(
+                np.flatnonzero(network.far_boundary_mask), np.sort(far_boundary)
+            )
+            np.testing.assert_array_equal(
+                np.flatnonzero(network.get_nucleus_mask()), np.sort(nucleus)
+            )
+            # Without inert nodes, the spread doesn't depend on the random numbers
+            model = PercolationModel(network)
+            model.evolve(5)
+            states.append(model.state)
+        for state in states[1:]:
+            np.testing.assert_array_equal(state, states[0])
+
+    def test_special_nodes_after_reordering(self):
+        network = BooleanNetwork(4, [(0, 1), (1, 2), (2, 3)], reorder="bfs")
+        network.set_special_nodes(nucleus=[3], far_boundary=[0])
+        np.testing.assert_array_equal(np.flatnonzero(network.get_nucleus_mask()), [3])
+        assert network._get_nucleus()[network.node_order == 3]
+
+    def test_masks_round_trip(self):
+        from percolation.model import PercolationModel
+
+        size, rows, cols, _, far_boundary = self.scrambled_lattice()
+        network = BooleanNetwork.from_arrays(
+            size, rows, cols, nucleus=[0], far_boundary=far_boundary, reorder="rcm"
+        )
+        assert np.flatnonzero(network.get_nucleus_mask()).tolist() == [0]
+        np.testing.assert_array_equal(
+            network.from_original(network.far_boundary_mask), network._far_boundary
+        )
+        np.testing.assert_array_equal(
+            network.from_original(network.get_nucleus_mask()), network._get_nucleus()
+        )
+
+        # The public masks index the state and inert nodes of a model
+        model = PercolationModel(network)
+        assert np.all(model.state[network.get_nucleus_mask()] > 0)
+        model.evolve_until_percolated()
+        assert model.has_percolated
+        far_live = model.state[network.far_boundary_mask] > 0
+        assert np.count_nonzero(far_live) == np.count_nonzero(
+            model._state[network._far_boundary]
+        )
+
+    def test_invalid(self):
+        import pytest
+        from percolation.lattice import SquareLattice
+
+        with pytest.raises(ValueError):
+            BooleanNetwork(2, [(0, 1)], reorder="random")
+        with pytest.raises(ValueError):
+            SquareLattice(5).reorder_nodes()
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from percolation.lattice import SquareLattice
+from percolation.networks import BooleanNetwork
+from percolation.model import PercolationModel
+from percolation.observables import ClusterStatistics, CorrelationFunction
+
+
+def same_partition(a, b):
+    return len(set(zip(a, b))) == len(set(a)) == len(set(b))
+
+
+class TestClusterStatistics:
+    @pytest.mark.parametrize("n_links", [1, 2, 4])
+    @pytest.mark.parametrize("periodic", [False, True])
+    def test_lattice_matches_network(self, n_links, periodic):
+        lattice = SquareLattice(n_rows=12, n_cols=9, n_links=n_links, periodic=periodic)
+        network = BooleanNetwork.from_csr(lattice.csr.indptr, lattice.csr.indices)
+        occupied = np.random.default_rng(0).random((10, lattice.n_nodes)) > 0.4
+
+        lattice_labels, _ = ClusterStatistics(lattice).label(occupied)
+        network_labels, _ = ClusterStatistics(network).label(occupied)
+        assert all(
+            same_partition(a, b) for a, b in zip(lattice_labels, network_labels)
+        )
+
+    def test_periodic_wrap(self):
+        lattice = SquareLattice(n_rows=4, n_links=4, periodic=True)
+        occupied = np.zeros((4, 4), dtype=bool)
+        occupied[:, 0] = True
+        occupied[0, 3] = True  # joined to the first column across the boundary
+        labels, _ = ClusterStatistics(lattice).label(occupied.ravel())
+        assert len(np.unique(labels[labels > 0])) == 1
+
+    def test_observables(self):
+        lattice = SquareLattice(n_rows=3, n_links=4)
+        stats = ClusterStatistics(lattice)
+        occupied = np.array([[1, 1, 0], [0, 0, 0], [1, 0, 1]], dtype=bool).ravel()
+        stats.add(np.stack([occupied, np.ones(9, dtype=bool)]))
+
+        assert stats.n_samples == 2
+        assert stats.cluster_size_histogram[1] == 2
+        assert stats.cluster_size_histogram[2] == 1
+        assert stats.cluster_size_histogram[9] == 1
+        assert np.isclose(stats.largest_cluster_fraction[0], (2 / 9 + 1) / 2)
+        assert np.isclose(stats.mean_cluster_size[0], 0.5)
+
+    def test_batches_accumulate(self):
+        lattice = SquareLattice(n_rows=20, n_links=4)
+        one, many = ClusterStatistics(lattice), ClusterStatistics(lattice)
+        one.sample(0.4, 30, batch_size=30, seed=1)
+        many.sample(0.4, 30, batch_size=7, seed=1)
+        assert np.all(one.cluster_size_histogram == many.cluster_size_histogram)
+        assert np.isclose(
+            one.largest_cluster_fraction[0], many.largest_cluster_fraction[0]
+        )
+
+
+def brute_force_correlation(lattice, field):
+    """Connected correlation for each displacement, by looping over pairs of nodes."""
+    field = field.reshape(-1, lattice.n_rows, lattice.n_cols)
+    products, pairs = {}, {}
+    for rows, cols in np.ndindex(lattice.n_rows, lattice.n_cols):
+        for rows2, cols2 in np.ndindex(lattice.n_rows, lattice.n_cols):
+            d = (rows2 - rows, cols2 - cols)
+            if lattice.periodic:
+                d = (d[0] % lattice.n_rows, d[1] % lattice.n_cols)
+            product = (field[:, rows, cols] * field[:, rows2, cols2]).sum()
+            products[d] = products.get(d, 0) + product
+            pairs[d] = pairs.get(d, 0) + len(field)
+    mean = field.mean()
+    return {d: products[d] / pairs[d] - mean ** 2 for d in products}
+
+
+class TestCorrelationFunction:
+    @pytest.mark.parametrize("periodic", [False, True])
+    def test_matches_brute_force(self, periodic):
+        lattice = SquareLattice(n_rows=4, n_cols=5, n_links=4, periodic=periodic)
+        field = np.random.default_rng(0).random((3, lattice.n_nodes)) > 0.5
+        correlation = CorrelationFunction(lattice)
+        correlation.add(field)
+
+        correlation_map = correlation.correlation_map
+        for d, expected in brute_force_correlation(lattice, field).items():
+            assert np.isclose(correlation_map[d], expected)
+        assert np.isnan(correlation_map).sum() == (0 if periodic else 17)
+
+    def test_uncorrelated(self):
+        lattice = SquareLattice(n_rows=32, n_links=4, periodic=True)
+        correlation = CorrelationFunction(lattice)
+        rng = np.random.default_rng(1)
+        for _ in range(5):
+            correlation.add(rng.random((200, lattice.n_nodes)) < 0.3)
+
+        r, radial = correlation.radial_correlation
+        assert r[0] == 0 and np.isclose(radial[0], 0.3 * 0.7, rtol=0.01)
+        assert np.all(np.abs(radial[1:]) < 0.005)
+        assert np.all(correlation.correlation_length < 1)
+
+    def test_correlation_length(self):
+        # Independent blocks of 4x4 nodes: C(r) = 1 - |dx| / 4 - |dy| / 4 + |dx dy| / 16
+        # within a block, with second moment xi^2 = (4^2 - 1) / 12 along each axis, which
+        # the estimate from the smallest wave vector slightly overestimates
+        lattice = SquareLattice(n_rows=16, n_links=4, periodic=True)
+        correlation = CorrelationFunction(lattice)
+        rng = np.random.default_rng(2)
+        for _ in range(10):
+            blocks = np.kron(rng.standard_normal((500, 4, 4)), np.ones((4, 4)))
+            shifts = rng.integers(4, size=(500, 2))  # so that the field is stationary
+            field = [np.roll(b, shift, axis=(0, 1)) for b, shift in zip(blocks, shifts)]
+            correlation.add(np.reshape(field, (500, -1)))
+        assert np.allclose(correlation.correlation_length, np.sqrt(15 / 12), rtol=0.15)
+
+    def test_batches_accumulate(self):
+        model = PercolationModel(SquareLattice(12, n_links=4), 0.35)
+        one, many = CorrelationFunction(model.network), CorrelationFunction(model.network)
+        model._seed_rng(0)
+        one.sample_model(model, 10, batch_size=10)
+        model._seed_rng(0)
+        many.sample_model(model, 10, batch_size=3)
+        assert one.n_samples == many.n_samples == 10
+        assert np.allclose(one.correlation_map, many.correlation_map, equal_nan=True)
+
+    def test_sample_options(self):
+        # Stepping and the first-passage engine give the same final configuration
+        model = PercolationModel(SquareLattice(12, n_links=4), 0.35)
+        stepped = CorrelationFunction(model.network)
+        jumped = CorrelationFunction(model.network)
+        model._seed_rng(0)
+        stepped.sample_model(model, 1, first_passage=False)
+        model._seed_rng(0)
+        jumped.sample_model(model, 1, first_passage=True, prefilter=True)
+        np.testing.assert_allclose(stepped.correlation_map, jumped.correlation_map)
+
+    def test_requires_lattice(self):
+        lattice = SquareLattice(4)
+        network = BooleanNetwork.from_csr(lattice.csr.indptr, lattice.csr.indices)
+        with pytest.raises(ValueError):
+            CorrelationFunction(network)
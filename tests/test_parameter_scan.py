@@ -0,0 +1,60 @@
+import numpy as np
+
+from percolation.scripts.parameter_scan import (
+    logistic,
+    fit_logistic,
+    fit_logistic_batch,
+    bootstrap_logistic,
+    binomial_errors,
+    scan_percolation_fraction,
+)
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+
+VALUES = np.linspace(0.2, 0.6, 25)
+REPEATS = 50
+
+
+class TestBootstrap:
+    def test_batch_fit_exact(self):
+        fraction = logistic(VALUES, 0.4, 25)
+        loc, steepness = fit_logistic_batch(VALUES, np.stack([fraction] * 3), REPEATS)
+        assert loc.shape == (3,)
+        assert np.allclose(loc, 0.4)
+        assert np.allclose(steepness, 25)
+
+    def test_batch_fit_agrees_with_curve_fit(self):
+        rng = np.random.default_rng(1)
+        fraction = rng.binomial(REPEATS, logistic(VALUES, 0.4, 25)) / REPEATS
+        loc, steepness = fit_logistic_batch(VALUES, fraction, REPEATS)
+        popt, perr = fit_logistic(VALUES, fraction, binomial_errors(fraction, REPEATS))
+        assert abs(loc - popt[0]) < 2 * perr[0]
+        assert abs(steepness - popt[1]) < 4 * perr[1]
+
+    def test_intervals(self):
+        rng = np.random.default_rng(2)
+        fraction = rng.binomial(REPEATS, logistic(VALUES, 0.4, 25)) / REPEATS
+        popt, intervals = bootstrap_logistic(
+            VALUES, fraction, REPEATS, n_boot=1000, confidence=0.95, seed=0
+        )
+        assert intervals.shape == (2, 2)
+        assert np.all(intervals[:, 0] < popt) and np.all(popt < intervals[:, 1])
+        assert intervals[0, 0] < 0.4 < intervals[0, 1]
+        assert intervals[1, 0] < 25 < intervals[1, 1]
+
+
+class TestCoupled:
+    def test_monotonic(self):
+        model = PercolationModel(SquareLattice(20, 20, n_links=2), 0.0)
+        values = np.linspace(0.2, 0.6, 9)
+        fraction = scan_percolation_fraction(model, values, 20, coupled=True, seed=3)
+        assert np.all(np.diff(fraction) <= 0)
+        assert fraction[0] > fraction[-1]
+
+    def test_reproducible(self):
+        model = PercolationModel(SquareLattice(15, 15, n_links=3), 0.0)
+        model.transmission_prob = 0.8
+        values = np.linspace(0.1, 0.5, 5)
+        first = scan_percolation_fraction(model, values, 10, coupled=True, seed=4)
+        second = scan_percolation_fraction(model, values, 10, coupled=True, seed=4)
+        np.testing.assert_array_equal(first, second)
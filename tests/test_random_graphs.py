@@ -0,0 +1,53 @@
+from percolation.random_graphs import (
+    ErdosRenyiNetwork,
+    WattsStrogatzNetwork,
+    RandomRegularNetwork,
+    ConfigurationModelNetwork,
+)
+from percolation.model import PercolationModel
+import numpy as np
+
+
+def assert_simple_undirected(network):
+    matrix = network.matrix
+    assert (matrix != matrix.T).nnz == 0
+    assert not matrix.diagonal().any()
+
+
+class TestRandomGraphs:
+    def test_erdos_renyi(self):
+        network = ErdosRenyiNetwork(2000, mean_degree=4, seed=1)
+        assert_simple_undirected(network)
+        assert abs(network.degrees.mean() - 4) < 0.2
+
+    def test_erdos_renyi_complete(self):
+        network = ErdosRenyiNetwork(6, mean_degree=5, seed=1)
+        expected = ~np.eye(6, dtype=bool)
+        np.testing.assert_array_equal(network.matrix.toarray(), expected)
+
+    def test_reproducible(self):
+        a = WattsStrogatzNetwork(500, k=4, rewire_prob=0.2, seed=7)
+        b = WattsStrogatzNetwork(500, k=4, rewire_prob=0.2, seed=7)
+        assert (a.matrix != b.matrix).nnz == 0
+        assert_simple_undirected(a)
+
+    def test_watts_strogatz_ring(self):
+        network = WattsStrogatzNetwork(10, k=4, rewire_prob=0, seed=0)
+        np.testing.assert_array_equal(network.degrees, 4)
+        assert network.matrix[0, 9] and network.matrix[0, 2]
+
+    def test_random_regular(self):
+        network = RandomRegularNetwork(1001, degree=4, seed=3)
+        assert_simple_undirected(network)
+        np.testing.assert_array_equal(network.degrees, 4)
+
+    def test_configuration_model(self):
+        degrees = np.tile([1, 2, 3, 4], 100)
+        network = ConfigurationModelNetwork(degrees, seed=2)
+        assert_simple_undirected(network)
+        np.testing.assert_array_equal(network.degrees, degrees)
+
+    def test_model_runs(self):
+        network = ErdosRenyiNetwork(500, mean_degree=3, seed=0)
+        model = PercolationModel(network, 0.1)
+        model.evolve(5)
@@ -0,0 +1,67 @@
+import pickle
+import numpy as np
+
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+from percolation.random_graphs import ErdosRenyiNetwork
+from percolation.shared import SharedNetwork, parallel_estimate_percolation_prob
+
+
+def base(array):
+    while isinstance(array, np.ndarray) and array.base is not None:
+        array = array.base
+    return array
+
+
+class TestSharedNetwork:
+    def test_lattice_view(self):
+        lattice = SquareLattice(15, 12, n_links=3, periodic=True)
+        with SharedNetwork(lattice) as shared:
+            handle = pickle.loads(pickle.dumps(shared))
+            view = handle.attach()
+
+            assert isinstance(view, SquareLattice)
+            assert (view.n_rows, view.n_cols, view.n_links) == (15, 12, 3)
+            assert (view.csc != lattice.csc).nnz == 0
+            np.testing.assert_array_equal(
+                view.far_boundary_mask, lattice.far_boundary_mask
+            )
+            assert not isinstance(base(view.csc.indices), np.ndarray)  # memory-mapped
+
+            models = [
+                PercolationModel(network, 0.3, transmission_prob=0.7, recovery_time=4)
+                for network in (lattice, view)
+            ]
+            for model in models:
+                model.init_state(reproducible=True)
+                model.evolve(20)
+            np.testing.assert_array_equal(models[0].state, models[1].state)
+
+    def test_network_view(self):
+        network = ErdosRenyiNetwork(200, 3.0, seed=1)
+        with SharedNetwork(network) as shared:
+            view = shared.attach()
+            assert (view.csr != network.csr).nnz == 0
+            np.testing.assert_array_equal(
+                view.get_nucleus_mask(), network.get_nucleus_mask()
+            )
+
+    def test_unlink(self):
+        shared = SharedNetwork(SquareLattice(5))
+        assert shared.directory.exists()
+        shared.unlink()
+        assert not shared.directory.exists()
+
+    def test_parallel_estimate(self):
+        with SharedNetwork(SquareLattice(10, n_links=2)) as shared:
+            frac, _ = parallel_estimate_percolation_prob(
+                shared, 6, workers=2, inert_prob=0.0
+            )
+        assert frac == 1
+
+    def test_fewer_repeats_than_workers(self):
+        with SharedNetwork(SquareLattice(10)) as shared:
+            frac, _ = parallel_estimate_percolation_prob(
+                shared, 2, workers=4, inert_prob=0.3
+            )
+        assert frac in (0, 0.5, 1)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from percolation.exact import percolation_probability
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+from percolation.splitting import MultilevelSplitting, distance_to_far_boundary
+
+
+class TestSplitting:
+    def test_distance(self):
+        lattice = SquareLattice(6, 4, n_links=1)
+        distance = lattice.lexi_to_cart(distance_to_far_boundary(lattice))
+        np.testing.assert_array_equal(distance[:, 0], np.arange(5, -1, -1))
+
+    def test_matches_exact(self):
+        # Directed columns, where the percolation probability is about 1e-5
+        model = PercolationModel(SquareLattice(20, 5, n_links=1), 0.5)
+        exact = percolation_probability(model)
+        prob, stderr = MultilevelSplitting(model, effort=200).estimate(5, seed=0)
+        assert abs(prob - exact) < 4 * stderr
+        assert stderr < exact / 2
+
+    def test_reproducible(self):
+        model = PercolationModel(SquareLattice(12, 5, n_links=1), 0.5)
+        splitting = MultilevelSplitting(model, effort=20)
+        assert splitting.estimate(3, seed=1) == splitting.estimate(3, seed=1)
+        _, first = splitting.run_replicate(seed=2)
+        np.testing.assert_array_equal(splitting.run_replicate(seed=2)[1], first)
+
+    def test_requires_no_shuffling(self):
+        model = PercolationModel(SquareLattice(10, 10), 0.5, shuffle_prob=0.1)
+        with pytest.raises(ValueError):
+            MultilevelSplitting(model)
@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+
+import percolation.model
+from percolation.ensemble import run_ensemble
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+from percolation.streaming import StreamingSeries
+
+
+def autocorrelation(x, max_lag):
+    d = x - x.mean()
+    sums = [(d[: len(d) - k] * d[k:]).sum() for k in range(max_lag + 1)]
+    return np.array(sums) / (d * d).sum()
+
+
+def endemic_model(time_series):
+    network = SquareLattice(20, n_links=4, periodic=True)
+    model = PercolationModel(
+        network,
+        transmission_prob=0.3,
+        recovery_time=5,
+        recovered_are_inert=False,
+        nucleus_size=5,
+        time_series=time_series,
+    )
+    model._seed_rng(3)
+    model.reset()
+    return model
+
+
+class TestStreamingSeries:
+    def test_matches_numpy(self):
+        # AR(1) series with a large offset, to test for loss of precision
+        rng = np.random.default_rng(0)
+        x = np.zeros(2000)
+        for t in range(1, len(x)):
+            x[t] = 0.8 * x[t - 1] + rng.standard_normal()
+        x = 1e6 + 1e-3 * x
+
+        series = StreamingSeries(max_lag=5, history_size=0)
+        for value in x:
+            series.append(value)
+
+        assert series.n == len(x)
+        assert np.isclose(series.mean, x.mean(), rtol=0, atol=1e-12)
+        assert np.isclose(series.variance, x.var(ddof=1), rtol=1e-9)
+        assert series.min == x.min() and series.max == x.max() and series.last == x[-1]
+        np.testing.assert_allclose(series.autocorrelation, autocorrelation(x, 5))
+
+    def test_short_series(self):
+        series = StreamingSeries(max_lag=3)
+        assert np.isnan(series.mean) and np.all(np.isnan(series.autocorrelation))
+        for value in (1, 2):
+            series.append(value)
+        expected = autocorrelation(np.array([1.0, 2.0]), 1)
+        np.testing.assert_allclose(series.autocorrelation[:2], expected)
+        assert np.all(np.isnan(series.autocorrelation[2:]))
+
+    def test_history(self):
+        series = StreamingSeries(history_size=8)
+        for value in range(100):
+            series.append(value)
+        steps, values = series.history
+        assert 4 <= len(steps) <= 8
+        np.testing.assert_array_equal(steps, values)
+        assert steps[0] == 0 and np.all(np.diff(steps) == steps[1])
+
+    def test_merge(self):
+        rng = np.random.default_rng(1)
+        parts = [1e3 + rng.standard_normal(n) for n in (0, 1, 3, 50, 2, 200)]
+        merged = StreamingSeries(max_lag=5, history_size=16)
+        for part in parts:
+            series = StreamingSeries(max_lag=5, history_size=16)
+            for value in part:
+                series.append(value)
+            merged.merge(series)
+
+        x = np.concatenate(parts)
+        assert merged.n == len(x)
+        assert np.isclose(merged.mean, x.mean(), rtol=0, atol=1e-12)
+        assert np.isclose(merged.variance, x.var(ddof=1), rtol=1e-9)
+        assert merged.min == x.min() and merged.max == x.max() and merged.last == x[-1]
+        np.testing.assert_allclose(merged.autocorrelation, autocorrelation(x, 5))
+        steps, values = merged.history
+        assert len(steps) <= 16
+        np.testing.assert_array_equal(values, x[steps])
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            StreamingSeries(max_lag=-1)
+        with pytest.raises(ValueError):
+            StreamingSeries(max_lag=2).merge(StreamingSeries(max_lag=3))
+        with pytest.raises(ValueError):
+            StreamingSeries(history_size=1)
+
+
+class TestStreamingModel:
+    def test_matches_full(self, monkeypatch):
+        monkeypatch.setattr(percolation.model, "RETAINED_STEPS", 50)
+        full, streaming = endemic_model("full"), endemic_model("streaming")
+        full.evolve(500)
+        streaming.evolve(500)
+
+        live = full.live_time_series
+        assert len(streaming._live_time_series) <= 50
+        np.testing.assert_array_equal(
+            streaming.live_time_series, live[-len(streaming.live_time_series) :]
+        )
+        statistics = streaming.statistics["live"]
+        assert statistics.n == len(live)
+        assert np.isclose(statistics.mean, live.mean())
+        assert np.isclose(statistics.variance, live.var(ddof=1))
+        np.testing.assert_allclose(
+            statistics.autocorrelation, autocorrelation(live, statistics.max_lag)
+        )
+        inert = streaming.statistics["inert"]
+        assert np.isclose(inert.mean, full.inert_time_series.mean())
+        assert full.statistics is None
+
+    @pytest.mark.parametrize("first_passage", [False, True])
+    def test_ensemble(self, monkeypatch, first_passage):
+        monkeypatch.setattr(percolation.model, "RETAINED_STEPS", 5)
+        monkeypatch.setattr(percolation.model, "RESTRICT_FRACTION", 1.1)
+        runs = []
+        for time_series in ("full", "streaming"):
+            model = PercolationModel(
+                SquareLattice(20, n_links=2), 0.35, time_series=time_series
+            )
+            runs.append(run_ensemble(model, 20, seed=1, first_passage=first_passage))
+
+        # Field by field, as the variances of runs skipped by the prefilter are NaN
+        for field in runs[0].dtype.names:
+            np.testing.assert_array_equal(runs[0][field], runs[1][field])
+
+    def test_ensemble_statistics(self, monkeypatch):
+        monkeypatch.setattr(percolation.model, "RETAINED_STEPS", 5)
+        model = endemic_model("streaming")
+        statistics = {"live": StreamingSeries(), "inert": StreamingSeries()}
+        runs = run_ensemble(model, 5, seed=2, statistics=statistics)
+
+        # The same runs, keeping the full time series'
+        full = endemic_model("full")
+        live, inert = [], []
+        for seed in runs["seed"]:
+            full._seed_rng(int(seed))
+            full.reset()
+            full.evolve_until_percolated()
+            live.append(full.live_time_series)
+            inert.append(full.inert_time_series)
+        assert np.isclose(runs["live_mean"][-1], live[-1].mean())
+        assert np.isclose(runs["inert_variance"][-1], inert[-1].var(ddof=1))
+
+        for name, series in (("live", live), ("inert", inert)):
+            x = np.concatenate(series)
+            assert statistics[name].n == len(x)
+            assert np.isclose(statistics[name].mean, np.mean(x))
+            assert np.isclose(statistics[name].variance, np.var(x, ddof=1))
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            PercolationModel(SquareLattice(10), time_series="none")
@@ -0,0 +1,43 @@
+import json
+
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+from percolation.telemetry import ProgressMonitor
+
+
+class TestProgressMonitor:
+    def test_estimate(self, tmp_path):
+        reports = []
+        path = tmp_path / "metrics.jsonl"
+        monitor = ProgressMonitor(callback=reports.append, path=path, interval=0)
+        lattice = SquareLattice(10, n_links=2)
+        model = PercolationModel(lattice, 0.3, transmission_prob=0.9)
+        model.estimate_percolation_prob(5, print_result=False, monitor=monitor)
+
+        metrics = monitor.metrics()
+        assert metrics["runs"] == 5
+        assert metrics["total_runs"] == 5
+        assert metrics["node_updates"] == 100 * metrics["steps"]
+        assert metrics["mean_steps_per_run"] == metrics["steps"] / 5
+        assert reports[-1]["runs"] == 5
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == len(reports)
+        assert json.loads(lines[-1])["runs"] == 5
+
+    def test_rate_limited(self):
+        reports = []
+        monitor = ProgressMonitor(callback=reports.append, interval=3600)
+        model = PercolationModel(SquareLattice(10), 0.3)
+        model.evolve(20, monitor=monitor)
+        assert reports == []
+        assert monitor.steps == 20
+        monitor.report(force=True)
+        assert len(reports) == 1
+
+    def test_expected_runs_not_double_counted(self):
+        monitor = ProgressMonitor()
+        monitor.expect(50)
+        monitor.record_runs(10)
+        monitor.expect(10)
+        assert monitor.total_runs == 50
@@ -0,0 +1,62 @@
+import itertools
+import numpy as np
+import pytest
+
+from percolation.exact import find_fast_path, percolation_probability_curve
+from percolation.lattice import SquareLattice
+from percolation.model import PercolationModel
+from percolation.transfer_matrix import MAX_WIDTH, percolation_probability
+
+
+def enumerate_percolation_prob(n_rows, n_cols, n_links, periodic, inert_prob):
+    """Percolation probability found by simulating every pattern of inert nodes."""
+    model = PercolationModel(SquareLattice(n_rows, n_cols, n_links, periodic))
+    n_below = (n_rows - 1) * n_cols
+    prob = 0
+    for pattern in itertools.product((False, True), repeat=n_below):
+        model.reset()
+        model._inert[n_cols:] = pattern
+        model.evolve_until_percolated()
+        if model.has_percolated:
+            n_inert = sum(pattern)
+            prob += inert_prob ** n_inert * (1 - inert_prob) ** (n_below - n_inert)
+    return prob
+
+
+class TestTransferMatrix:
+    @pytest.mark.parametrize("n_links", [2, 3])
+    @pytest.mark.parametrize("periodic", [False, True])
+    def test_matches_enumeration(self, n_links, periodic):
+        expected = enumerate_percolation_prob(4, 3, n_links, periodic, 0.3)
+        prob = percolation_probability(4, 3, n_links, periodic, 0.3)
+        assert prob == pytest.approx(expected, rel=1e-12)
+
+    def test_curve(self):
+        model = PercolationModel(SquareLattice(30, 6, n_links=3))
+        assert find_fast_path(model) == "transfer_matrix"
+
+        q = np.linspace(0, 1, 11)
+        curve = percolation_probability_curve(model, q)
+        assert curve[0] == 1 and curve[-1] == 0
+        assert np.all(np.diff(curve) <= 0)
+
+        for inert_prob, prob in zip(q, curve):
+            assert percolation_probability(30, 6, 3, False, inert_prob) == prob
+
+    def test_estimate(self):
+        # The fast path samples from the exact probability, so compare with simulations
+        model = PercolationModel(SquareLattice(12, 5, n_links=2, periodic=True), 0.3)
+        exact = percolation_probability(12, 5, 2, True, 0.3)
+        frac, stderr = model.estimate_percolation_prob(
+            2000, print_result=False, fast_path=False
+        )
+        assert abs(frac - exact) < 4 * stderr
+
+    def test_not_applied(self):
+        network = SquareLattice(10, 6, n_links=2)
+        assert find_fast_path(PercolationModel(network, recovery_time=5)) is None
+        assert find_fast_path(PercolationModel(network, transmission_prob=0.5)) is None
+        wide = SquareLattice(10, MAX_WIDTH + 1, n_links=2)
+        assert find_fast_path(PercolationModel(wide)) is None
+        with pytest.raises(ValueError):
+            percolation_probability(10, 6, 4, False, 0.5)